@@ -0,0 +1,99 @@
+"""
+Compares parsing a received ``LAN_X_LOCO_INFO`` packet with
+:class:`loco_sound.z21.Message` against the former parser which copied
+every field of the packet into a new :class:`bytearray`.
+
+Run from the repository root via
+
+.. code-block:: shell
+
+    python3 -m benchmarks.message_benchmark
+"""
+import struct
+import timeit
+import tracemalloc
+from typing import Callable, List
+
+from loco_sound.z21 import Message
+
+PACKET = bytes([0x0e, 0x00, 0x40, 0x00, 0xef, 0x00, 0x03, 0x04, 0x85, 0x10, 0x01, 0x00, 0x00, 0x7b])
+NUMBER = 100000
+
+
+class LegacyMessage:
+    """
+    Parser of loco sound 0.0.1, kept as reference for this benchmark.
+    """
+    def __init__(self, header, x_header=None, db_data=None, xor=None, length=None):
+        self.length = length
+        self.header = header
+        self.x_header = x_header
+        self.db_data = db_data if db_data else bytearray([])
+        self.xor = xor
+
+    @classmethod
+    def from_z21_message(cls, message: bytearray):
+        x_header = None
+        db_data = None
+        xor = None
+        if len(message) >= 5:
+            x_header = message[4]
+            xor = message[-1]
+        if len(message) > 6:
+            db_data = message[5:-1]
+        return cls(length=message[0:2], header=message[2:4], x_header=x_header, db_data=db_data, xor=xor)
+
+    @property
+    def data(self) -> bytearray:
+        data = bytearray([*self.header])
+        if self.x_header:
+            data.append(self.x_header)
+        data.extend(self.db_data)
+        if self.x_header:
+            data.append(self.xor)
+        data[0:0] = bytearray(struct.pack('<H', len(data) + 2))
+        return data
+
+
+def time_per_call(function: Callable[[], object]) -> float:
+    """
+    :returns: Best of 5 runs in nanoseconds per call.
+    """
+    return min(timeit.repeat(function, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+
+def bytes_per_message(parse: Callable[[], object]) -> float:
+    """
+    :returns: Memory in bytes which is held by one parsed message.
+    """
+    messages: List[object] = []
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    for _ in range(10000):
+        messages.append(parse())
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (end - start) / len(messages)
+
+
+def main():
+    # the legacy clients copied the received bytes into a bytearray first
+    legacy_parse = lambda: LegacyMessage.from_z21_message(bytearray(PACKET))  # noqa: E731
+    parse = lambda: Message.from_z21_message(PACKET)  # noqa: E731
+    legacy_message = legacy_parse()
+    message = parse()
+
+    results = [
+        ('parse', time_per_call(legacy_parse), time_per_call(parse)),
+        ('data', time_per_call(lambda: legacy_message.data), time_per_call(lambda: message.data)),
+    ]
+    print(f'{"benchmark":<12}{"legacy":>14}{"current":>14}{"speedup":>10}')
+    for name, legacy_ns, current_ns in results:
+        print(f'{name:<12}{legacy_ns:>11.0f} ns{current_ns:>11.0f} ns{legacy_ns / current_ns:>9.1f}x')
+    legacy_bytes = bytes_per_message(legacy_parse)
+    current_bytes = bytes_per_message(parse)
+    print(f'{"memory":<12}{legacy_bytes:>8.0f} B/msg{current_bytes:>8.0f} B/msg{legacy_bytes / current_bytes:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
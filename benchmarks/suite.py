@@ -0,0 +1,240 @@
+"""
+Benchmarks of the hot path from a received packet to the scheduled sounds.
+Audio is mocked, so neither sound files nor a sound card are required.
+
+The results are written as JSON, which allows to compare two commits.
+Run from the repository root via
+
+.. code-block:: shell
+
+    python3 -m benchmarks.suite --output before.json
+    # change something
+    python3 -m benchmarks.suite --output after.json --compare before.json
+
+``--compare`` exits with status 1 if a benchmark got slower than ``--threshold``.
+"""
+import argparse
+import contextlib
+import json
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+from loco_sound.loco import Loco, LocoCollector
+from loco_sound.z21 import LocoInfo, Message
+
+# LAN_X_LOCO_INFO of loco 3 at speed step 4 with F0 selected
+PACKET = bytes([0x0e, 0x00, 0x40, 0x00, 0xef, 0x00, 0x03, 0x04, 0x85, 0x10, 0x01, 0x00, 0x00, 0x7b])
+
+# a benchmark prepares the function to measure and returns it with the number of calls per run,
+# patches which are entered on the given stack stay active while the function is measured
+Benchmark = Callable[[contextlib.ExitStack], Tuple[Callable[[], object], int]]
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str) -> Callable[[Benchmark], Benchmark]:
+    """
+    Registers a benchmark of the suite.
+
+    :param name: Name of the benchmark within the results.
+    """
+    def register(function: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+@contextlib.contextmanager
+def mocked_audio() -> Iterator[None]:
+    """
+    Replaces the sound cache, the voice manager and the ambient mixer of the locos so
+    no sound gets loaded or played.
+    """
+    sound_cache = mock.Mock()
+    sound_cache.acquire.side_effect = lambda path: mock.Mock()
+    voice_manager = mock.Mock()
+    voice_manager.play.return_value = None
+    with mock.patch('loco_sound.loco.loco.sound_cache', sound_cache), \
+            mock.patch('loco_sound.loco.loco.voice_manager', voice_manager), \
+            mock.patch('loco_sound.loco.loco.AmbientMixer'):
+        yield
+
+
+class FakeClock:
+    """
+    Replaces :func:`time.monotonic_ns` so scheduled calls become due without waiting.
+    """
+    def __init__(self):
+        self.now: int = time.monotonic_ns()
+
+    def __call__(self) -> int:
+        return self.now
+
+
+@benchmark('message.from_z21_message')
+def message_from_z21_message(stack):
+    return lambda: Message.from_z21_message(PACKET), 100000
+
+
+@benchmark('message.data')
+def message_data(stack):
+    message = Message(
+        header=bytearray([0x40, 0x00]),
+        x_header=0xe3,
+        db_data=bytearray([0xf0, 0x00, 0x03]),
+    )
+    return lambda: message.data, 100000
+
+
+def _loco_info_benchmark(dcc_speed_steps: int) -> Benchmark:
+    message = Message.from_z21_message(LocoInfo(3, dcc_speed_steps, 1, 10, 0b10000001, 29).to_message().data)
+    return lambda stack: (lambda: LocoInfo.from_z21_response(message), 100000)
+
+
+for _steps in (14, 28, 126):
+    benchmark(f'loco_info.from_z21_response[{_steps}]')(_loco_info_benchmark(_steps))
+
+
+@benchmark('loco.functions_setter')
+def loco_functions_setter(stack):
+    stack.enter_context(mocked_audio())
+    loco = Loco(3)
+    states = [
+        {function_num: False for function_num in range(29)},
+        {function_num: function_num < 10 for function_num in range(29)},
+    ]
+    toggle = iter(range(sys.maxsize))
+
+    def set_functions():
+        # toggles F0 to F9 which includes the ambient loops and the horn
+        loco.functions = states[next(toggle) & 1]
+    return set_functions, 10000
+
+
+@benchmark('collector.update_from_message[duplicate]')
+def collector_update_from_message_duplicate(stack):
+    stack.enter_context(mocked_audio())
+    loco_collector = LocoCollector()
+    loco_collector.add_locos(Loco(3))
+    message = Message.from_z21_message(PACKET)
+    loco_collector.update_from_message(message)
+    return lambda: loco_collector.update_from_message(message), 100000
+
+
+@benchmark('collector.update_from_message[changed]')
+def collector_update_from_message_changed(stack):
+    stack.enter_context(mocked_audio())
+    loco_collector = LocoCollector()
+    loco_collector.add_locos(Loco(3))
+    messages = [
+        Message.from_z21_message(LocoInfo(3, 126, 1, 10, function_mask, 29).to_message().data)
+        for function_mask in (0b0, 0b100)
+    ]
+    toggle = iter(range(sys.maxsize))
+    return lambda: loco_collector.update_from_message(messages[next(toggle) & 1]), 10000
+
+
+def _execute_due_functions_benchmark(loco_count: int) -> Benchmark:
+    def setup(stack):
+        clock = FakeClock()
+        stack.enter_context(mocked_audio())
+        stack.enter_context(mock.patch('time.monotonic_ns', clock))
+        loco_collector = LocoCollector()
+        loco_collector.add_locos(*(Loco(address) for address in range(1, loco_count + 1)))
+        for address in range(1, loco_count + 1):
+            # different speeds spread the steam sounds of the locos
+            loco_collector[address].speed = 10 + address % 100
+
+        def tick():
+            # one tick of the main loop, one millisecond later than the previous
+            clock.now += 1_000_000
+            loco_collector.execute_due_functions()
+        return tick, 1000
+    return setup
+
+
+for _loco_count in (10, 100, 1000):
+    benchmark(f'collector.execute_due_functions[{_loco_count}]')(_execute_due_functions_benchmark(_loco_count))
+
+
+def run_benchmark(setup: Benchmark, repeat: int) -> Dict[str, float]:
+    """
+    :returns: Best and median time per call in nanoseconds of ``repeat`` runs.
+    """
+    with contextlib.ExitStack() as stack:
+        function, number = setup(stack)
+        timings = sorted(t / number * 1e9 for t in timeit.repeat(function, number=number, repeat=repeat))
+    return {
+        'best_ns': timings[0],
+        'median_ns': timings[len(timings) // 2],
+        'number': number,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """
+    Prints the change of each benchmark against ``baseline``.
+
+    :returns: Names of the benchmarks which got slower than ``threshold``.
+    """
+    regressions = []
+    print(f'{"benchmark":<44}{"baseline":>12}{"current":>12}{"change":>9}')
+    for name, result in results.items():
+        if name not in baseline:
+            print(f'{name:<44}{"-":>12}{result["best_ns"]:>9.0f} ns')
+            continue
+        change = result['best_ns'] / baseline[name]['best_ns'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  regression'
+        print(f'{name:<44}{baseline[name]["best_ns"]:>9.0f} ns{result["best_ns"]:>9.0f} ns{change:>+8.1%}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the loco sound benchmarks.')
+    parser.add_argument('--output', metavar='PATH', help='writes the results as JSON to PATH')
+    parser.add_argument('--compare', metavar='PATH', help='compares the results with a previous output')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slow down for --compare')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark')
+    parser.add_argument('--filter', default='', help='only runs benchmarks which contain FILTER')
+    args = parser.parse_args()
+
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        results[name] = run_benchmark(setup, args.repeat)
+        if not args.compare:
+            print(f'{name:<44}{results[name]["best_ns"]:>9.0f} ns')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+import yaml
+
+from loco_sound.loco.sound_package import LocoConfig, get_loco_class
+
+log = logging.getLogger(__name__)
+
+
+class StationConfig:
+    """
+    Configuration of a further z21 command station, see :ref:`configuration`.
+
+    :param name: Name of the station.
+    :param host: Hostname of the z21 of the station.
+    :param port: Port number of the z21 of the station.
+    :param locos: Config of each loco address of the station.
+    """
+    __slots__ = ('name', 'host', 'port', 'locos')
+
+    def __init__(self, name: str, host: str, port: int = 21105, locos: Optional[Dict[int, LocoConfig]] = None):
+        self.name: str = name
+        self.host: str = host
+        self.port: int = port
+        self.locos: Dict[int, LocoConfig] = locos or {}
+
+    def __repr__(self):
+        return f'StationConfig({self.name}: {self.host}:{self.port})'
+
+
+class Config:
+    """
+    Configuration of *loco sound* which is usually read from a
+    ``config.yaml`` via :func:`~from_file`, see :ref:`configuration`.
+
+    :param locos: Config of each loco address.
+    :param z21_host: Hostname of the z21 in your network.
+    :param z21_port: Port number of the z21
+    :param stations: Further z21 command stations by their name.
+    :param z21_packets_per_second: Maximum of queued packets per second to each z21,
+        see :class:`~loco_sound.z21.outbound.OutboundQueue`.
+    """
+    def __init__(
+            self,
+            locos: Optional[Dict[int, LocoConfig]] = None,
+            z21_host: str = '192.168.0.111',
+            z21_port: int = 21105,
+            stations: Optional[Dict[str, StationConfig]] = None,
+            z21_packets_per_second: float = 20.0,
+    ):
+        self.locos: Dict[int, LocoConfig] = locos or {}
+        self.z21_host: str = z21_host
+        self.z21_port: int = z21_port
+        self.stations: Dict[str, StationConfig] = stations or {}
+        self.z21_packets_per_second: float = z21_packets_per_second
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Config':
+        """
+        Reads a yaml configuration.
+
+        :param path: Path to the ``config.yaml``.
+        """
+        with open(path, 'r') as f:
+            config = cls.from_dict(yaml.safe_load(f) or {})
+        log.info(f'Loaded config of {len(config.locos)} locos from {path}')
+        return config
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'Config':
+        """
+        Parses the content of a configuration file.
+
+        :param data: Parsed yaml of the configuration.
+        """
+        z21 = data.get('z21') or {}
+        stations = {}
+        for name, station_data in (data.get('stations') or {}).items():
+            station_data = station_data or {}
+            if 'host' not in station_data:
+                raise ValueError(f'Station {name} needs a host')
+            stations[str(name)] = StationConfig(
+                name=str(name),
+                host=station_data['host'],
+                port=int(station_data.get('port', 21105)),
+                locos=cls._parse_locos(station_data.get('locos')),
+            )
+        return cls(
+            locos=cls._parse_locos(data.get('locos')),
+            z21_host=z21.get('host', '192.168.0.111'),
+            z21_port=int(z21.get('port', 21105)),
+            stations=stations,
+            z21_packets_per_second=float(z21.get('packets_per_second', 20.0)),
+        )
+
+    @staticmethod
+    def _parse_locos(data: Optional[Mapping[Any, Any]]) -> Dict[int, LocoConfig]:
+        locos: Dict[int, LocoConfig] = {}
+        for address, loco_data in (data or {}).items():
+            loco_data = loco_data or {}
+            sound_package = loco_data.get('sound_package', 'steam')
+            # fails early on typos instead of when the loco drives the first time
+            get_loco_class(sound_package)
+            sound_package_config = loco_data.get('sound_package_config') or {}
+            if isinstance(sound_package_config, list):
+                # allow a list of settings as well
+                sound_package_config = {k: v for settings in sound_package_config for k, v in settings.items()}
+            locos[int(address)] = LocoConfig(
+                address=int(address),
+                sound_package=sound_package,
+                name=loco_data.get('name'),
+                sound_package_config=sound_package_config,
+            )
+        return locos
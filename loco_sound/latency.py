@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# stages of a received packet in the order they are passed
+STAGE_PARSE = 'parse'
+STAGE_UPDATE_LOCOS = 'update_locos'
+STAGE_HANDLER = 'handler'
+STAGE_PLAY = 'play'
+STAGES = (STAGE_PARSE, STAGE_UPDATE_LOCOS, STAGE_HANDLER, STAGE_PLAY)
+
+# each power of two is split into 8 buckets, so a bucket is at most 12.5 % wide
+_SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+# values up to 2 ** 40 ns (about 18 minutes), larger values land in the last bucket
+_BUCKET_COUNT = (40 - _SUB_BUCKET_BITS + 1) * _SUB_BUCKETS
+
+
+def _bucket_index(value: int) -> int:
+    if value < 2 * _SUB_BUCKETS:
+        return max(value, 0)
+    exponent = value.bit_length() - _SUB_BUCKET_BITS - 1
+    return min((exponent << _SUB_BUCKET_BITS) + (value >> exponent), _BUCKET_COUNT - 1)
+
+
+def _bucket_upper_bound(index: int) -> int:
+    if index < 2 * _SUB_BUCKETS:
+        return index
+    exponent = (index >> _SUB_BUCKET_BITS) - 1
+    mantissa = (index & (_SUB_BUCKETS - 1)) + _SUB_BUCKETS
+    return ((mantissa + 1) << exponent) - 1
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies in nanoseconds with logarithmic buckets,
+    so recording a value is a single list increment.
+
+    :func:`~percentile` reports the upper bound of the bucket,
+    which is at most 12.5 % above the recorded value.
+    """
+    __slots__ = ('_buckets', 'count', 'max')
+
+    def __init__(self):
+        self._buckets: List[int] = [0] * _BUCKET_COUNT
+        self.count: int = 0
+        self.max: int = 0
+
+    def record(self, value: int) -> None:
+        """
+        :param value: Latency in nanoseconds.
+        """
+        self._buckets[_bucket_index(value)] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """
+        Adds the recorded values of ``other``.
+        """
+        self._buckets = [a + b for a, b in zip(self._buckets, other._buckets)]
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> Optional[int]:
+        """
+        :param percent: Percentile between 0 and 100.
+        :returns: Latency in nanoseconds or None if nothing was recorded.
+        """
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index, bucket in enumerate(self._buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(_bucket_upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Optional[int]]:
+        """
+        :returns: Count, 50th, 90th, 99th percentile and maximum in nanoseconds.
+        """
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class LatencyTracker:
+    """
+    Measures the time from receiving a packet of the z21 until each stage
+    of its processing is reached, see ``STAGES``, per stage and loco.
+
+    The receiving client calls :func:`~begin` with the receive timestamp,
+    each stage calls :func:`~mark` and :func:`~end` stops the trace, so
+    sounds of the scheduler which are played later are not counted.
+    As long as :attr:`enabled` is False the stages only check this flag.
+
+    :param enabled: Records latencies from the start.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled: bool = enabled
+        self._received: Optional[int] = None
+        self._histograms: DefaultDict[Tuple[str, Optional[int]], LatencyHistogram] = defaultdict(LatencyHistogram)
+
+    def begin(self, received: int) -> None:
+        """
+        Starts the trace of a received packet.
+
+        :param received: Receive timestamp, see :func:`time.monotonic_ns`.
+        """
+        self._received = received
+
+    def end(self) -> None:
+        """
+        Stops the trace of the current packet.
+        """
+        self._received = None
+
+    def mark(self, stage: str, loco_address: Optional[int] = None) -> None:
+        """
+        Records the time since the packet of the current trace was received.
+
+        :param stage: Reached stage, see ``STAGES``.
+        :param loco_address: Loco which is processed, if known.
+        """
+        received = self._received
+        if received is None:
+            return
+        self._histograms[stage, loco_address].record(time.monotonic_ns() - received)
+
+    def reset(self) -> None:
+        """
+        Drops all recorded latencies.
+        """
+        self._histograms.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :returns: Percentiles in nanoseconds of each stage over all locos and per loco.
+        """
+        summary: Dict[str, Dict[str, Any]] = {}
+        for stage in STAGES:
+            total = LatencyHistogram()
+            locos = {}
+            for (histogram_stage, loco_address), histogram in sorted(
+                    self._histograms.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+                if histogram_stage != stage:
+                    continue
+                total.merge(histogram)
+                if loco_address is not None:
+                    locos[str(loco_address)] = histogram.summary()
+            summary[stage] = {'all': total.summary(), 'locos': locos}
+        return summary
+
+    def dump(self, path: str) -> None:
+        """
+        Writes :func:`~summary` as JSON, the file gets replaced at once
+        so readers never see a partial file.
+
+        :param path: Path of the dump file.
+        """
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w') as dump_file:
+            json.dump(self.summary(), dump_file, indent=2)
+        os.replace(temporary_path, path)
+        log.debug(f'Dumped latencies to {path}')
+
+
+latency_tracker = LatencyTracker()
@@ -1,9 +1,13 @@
+from .scheduler import Scheduler
 from .loco import Loco
 from .collector import LocoCollector
 from .steam_loco import SteamLoco
+from .sound_package import LocoConfig
 
 __all__ = (
     'Loco',
     'SteamLoco',
     'LocoCollector',
+    'Scheduler',
+    'LocoConfig',
 )
@@ -1,9 +1,12 @@
 import logging
-from datetime import datetime
-from typing import Dict, List, Callable, Generator
+from typing import Dict, List, Mapping, Optional, Sequence, Union
 
+from loco_sound.latency import STAGE_UPDATE_LOCOS, latency_tracker
 from loco_sound.loco import Loco
-from loco_sound.z21 import LocoInfo
+from loco_sound.loco.scheduler import Scheduler
+from loco_sound.loco.sound_package import LocoConfig
+from loco_sound.sound.ambient_mixer import AmbientMixer
+from loco_sound.z21 import LocoInfo, Message
 
 log = logging.getLogger(__name__)
 
@@ -14,54 +17,188 @@ class LocoCollector:
     passes updates in form of :class:`~loco_sound.z21.LocoInfo` to a within a LocoCollector registered
     :class:`~Loco` and also checks if some scheduled functions needs to be called.
     This is necessary on a :class:`~SteamLoco`.
+
+    All registered locos share the :class:`~loco_sound.loco.scheduler.Scheduler`
+    of the collector so the costs of checking for due functions
+    do not depend on the number of locos.
+    They also share its :class:`~loco_sound.sound.ambient_mixer.AmbientMixer`,
+    so their looping sounds only occupy one mixer channel.
+
+    Locos of the ``loco_configs`` are only created, and load their sounds,
+    once the first :class:`~loco_sound.z21.LocoInfo` of their address arrives.
+
+    The z21 repeats the ``LAN_X_LOCO_INFO`` of a loco on each touch of a throttle,
+    :func:`~update_from_message` drops a message if its data bytes equal the
+    last message of the same address before it gets parsed.
+
+    :param loco_configs: Sound package of each configured loco address,
+        see :class:`~loco_sound.config.Config`.
     """
-    def __init__(self):
+    def __init__(self, loco_configs: Optional[Mapping[int, LocoConfig]] = None):
         self._locos: Dict[int, Loco] = dict()
+        self.loco_configs: Mapping[int, LocoConfig] = loco_configs or {}
+        self.scheduler: Scheduler = Scheduler()
+        self.ambient_mixer: AmbientMixer = AmbientMixer(self.scheduler)
+        # last frame of LAN_X_LOCO_INFO per address bytes
+        self._last_loco_info_data: Dict[int, bytes] = {}
+        self.duplicate_loco_infos: int = 0
+        self.new_loco_infos: int = 0
 
     def add_locos(self, *locos: Loco):
         """
         Registers a :class:`~loco_sound.loco.Loco` for information monitoring.
         """
         for loco in locos:
+            loco.scheduler = self.scheduler
+            loco.ambient_mixer = self.ambient_mixer
             self._locos[loco.loco_number] = loco
 
+    def remove_locos(self, *loco_numbers: int):
+        """
+        Unregisters locos and releases their sounds.
+
+        :param loco_numbers: Numbers of the locos which should be removed.
+        """
+        for loco_number in loco_numbers:
+            self.forget_loco_info(loco_number)
+            loco = self._locos.pop(loco_number, None)
+            if loco is not None:
+                loco.unload_sounds()
+
+    def clear(self):
+        """
+        Unregisters all locos and releases their sounds.
+        """
+        self.remove_locos(*list(self._locos))
+
     def update_locos(self, *loco_infos: LocoInfo):
         """
         Passes the received :class:`~LocoInfo` update to a registered :class:`~Loco` in our collector.
-        If the ``loco_address`` of :class:`~LocoInfo` is not registered we will ignore the info.
+        Configured locos are created on their first update.
+        If the ``loco_address`` of :class:`~LocoInfo` is neither registered nor configured
+        we will ignore the info.
 
         :param loco_infos: Received updates
         """
+        track_latency = latency_tracker.enabled
         for loco_info in loco_infos:
-            log.debug(f'Loco Update: {loco_info}')
-            if loco_info.loco_address in self._locos:
-                self._locos[loco_info.loco_address].update_from_loco_info(loco_info)
+            if track_latency:
+                latency_tracker.mark(STAGE_UPDATE_LOCOS, loco_info.loco_address)
+            log.debug('Loco Update: %s', loco_info)
+            loco = self._locos.get(loco_info.loco_address)
+            if loco is None:
+                loco = self._create_configured_loco(loco_info.loco_address)
+            if loco is not None:
+                loco.update_from_loco_info(loco_info)
+
+    def update_from_message(self, message: Message) -> bool:
+        """
+        Passes a received ``LAN_X_LOCO_INFO`` to :func:`~update_locos` unless
+        it is byte for byte the same as the last message of its address.
+
+        :param message: Message for which :func:`~loco_sound.z21.LocoInfo.is_loco_info` is True.
+        :returns: False if the message was dropped as duplicate.
+        """
+        # the whole frame is compared, length, header and xor byte of the same db_data are equal anyway;
+        # data is the received packet if it holds a single dataset, stacked datasets are copied once
+        data = message.data
+        key = data[5] << 8 | data[6] if len(data) >= 7 else -1
+        if self._last_loco_info_data.get(key) == data:
+            self.duplicate_loco_infos += 1
+            return False
+        self._last_loco_info_data[key] = data
+        self.new_loco_infos += 1
+        self.update_locos(LocoInfo.from_z21_response(message))
+        return True
 
-    def execute_due_functions(self):
+    def forget_loco_info(self, address: int) -> None:
+        """
+        Lets the next message of ``address`` pass :func:`~update_from_message`
+        even if it equals the last one, e.g. after the state of the loco was changed locally.
+
+        :param address: Loco address.
+        """
+        for key in [key for key in self._last_loco_info_data if key & 0x3fff == address]:
+            del self._last_loco_info_data[key]
+
+    def dedup_metrics(self) -> Dict[str, Union[int, float]]:
+        """
+        :returns: Number of new and duplicate ``LAN_X_LOCO_INFO`` messages of
+            :func:`~update_from_message` and the share of duplicates.
         """
-        Each registered :class:`~Loco` can store a set of functions
-        in the attribute ``scheduled_function_calls`` which should be executed in the future
+        total = self.duplicate_loco_infos + self.new_loco_infos
+        return {
+            'new': self.new_loco_infos,
+            'duplicate': self.duplicate_loco_infos,
+            'hit_rate': self.duplicate_loco_infos / total if total else 0.0,
+        }
+
+    def loco_info(self, loco_address: int) -> LocoInfo:
+        """
+        :param loco_address: Address of a registered loco.
+        :returns: Current state of the loco.
+        :raises KeyError: If the loco is not registered.
+        """
+        loco = self._locos[loco_address]
+        return LocoInfo(
+            loco_address=loco.loco_number,
+            dcc_speed_steps=loco.dcc_speed_steps,
+            direction=loco.direction,
+            speed=loco.speed,
+            function_mask=loco.functions.mask,
+            function_count=loco.functions.count,
+        )
+
+    def snapshot(self) -> List[LocoInfo]:
+        """
+        :returns: Current state of all registered locos, see :mod:`loco_sound.loco.snapshot`.
+        """
+        return [self.loco_info(loco_address) for loco_address in self._locos]
+
+    def restore(self, loco_infos: Sequence[LocoInfo]) -> None:
+        """
+        Restores the state of locos of a :func:`~snapshot`, so their running sounds
+        like the ambient loops start again before the z21 reports the locos.
+
+        :param loco_infos: State of the locos.
+        """
+        log.info(f'Restore state of {len(loco_infos)} locos')
+        self.update_locos(*loco_infos)
+
+    def _create_configured_loco(self, address: int) -> Optional[Loco]:
+        loco_config = self.loco_configs.get(address)
+        if loco_config is None:
+            return None
+        log.info(f'Create loco #{address} with sound package {loco_config.sound_package}')
+        loco = loco_config.create_loco(scheduler=self.scheduler, ambient_mixer=self.ambient_mixer)
+        self._locos[address] = loco
+        return loco
+
+    def execute_due_functions(self) -> int:
+        """
+        Each registered :class:`~Loco` can schedule functions on the
+        ``scheduler`` of the collector which should be executed in the future
         at a given timestamp.
 
         We check if these functions are due and if so we will execute them.
+
+        :returns: Number of executed functions.
         """
-        functions: List[Callable] = []
-        for loco in self._locos.values():
-            loco_function_times: List[datetime] = []
-            # if loco.scheduled_function_calls:
-            #     print(loco.scheduled_function_calls)
-            for function_time, function in loco.scheduled_function_calls.items():
-                if function_time <= datetime.now():
-                    # log.debug(f'{function} is now due')
-                    functions.append(function)
-                    loco_function_times.append(function_time)
-            for f in loco_function_times:
-                loco.scheduled_function_calls.pop(f)
-        for f in functions:
-            f()
-
-    def __getitem__(self, item):
+        return self.scheduler.run_due()
+
+    def next_deadline(self) -> Optional[int]:
+        """
+        Returns the timestamp of the next scheduled function call of all registered
+        :class:`~Loco` so a main loop can sleep until then.
+
+        :returns: Monotonic timestamp in nanoseconds of the next due function
+            or None if nothing is scheduled.
+        """
+        return self.scheduler.peek()
+
+    def __getitem__(self, item: int) -> Loco:
         if item not in self._locos.keys():
-            log.debug(f'Add loco #{item} to loco collector')
-            self._locos[item] = Loco(item)
+            if self._create_configured_loco(item) is None:
+                log.debug(f'Add loco #{item} to loco collector')
+                self._locos[item] = Loco(item, scheduler=self.scheduler, ambient_mixer=self.ambient_mixer)
         return self._locos[item]
@@ -1,5 +1,8 @@
-from loco_sound.loco import Loco
+from loco_sound.loco.engine_loco import EngineLoco
 
 
-class DieselLoco(Loco):
-    pass
+class DieselLoco(EngineLoco):
+    engine_sound = 'diesel_engine.wav'
+    min_pitch = 0.9
+    max_pitch = 1.7
+    min_gain = 0.6
@@ -1,5 +1,9 @@
-from loco_sound.loco import Loco
+from loco_sound.loco.engine_loco import EngineLoco
 
 
-class ElectricLoco(Loco):
-    pass
+class ElectricLoco(EngineLoco):
+    engine_sound = 'traction_motor.wav'
+    min_pitch = 0.5
+    max_pitch = 2.0
+    min_gain = 0.2
+    max_gain = 0.8
@@ -0,0 +1,61 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from loco_sound.loco.loco import Loco
+from loco_sound.sound.engine_loop import EngineLoop, pitch_variants
+
+
+class EngineLoco(Loco):
+    """
+    Loco which is driven by an engine or traction motors instead of steam.
+
+    The loop ``engine_sound`` is resampled once to ``pitch_bands`` pitches between
+    ``min_pitch`` and ``max_pitch`` when the loco is created. While the loco moves
+    an :class:`~loco_sound.sound.engine_loop.EngineLoop` crossfades between these
+    variants and follows the speed with its gain between ``min_gain`` and ``max_gain``.
+    """
+    engine_sound: str = 'engine.wav'
+    pitch_bands: int = 8
+    min_pitch: float = 0.8
+    max_pitch: float = 1.6
+    min_gain: float = 0.5
+    max_gain: float = 1.0
+    # nanoseconds to crossfade between two pitch variants
+    engine_crossfade: int = 200_000_000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pitches: Tuple[float, ...] = tuple(np.linspace(self.min_pitch, self.max_pitch, self.pitch_bands))
+        self._engine_variants = pitch_variants.acquire(
+            self.engine_sound,
+            self._load_sound(self.engine_sound),
+            self._pitches,
+        )
+        self._engine_loop: Optional[EngineLoop] = None
+
+    def unload_sounds(self):
+        super().unload_sounds()
+        if self._engine_variants:
+            pitch_variants.release(self.engine_sound, self._pitches)
+            self._engine_variants = []
+        self._engine_loop = None
+
+    def _update_drive_sound(self, old_speed: int):
+        """
+        Moves the engine loop to the pitch and gain of the new speed.
+
+        :param old_speed: Speed step before the change.
+        """
+        if self._engine_loop is None:
+            if not self._speed:
+                return
+            self._engine_loop = EngineLoop(
+                self._engine_variants,
+                self.ambient_mixer,
+                min_gain=self.min_gain,
+                max_gain=self.max_gain,
+                crossfade=self.engine_crossfade,
+                owner=self,
+            )
+        self._engine_loop.set_speed(self.speed_history.speed)
@@ -1,14 +1,21 @@
-import collections
 import logging
 from collections import defaultdict
 from copy import copy
-from typing import Callable, List, Dict, Optional, Deque, Tuple
-from datetime import datetime, timedelta
+from typing import Any, Callable, List, Dict, Mapping, Optional, Tuple
 import itertools
 
-import pygame
-
+from loco_sound.latency import STAGE_HANDLER, STAGE_PLAY, latency_tracker
+from loco_sound.log_writer import EVENT_FUNCTION, EVENT_PLAY, EVENT_SPEED, event_log
+from loco_sound.loco.scheduler import Scheduler, ScheduledCall
+from loco_sound.loco.speed_curve import SpeedCurve
+from loco_sound.loco.speed_history import SpeedHistory
+from loco_sound.sound.ambient_mixer import AmbientMixer, AmbientSource
+from loco_sound.sound.backend import Sound
+from loco_sound.sound.cache import sound_cache
+from loco_sound.sound.chuff_renderer import ChuffRenderer
+from loco_sound.sound.voice import PRIORITY_AMBIENT, PRIORITY_CHUFF, PRIORITY_HORN, Voice, voice_manager
 from loco_sound.z21 import LocoInfo
+from loco_sound.z21.functions import FUNCTION_COUNT, FunctionState, iter_function_numbers
 
 log = logging.getLogger(__name__)
 
@@ -17,39 +24,172 @@ class Loco:
     """
     This class has all the loco logic
 
+    A change of function ``n`` calls the method ``change_f_n`` if it
+    is declared by the class or one of its parents.
+    The methods are collected once when the class is defined, see
+    :func:`~build_function_handlers`.
+
     :param loco_number: The number of the locomotive you want to control.
-    :param scheduled_function_calls: Scheduled function calls.
+    :param scheduler: Scheduler for future function calls like the next steam sound.
+        A :class:`~loco_sound.loco.LocoCollector` replaces it by its shared scheduler.
+    :param stream_chuffs: Render the steam sounds sample accurate into a stream
+        via :class:`~loco_sound.sound.chuff_renderer.ChuffRenderer` instead of
+        playing each steam sound when it is due. Defaults to ``stream_chuffs`` of the class.
+    :param ambient_mixer: Mixer of the looping sounds of F6 and F9 if ``mix_ambient`` of the class is True.
+        A :class:`~loco_sound.loco.LocoCollector` replaces it by its shared mixer.
+    :param sound_package_config: ``sound_package_config`` of the loco, see :ref:`configuration`.
     """
-    def __init__(self, loco_number: int):
+    # change_f_* method for each function number, None if there is no method
+    _function_handlers: Tuple[Optional[Callable], ...] = ()
+    stream_chuffs: bool = False
+    # mix the looping sounds into the stream of an AmbientMixer instead of playing each on a channel of its own
+    mix_ambient: bool = True
+    # nanoseconds to fade a mixed loop in or out
+    ambient_fade: int = 300_000_000
+    # smoothed acceleration in top speeds per second which starts the brake sound or a wheel slip,
+    # see :class:`~loco_sound.loco.speed_history.SpeedHistory`
+    brake_deceleration: float = 0.3
+    slip_acceleration: float = 0.8
+    # play brakes.wav on hard braking, enabled per loco via ``brake_sound`` of the sound package config
+    play_brake_sound: bool = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)  # type: ignore
+        cls.build_function_handlers()
+
+    @classmethod
+    def build_function_handlers(cls):
+        """
+        Collects the ``change_f_*`` methods of all function numbers.
+        This is called automatically for :class:`~Loco` and its subclasses,
+        call it again if you add a method after the class was defined.
+        """
+        cls._function_handlers = tuple(
+            getattr(cls, f'change_f_{function_num}', None)
+            for function_num in range(FUNCTION_COUNT)
+        )
+
+    def __init__(
+            self,
+            loco_number: int,
+            scheduler: Optional[Scheduler] = None,
+            stream_chuffs: Optional[bool] = None,
+            ambient_mixer: Optional[AmbientMixer] = None,
+            sound_package_config: Optional[Mapping[str, Any]] = None,
+    ):
 
         self.loco_type_name: str = ''
         self._loco_number: int = loco_number
-        self._functions: dict = defaultdict(lambda: False)
+        self._function_mask: int = 0
+        self._function_count: int = 0
         self._speed: int = 0
-        self._speed_stack: Deque[Tuple[datetime, int]] = collections.deque(maxlen=5)
+        self.dcc_speed_steps: int = 126
+        self.speed_curve: SpeedCurve = SpeedCurve.from_config(sound_package_config)
+        self.speed_history: SpeedHistory = SpeedHistory()
+        if sound_package_config and 'brake_sound' in sound_package_config:
+            self.play_brake_sound = bool(sound_package_config['brake_sound'])
+        self._braking: bool = False
+        self._slipping: bool = False
         self.direction = 1  # 1 for forward, 0 for backward
-        self._last_steam_sound_time: Optional[datetime] = None
+        self._last_steam_sound_time: Optional[int] = None
         self._functions_observer: Dict[int, List[Callable]] = defaultdict(list)
-        self.scheduled_function_calls: Dict[datetime, Callable] = {}
-        self.f_sounds: Dict[int, pygame.mixer.Sound] = {
-            7: pygame.mixer.Sound('horn.wav'),
-            9: pygame.mixer.Sound('idle.wav'),
-            6: pygame.mixer.Sound('train.wav')
+        self.scheduler: Scheduler = scheduler if scheduler is not None else Scheduler()
+        self._next_steam_sound: Optional[ScheduledCall] = None
+        if stream_chuffs is not None:
+            self.stream_chuffs = stream_chuffs
+        self._chuff_renderer: Optional[ChuffRenderer] = None
+        self._sound_paths: List[str] = []
+        self._loop_voices: Dict[int, Voice] = {}
+        self.ambient_mixer: AmbientMixer = (
+            ambient_mixer if ambient_mixer is not None else AmbientMixer(self.scheduler)
+        )
+        self._ambient_sources: Dict[int, AmbientSource] = {}
+        self.f_sounds: Dict[int, Sound] = {
+            7: self._load_sound('horn.wav'),
+            9: self._load_sound('idle.wav'),
+            6: self._load_sound('train.wav')
         }
         self.steam_sounds = [
-            pygame.mixer.Sound('cyl_1_n.wav'),
-            pygame.mixer.Sound('cyl_2.wav'),
-            # pygame.mixer.Sound('cyl_2_n.wav')
+            self._load_sound('cyl_1_n.wav'),
+            self._load_sound('cyl_2.wav'),
+            # self._load_sound('cyl_2_n.wav')
         ]
         self.steam_iterator = iter(itertools.cycle(self.steam_sounds))
-        self.break_sound = pygame.mixer.Sound('brakes.wav')
+        self.break_sound = self._load_sound('brakes.wav')
         self.break_sound.set_volume(0.2)
-        self.start_sound = pygame.mixer.Sound('steam.wav')
+        self.start_sound = self._load_sound('steam.wav')
         self.start_sound.set_volume(0.15)
-        self._old_delta: Optional[timedelta] = None
+        self._old_delta: Optional[int] = None
+
+    def _load_sound(self, path: str) -> Sound:
+        """
+        Loads a sound via the shared :class:`~loco_sound.sound.cache.SoundCache`
+        so locos with the same sounds share the decoded buffer.
+
+        :param path: Path to the sound file.
+        """
+        sound = sound_cache.acquire(path)
+        self._sound_paths.append(path)
+        return sound
+
+    def unload_sounds(self):
+        """
+        Stops the looping sounds of the loco and releases its sounds
+        from the :class:`~loco_sound.sound.cache.SoundCache`.
+        """
+        self._cancel_next_steam_sound()
+        if self._chuff_renderer is not None:
+            self._chuff_renderer.close()
+            self._chuff_renderer = None
+        voice_manager.stop_all(self)
+        self._loop_voices.clear()
+        self.ambient_mixer.remove_sources(self)
+        self._ambient_sources.clear()
+        for path in self._sound_paths:
+            sound_cache.release(path)
+        self._sound_paths.clear()
+
+    def _play(self, sound: Sound, priority: int, loops: int = 0) -> Optional[Voice]:
+        """
+        Plays a sound of the loco via the :class:`~loco_sound.sound.voice.VoiceManager`.
+
+        :param sound: Sound which should be played.
+        :param priority: Priority of the sound, see ``loco_sound.sound.voice.PRIORITY_*``.
+        :param loops: Number of repeats, -1 loops forever.
+        """
+        if latency_tracker.enabled:
+            latency_tracker.mark(STAGE_PLAY, self._loco_number)
+        if event_log.enabled:
+            event_log.record(EVENT_PLAY, self._loco_number, priority, loops)
+        return voice_manager.play(sound, owner=self, priority=priority, loops=loops)
+
+    def _play_loop(self, function_num: int):
+        if self.mix_ambient:
+            if function_num not in self._ambient_sources:
+                if latency_tracker.enabled:
+                    latency_tracker.mark(STAGE_PLAY, self._loco_number)
+                if event_log.enabled:
+                    event_log.record(EVENT_PLAY, self._loco_number, PRIORITY_AMBIENT, -1)
+                self._ambient_sources[function_num] = self.ambient_mixer.add_source(
+                    self.f_sounds[function_num], fade=self.ambient_fade, owner=self,
+                )
+            return
+        voice = self._play(self.f_sounds[function_num], priority=PRIORITY_AMBIENT, loops=-1)
+        if voice is not None:
+            self._loop_voices[function_num] = voice
+
+    def _stop_loop(self, function_num: int):
+        source = self._ambient_sources.pop(function_num, None)
+        if source is not None:
+            self.ambient_mixer.remove_source(source, fade=self.ambient_fade)
+        # the sound is shared with other locos so we only stop our voice
+        voice = self._loop_voices.pop(function_num, None)
+        if voice is not None:
+            voice.stop()
 
     def update_from_loco_info(self, loco_info: LocoInfo):
-        self.functions = loco_info.functions
+        self.update_function_mask(loco_info.function_mask, loco_info.function_count)
+        self.dcc_speed_steps = loco_info.dcc_speed_steps
         self.speed = loco_info.speed
         assert loco_info.direction in (1, 0)
         self.direction = loco_info.direction
@@ -64,31 +204,63 @@ class Loco:
         return self._loco_number
 
     @property
-    def functions(self):
-        return self._functions
+    def functions(self) -> FunctionState:
+        return FunctionState(self._function_mask, self._function_count)
 
     @functions.setter
-    def functions(self, value: dict):
-        diff_keys = [k for k in value.keys() if self._functions.get(k) != value[k]]
-        for diff_key in diff_keys:
-            if diff_key < 10:
-                getattr(Loco, f'change_f_{diff_key}')(
-                    self=self,
-                    new_value=value[diff_key],
-                    old_value=self._functions.get(diff_key, False),
-                    all_functions=value
+    def functions(self, value: Mapping[int, bool]):
+        functions = FunctionState.from_dict(value)
+        self.update_function_mask(functions.mask, functions.count)
+
+    def update_function_mask(self, function_mask: int, function_count: int):
+        """
+        Sets the state of the first ``function_count`` functions and calls the ``change_f_*``
+        method and the observers of each function which was changed.
+        Functions beyond ``function_count`` keep their state, e.g. F29 to F31 if a
+        message of an older firmware does not contain them.
+
+        :param function_mask: Bitmask of the functions, bit ``n`` is set
+            if function ``n`` is selected.
+        :param function_count: Number of functions which are contained in ``function_mask``.
+        """
+        known_mask = (1 << function_count) - 1
+        function_mask = self._function_mask & ~known_mask | function_mask & known_mask
+        changed_mask = self._function_mask ^ function_mask
+        self._function_mask = function_mask
+        self._function_count = max(self._function_count, function_count)
+        if not changed_mask:
+            return
+        all_functions = FunctionState(function_mask, self._function_count)
+        function_handlers = self._function_handlers
+        functions_observer = self._functions_observer
+        track_latency = latency_tracker.enabled
+        track_events = event_log.enabled
+        for diff_key in iter_function_numbers(changed_mask):
+            new_value = bool(function_mask >> diff_key & 1)
+            if track_events:
+                event_log.record(EVENT_FUNCTION, self._loco_number, diff_key, new_value)
+            function_handler = function_handlers[diff_key] if diff_key < FUNCTION_COUNT else None
+            if function_handler is not None:
+                if track_latency:
+                    latency_tracker.mark(STAGE_HANDLER, self._loco_number)
+                function_handler(
+                    self,
+                    new_value=new_value,
+                    old_value=not new_value,
+                    all_functions=all_functions,
                 )
-            for callback in self._functions_observer.get(diff_key, []):
+            if diff_key not in functions_observer:
+                continue
+            for callback in functions_observer[diff_key]:
                 callback(
-                    new_value=value[diff_key],
-                    old_value=self._functions.get(diff_key, False),
-                    all_functions=value,
+                    new_value=new_value,
+                    old_value=not new_value,
+                    all_functions=all_functions,
                 )
-        self._functions = value
 
     @property
     def speed(self):
-        return self.speed
+        return self._speed
 
     @speed.setter
     def speed(self, value: int):
@@ -97,7 +269,7 @@ class Loco:
         if value != old_value:
             self.speed_changed(value, old_value)
 
-    def change_f_0(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_0(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         """
         Foo
 
@@ -105,87 +277,157 @@ class Loco:
         """
         pass
 
-    def change_f_1(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_1(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         pass
 
-    def change_f_2(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_2(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         pass
 
-    def change_f_3(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_3(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         pass
 
-    def change_f_4(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_4(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         pass
 
-    def change_f_5(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_5(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         pass
 
-    def change_f_6(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_6(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         if 6 in self.f_sounds:
             if new_value is True:
-                log.info(f'Start train ambient for {self}')
-                self.f_sounds[6].play(loops=-1)
+                log.info('Start train ambient for %s', self)
+                self._play_loop(6)
             else:
-                log.info(f'Stop train ambient for {self}')
-                self.f_sounds[6].stop()
+                log.info('Stop train ambient for %s', self)
+                self._stop_loop(6)
 
-    def change_f_7(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_7(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         if 7 in self.f_sounds:
-            log.info(f'Play horn of {self}')
-            self.f_sounds[7].play()
+            log.info('Play horn of %s', self)
+            self._play(self.f_sounds[7], priority=PRIORITY_HORN)
 
-    def change_f_8(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_8(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         pass
 
-    def change_f_9(self, new_value: bool, old_value: bool, all_functions: Dict[int, bool], *args, **kwargs):
+    def change_f_9(self, new_value: bool, old_value: bool, all_functions: Mapping[int, bool], *args, **kwargs):
         if 9 in self.f_sounds:
             if new_value is True:
-                log.info(f'Start ambient for {self}')
-                self.f_sounds[9].play(loops=-1)
+                log.info('Start ambient for %s', self)
+                self._play_loop(9)
             else:
-                log.info(f'Stop ambient for {self}')
-                self.f_sounds[9].stop()
+                log.info('Stop ambient for %s', self)
+                self._stop_loop(9)
 
     def speed_changed(self, new_value: int, old_value: int):
-        log.debug(f'Speed @ {new_value} for {self}')
-        self._speed_stack.append((datetime.now(), new_value))
-        self._play_and_schedule_next_sound(speed_update=True, old_speed=old_value)
+        log.debug('Speed @ %d for %s', new_value, self)
+        if event_log.enabled:
+            event_log.record(EVENT_SPEED, self._loco_number, new_value, old_value)
+        self.speed_history.append(new_value, self.dcc_speed_steps, self.scheduler.clock())
+        self._check_speed_triggers()
+        self._update_drive_sound(old_value)
+
+    def _update_drive_sound(self, old_speed: int):
+        """
+        Adapts the sound of the drive to the new speed, the steam chuffs of the loco.
+
+        :param old_speed: Speed step before the change.
+        """
+        if self.stream_chuffs:
+            self._update_chuff_stream()
+        else:
+            self._play_and_schedule_next_sound(speed_update=True, old_speed=old_speed)
+
+    def _check_speed_triggers(self):
+        """
+        Calls :func:`~brake_started` and :func:`~wheel_slip_started` once when the
+        smoothed acceleration of the :attr:`speed_history` crosses the thresholds
+        of the class.
+        """
+        acceleration = self.speed_history.acceleration
+        braking = self._speed > 0 and acceleration <= -self.brake_deceleration
+        if braking and not self._braking:
+            self.brake_started()
+        self._braking = braking
+        # wheels only slip while starting
+        slipping = self.speed_history.velocity < 0.3 and acceleration >= self.slip_acceleration
+        if slipping and not self._slipping:
+            self.wheel_slip_started()
+        self._slipping = slipping
+
+    def brake_started(self):
+        """
+        Called when the loco starts to brake hard,
+        plays the brake sound if ``play_brake_sound`` is set.
+        """
+        if not self.play_brake_sound:
+            return
+        log.debug('Brake squeal of %s', self)
+        self._play(self.break_sound, priority=PRIORITY_CHUFF)
+
+    def wheel_slip_started(self):
+        """
+        Called when the loco accelerates so hard from a low speed that its wheels
+        would slip, overwrite it to play a sound.
+        """
+        pass
+
+    def _steam_sound_interval(self) -> Optional[int]:
+        """
+        :returns: Time between two steam sounds at the current speed in nanoseconds
+            or None if the loco stands, see :class:`~loco_sound.loco.speed_curve.SpeedCurve`.
+        """
+        return self.speed_curve.interval(self._speed, self.dcc_speed_steps)
+
+    def _update_chuff_stream(self):
+        interval = self._steam_sound_interval()
+        if interval is None:
+            if self._chuff_renderer is not None:
+                self._chuff_renderer.set_interval(None)
+            return
+        if self._chuff_renderer is None:
+            self._chuff_renderer = ChuffRenderer(self.steam_sounds, scheduler=self.scheduler)
+        if not self._chuff_renderer.running:
+            self._play(self.start_sound, priority=PRIORITY_CHUFF)
+        self._chuff_renderer.set_interval(interval)
 
     def _play_and_schedule_next_sound(self, speed_update: bool = False, old_speed: Optional[int] = None):
-        if self._speed <= 0:
+        now_delta = self._steam_sound_interval()
+        if now_delta is None:
             # when stopping play brake sound and stop scheduling steam sounds
             # self.break_sound.play()
             self._old_delta = None
             self._last_steam_sound_time = None
+            self._cancel_next_steam_sound()
             return
 
-        # now_delta = timedelta(
-        #     milliseconds= int(1800 + (self._speed/126 * (-9500.5)))
-        # )
-        now_delta = timedelta(
-            milliseconds=int((4.6 * self._speed**(-0.75))*1000)
-        )
-        print(now_delta)
-
-        self.scheduled_function_calls = {}
+        self._cancel_next_steam_sound()
+        now = self.scheduler.clock()
         if speed_update:
             if self._last_steam_sound_time is None or self._old_delta is None:
                 # if starting we want to play a steam sound immediately
-                self.start_sound.play()
-                self.steam_iterator.__next__().play()
+                self._play(self.start_sound, priority=PRIORITY_CHUFF)
+                self._play(self.steam_iterator.__next__(), priority=PRIORITY_CHUFF)
                 self._old_delta = now_delta
-                self._last_steam_sound_time = datetime.now()
-            next_sound_time = self._last_steam_sound_time + ((now_delta + self._old_delta) / 2)
+                self._last_steam_sound_time = now
+            next_sound_time = self._last_steam_sound_time + ((now_delta + self._old_delta) // 2)
         else:
-            self.steam_iterator.__next__().play()
-            self._last_steam_sound_time = datetime.now()
-            next_sound_time = datetime.now() + now_delta
+            self._play(self.steam_iterator.__next__(), priority=PRIORITY_CHUFF)
+            self._last_steam_sound_time = now
+            next_sound_time = now + now_delta
             self._old_delta = now_delta
 
-        self.scheduled_function_calls[next_sound_time] = self._play_and_schedule_next_sound
+        self._next_steam_sound = self.scheduler.call_at(next_sound_time, self._play_and_schedule_next_sound)
+
+    def _cancel_next_steam_sound(self):
+        if self._next_steam_sound is not None:
+            self._next_steam_sound.cancel()
+            self._next_steam_sound = None
 
     def __str__(self):
         return f'Loco #{self.loco_number}'
 
     def __repr__(self):
         return self.__str__()
+
+
+Loco.build_function_handlers()
@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+class ScheduledCall:
+    """
+    A function call which is registered on a :class:`~Scheduler`.
+
+    :param deadline: Monotonic timestamp in nanoseconds, see :func:`time.monotonic_ns`.
+    :param sequence: Insertion counter so calls with the same deadline keep their order.
+    :param function: Function which gets called once the deadline is due.
+    """
+    __slots__ = ('deadline', 'sequence', 'function', 'cancelled')
+
+    def __init__(self, deadline: int, sequence: int, function: Callable[[], None]):
+        self.deadline: int = deadline
+        self.sequence: int = sequence
+        self.function: Callable[[], None] = function
+        self.cancelled: bool = False
+
+    def cancel(self) -> None:
+        """
+        Prevents the call from being executed.
+        The entry stays in the heap until it reaches the top.
+        """
+        self.cancelled = True
+
+    def __lt__(self, other: 'ScheduledCall') -> bool:
+        if self.deadline == other.deadline:
+            return self.sequence < other.sequence
+        return self.deadline < other.deadline
+
+    def __repr__(self):
+        return f'ScheduledCall({self.function} @ {self.deadline})'
+
+
+class Scheduler:
+    """
+    Priority queue of function calls which is shared by all locos
+    of a :class:`~loco_sound.loco.LocoCollector`.
+
+    Deadlines are taken from :func:`time.monotonic_ns` so changes
+    of the wall clock do not move the schedule and two calls at the same
+    instant do not overwrite each other.
+    Insertion is ``O(log n)``, cancellation marks the call which then gets
+    dropped once it reaches the top of the heap.
+
+    A main loop which sleeps until :func:`~peek` can set ``on_earlier_deadline``,
+    it gets called with the deadline of a call which is scheduled before all others,
+    so the loop wakes up in time no matter who scheduled the call.
+
+    :param clock: Returns the monotonic timestamp of now in nanoseconds, defaults to
+        :func:`time.monotonic_ns`, e.g. the clock of the
+        :class:`~loco_sound.sound.backend.OfflineBackend` which renders faster than realtime.
+    """
+    def __init__(self, clock: Optional[Callable[[], int]] = None):
+        self.clock: Callable[[], int] = clock if clock is not None else time.monotonic_ns
+        self.on_earlier_deadline: Optional[Callable[[int], None]] = None
+        self._heap: List[ScheduledCall] = []
+        self._counter = itertools.count()
+
+    def call_at(self, deadline: int, function: Callable[[], None]) -> ScheduledCall:
+        """
+        Schedules ``function`` at an absolute monotonic timestamp.
+
+        :param deadline: Timestamp in nanoseconds, see :func:`time.monotonic_ns`.
+        :param function: Function which gets called without arguments.
+        :returns: Handle which can be used to cancel the call.
+        """
+        scheduled_call = ScheduledCall(deadline, next(self._counter), function)
+        heapq.heappush(self._heap, scheduled_call)
+        if self._heap[0] is scheduled_call and self.on_earlier_deadline is not None:
+            self.on_earlier_deadline(deadline)
+        return scheduled_call
+
+    def call_later(self, delay: int, function: Callable[[], None]) -> ScheduledCall:
+        """
+        Schedules ``function`` relative to now.
+
+        :param delay: Delay in nanoseconds.
+        :param function: Function which gets called without arguments.
+        :returns: Handle which can be used to cancel the call.
+        """
+        return self.call_at(self.clock() + delay, function)
+
+    def peek(self) -> Optional[int]:
+        """
+        :returns: Monotonic timestamp in nanoseconds of the next due call
+            or None if nothing is scheduled.
+        """
+        heap = self._heap
+        while heap and heap[0].cancelled:
+            heapq.heappop(heap)
+        return heap[0].deadline if heap else None
+
+    def run_due(self, now: Optional[int] = None) -> int:
+        """
+        Executes all calls whose deadline is reached.
+        Calls which get scheduled by the executed functions are only
+        executed within this run if they are already due at ``now``.
+
+        :param now: Monotonic timestamp in nanoseconds, defaults to :attr:`clock`.
+        :returns: Number of executed calls.
+        """
+        if now is None:
+            now = self.clock()
+        heap = self._heap
+        executed = 0
+        while heap and heap[0].deadline <= now:
+            scheduled_call = heapq.heappop(heap)
+            if scheduled_call.cancelled:
+                continue
+            scheduled_call.function()
+            executed += 1
+        return executed
+
+    def __len__(self):
+        return sum(1 for scheduled_call in self._heap if not scheduled_call.cancelled)
@@ -0,0 +1,87 @@
+import logging
+import os
+import struct
+import time
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from loco_sound.z21 import LocoInfo
+
+log = logging.getLogger(__name__)
+
+# first bytes of a snapshot, the last byte is the version of the format
+SNAPSHOT_MAGIC = b'LSSNAP\x00\x01'
+
+# wall clock time of the snapshot and number of stations
+_HEADER = struct.Struct('<dH')
+# length of the name of a station and its number of locos
+_STATION = struct.Struct('<BH')
+# address, speed steps, direction, speed, function count and function mask of a loco
+_LOCO = struct.Struct('<HBBBBI')
+
+
+def write_snapshot(path: str, stations: Mapping[str, Sequence[LocoInfo]]) -> None:
+    """
+    Writes the state of the locos of each station to ``path``, see :func:`~read_snapshot`.
+    The file is replaced atomically so a crash never leaves a partial snapshot.
+
+    :param path: File of the snapshot.
+    :param stations: State of the locos by the name of their station.
+    """
+    parts = [SNAPSHOT_MAGIC, _HEADER.pack(time.time(), len(stations))]
+    for name, loco_infos in stations.items():
+        encoded_name = name.encode()
+        parts.append(_STATION.pack(len(encoded_name), len(loco_infos)))
+        parts.append(encoded_name)
+        for loco_info in loco_infos:
+            parts.append(_LOCO.pack(
+                loco_info.loco_address,
+                loco_info.dcc_speed_steps,
+                loco_info.direction,
+                loco_info.speed,
+                loco_info.function_count,
+                loco_info.function_mask & 0xffffffff,
+            ))
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as snapshot_file:
+        snapshot_file.write(b''.join(parts))
+    os.replace(temporary_path, path)
+
+
+def read_snapshot(path: str) -> Tuple[float, Dict[str, List[LocoInfo]]]:
+    """
+    Reads a snapshot of :func:`~write_snapshot`.
+
+    :param path: File of the snapshot.
+    :returns: Wall clock time of the snapshot and the state of the locos by the name of their station.
+    """
+    with open(path, 'rb') as snapshot_file:
+        data = snapshot_file.read()
+    if not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError(f'{path} is not a loco snapshot')
+    try:
+        offset = len(SNAPSHOT_MAGIC)
+        saved, station_count = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        stations: Dict[str, List[LocoInfo]] = {}
+        for _ in range(station_count):
+            name_length, loco_count = _STATION.unpack_from(data, offset)
+            offset += _STATION.size
+            name = data[offset:offset + name_length].decode()
+            offset += name_length
+            loco_infos = stations[name] = []
+            for _ in range(loco_count):
+                address, dcc_speed_steps, direction, speed, function_count, function_mask = _LOCO.unpack_from(
+                    data, offset,
+                )
+                offset += _LOCO.size
+                loco_infos.append(LocoInfo(
+                    loco_address=address,
+                    dcc_speed_steps=dcc_speed_steps,
+                    direction=direction,
+                    speed=speed,
+                    function_mask=function_mask,
+                    function_count=function_count,
+                ))
+    except struct.error:
+        raise ValueError(f'Snapshot {path} is truncated')
+    return saved, stations
@@ -0,0 +1,62 @@
+from typing import Any, Dict, Mapping, Optional, Type
+
+from loco_sound.loco.loco import Loco
+from loco_sound.loco.diesel_loco import DieselLoco
+from loco_sound.loco.electric_loco import ElectricLoco
+from loco_sound.loco.steam_loco import SteamLoco
+
+# maps the ``sound_package`` of the configuration to the class of the loco
+SOUND_PACKAGES: Dict[str, Type[Loco]] = {
+    'steam': SteamLoco,
+    'diesel': DieselLoco,
+    'electric': ElectricLoco,
+}
+
+
+def get_loco_class(sound_package: str) -> Type[Loco]:
+    """
+    Returns the class which implements a sound package.
+
+    :param sound_package: Name of the sound package, see ``SOUND_PACKAGES``.
+    """
+    try:
+        return SOUND_PACKAGES[sound_package]
+    except KeyError:
+        raise ValueError(f'Unknown sound package {sound_package!r}, choose one of {", ".join(SOUND_PACKAGES)}')
+
+
+class LocoConfig:
+    """
+    Configuration of a single loco address, see :ref:`configuration`.
+
+    :param address: Address of the loco.
+    :param sound_package: Name of the sound package, see
+        ``SOUND_PACKAGES``.
+    :param name: Name of the loco.
+    :param sound_package_config: Settings of the sound package.
+    """
+    __slots__ = ('address', 'sound_package', 'name', 'sound_package_config')
+
+    def __init__(
+            self,
+            address: int,
+            sound_package: str,
+            name: Optional[str] = None,
+            sound_package_config: Optional[Mapping[str, Any]] = None,
+    ):
+        self.address: int = address
+        self.sound_package: str = sound_package
+        self.name: Optional[str] = name
+        self.sound_package_config: Mapping[str, Any] = sound_package_config or {}
+
+    def __repr__(self):
+        return f'LocoConfig(#{self.address}: {self.sound_package})'
+
+    def create_loco(self, **kwargs) -> Loco:
+        """
+        Creates the loco of the sound package which loads its sounds.
+
+        :param kwargs: Further arguments of :class:`~loco_sound.loco.Loco`.
+        """
+        loco_class = get_loco_class(self.sound_package)
+        return loco_class(self.address, sound_package_config=self.sound_package_config, **kwargs)
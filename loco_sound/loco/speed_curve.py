@@ -0,0 +1,77 @@
+import logging
+import math
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# speed step modes of DCC which are reported by the z21
+SPEED_STEP_MODES = (14, 28, 126)
+
+
+class SpeedCurve:
+    """
+    Precomputed time between two steam sounds for each speed step of
+    each speed step mode, so scheduling the next steam sound is a lookup.
+
+    If ``wheel_radius`` and ``max_speed`` are given the interval follows the
+    rotation of the driving wheels: each revolution causes two exhaust
+    beats per cylinder and the top speed step corresponds to ``max_speed``.
+    Otherwise the measured curve ``4.6 * speed ** -0.75`` seconds
+    of a model with 126 speed steps is used.
+
+    :param wheel_radius: Radius of the driving wheels of the prototype in mm.
+    :param max_speed: Top speed of the prototype in km/h.
+    :param cylinders: Number of cylinders.
+    """
+    def __init__(
+            self,
+            wheel_radius: Optional[float] = None,
+            max_speed: Optional[float] = None,
+            cylinders: int = 2,
+    ):
+        self.wheel_radius = wheel_radius
+        self.max_speed = max_speed
+        self.cylinders = cylinders
+        self._tables: Dict[int, Tuple[Optional[int], ...]] = {
+            steps: tuple(self._calculate_interval(speed, steps) for speed in range(steps + 1))
+            for steps in SPEED_STEP_MODES
+        }
+
+    @classmethod
+    def from_config(cls, sound_package_config: Optional[Mapping[str, Any]]) -> 'SpeedCurve':
+        """
+        Creates the curve from the ``sound_package_config`` of a loco, see :ref:`configuration`.
+
+        :param sound_package_config: Config with the optional keys
+            ``wheel_radius``, ``max_speed`` and ``cylinders``.
+        """
+        config = sound_package_config or {}
+        return cls(
+            wheel_radius=config.get('wheel_radius'),
+            max_speed=config.get('max_speed'),
+            cylinders=config.get('cylinders', 2),
+        )
+
+    def _calculate_interval(self, speed: int, steps: int) -> Optional[int]:
+        """
+        :returns: Time between two steam sounds in nanoseconds or None if the loco stands.
+        """
+        if speed <= 0:
+            return None
+        if self.wheel_radius and self.max_speed:
+            velocity = self.max_speed / 3.6 * speed / steps  # m/s
+            revolutions = velocity / (2 * math.pi * self.wheel_radius / 1000)  # 1/s
+            return int(1e9 / (revolutions * 2 * self.cylinders))
+        # measured on a model with 126 speed steps
+        return int((4.6 * (speed * 126 / steps) ** (-0.75)) * 1e9)
+
+    def interval(self, speed: int, dcc_speed_steps: int = 126) -> Optional[int]:
+        """
+        :param speed: Speed step as reported by :class:`~loco_sound.z21.LocoInfo`.
+        :param dcc_speed_steps: Speed step mode, unknown modes use 126 steps.
+        :returns: Time between two steam sounds in nanoseconds or None if the loco stands.
+        """
+        table = self._tables.get(dcc_speed_steps)
+        if table is None:
+            table = self._tables[126]
+        return table[min(max(speed, 0), len(table) - 1)]
@@ -0,0 +1,80 @@
+import math
+import time
+from array import array
+from typing import List, Optional, Tuple
+
+
+class SpeedHistory:
+    """
+    Ring buffer of the last speed samples of a loco which keeps a smoothed
+    velocity and acceleration up to date on each sample, so triggers like
+    brake squeal or wheel slip do not need to look back through the history.
+
+    Speeds are stored relative to the speed step mode, 1.0 is the top speed,
+    so the acceleration is given in top speeds per second.
+    Both estimates are exponential moving averages whose weight depends on the
+    time since the previous sample, see ``time_constant``.
+
+    :param capacity: Number of samples which are kept.
+    :param time_constant: Seconds after which an old estimate only contributes ``1/e``.
+    """
+    __slots__ = (
+        'capacity', 'time_constant', '_timestamps', '_speeds', '_index', '_count',
+        'velocity', 'acceleration',
+    )
+
+    def __init__(self, capacity: int = 32, time_constant: float = 0.5):
+        self.capacity: int = capacity
+        self.time_constant: float = time_constant
+        self._timestamps = array('q', bytes(8 * capacity))
+        self._speeds = array('d', bytes(8 * capacity))
+        # index of the next sample
+        self._index: int = 0
+        self._count: int = 0
+        self.velocity: float = 0.0
+        self.acceleration: float = 0.0
+
+    def append(self, speed: int, dcc_speed_steps: int, timestamp: Optional[int] = None) -> None:
+        """
+        Adds a sample and updates :attr:`velocity` and :attr:`acceleration` in ``O(1)``.
+
+        :param speed: Speed step.
+        :param dcc_speed_steps: Speed step mode.
+        :param timestamp: Monotonic timestamp in nanoseconds, defaults to now.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        relative_speed = speed / dcc_speed_steps if dcc_speed_steps else 0.0
+        if self._count:
+            last = (self._index - 1) % self.capacity
+            delta = max(timestamp - self._timestamps[last], 1) / 1e9
+            weight = 1 - math.exp(-delta / self.time_constant)
+            rate = (relative_speed - self._speeds[last]) / delta
+            self.velocity += weight * (relative_speed - self.velocity)
+            self.acceleration += weight * (rate - self.acceleration)
+        else:
+            self.velocity = relative_speed
+        self._timestamps[self._index] = timestamp
+        self._speeds[self._index] = relative_speed
+        self._index = (self._index + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    @property
+    def speed(self) -> float:
+        """
+        Relative speed of the last sample.
+        """
+        return self._speeds[(self._index - 1) % self.capacity] if self._count else 0.0
+
+    def samples(self) -> List[Tuple[int, float]]:
+        """
+        :returns: Timestamp and relative speed of the kept samples, the oldest first.
+        """
+        start = self._index - self._count
+        return [
+            (self._timestamps[i % self.capacity], self._speeds[i % self.capacity])
+            for i in range(start, self._index)
+        ]
+
+    def __len__(self):
+        return self._count
@@ -0,0 +1,141 @@
+import logging
+import logging.handlers
+import queue
+import struct
+import threading
+import time
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# events of the binary event log
+EVENT_RECEIVE = 1
+EVENT_SPEED = 2
+EVENT_FUNCTION = 3
+EVENT_PLAY = 4
+EVENT_NAMES = {
+    EVENT_RECEIVE: 'receive',
+    EVENT_SPEED: 'speed',
+    EVENT_FUNCTION: 'function',
+    EVENT_PLAY: 'play',
+}
+
+# first bytes of an event log, the last byte is the version of the format
+EVENT_LOG_MAGIC = b'LSEVT\x00\x00\x02'
+
+# monotonic timestamp in nanoseconds, event, loco address and two values of the event
+_EVENT = struct.Struct('<QBHii')
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts the records into a queue without formatting them,
+    so ``log.debug('Received %s', message)`` only calls ``str(message)``
+    within the thread of the :class:`logging.handlers.QueueListener`
+    and only if a handler emits the record.
+
+    The arguments of a record are formatted later on, so only pass objects
+    which are not changed afterwards.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_log_writer(logger: logging.Logger, *handlers: logging.Handler) -> logging.handlers.QueueListener:
+    """
+    Moves the ``handlers`` of ``logger`` into a background thread, so writing to the
+    terminal or a file does not delay the event loop.
+
+    :param logger: Logger whose records should be written by the background thread,
+        usually the ``loco_sound`` logger.
+    :param handlers: Handlers which write the records.
+    :returns: Started listener, call :func:`logging.handlers.QueueListener.stop`
+        on shutdown to write the remaining records.
+    """
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(LazyQueueHandler(records))  # type: ignore
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)  # type: ignore
+    listener.start()
+    return listener
+
+
+class EventLog:
+    """
+    Compact binary log of the events on the hot path, see ``EVENT_*``.
+    Each event is a fixed size record which is written by a background thread,
+    see :func:`~read_event_log`.
+
+    As long as the log is not opened via :func:`~open` :attr:`enabled` is False
+    and the hot path only checks this flag.
+    """
+    def __init__(self):
+        self.enabled: bool = False
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self, path: str) -> None:
+        """
+        Starts writing the events to ``path``.
+
+        :param path: File which gets created or overwritten.
+        """
+        self.close()
+        event_file = open(path, 'wb')
+        event_file.write(EVENT_LOG_MAGIC)
+        self._thread = threading.Thread(target=self._write, args=(event_file,), name='event-log', daemon=True)
+        self._thread.start()
+        self.enabled = True
+        log.info(f'Write event log to {path}')
+
+    def record(self, event: int, loco_address: int = 0, value: int = 0, extra: int = 0) -> None:
+        """
+        Queues an event, the record is packed here so later changes
+        of the values do not matter.
+
+        :param event: Event, see ``EVENT_*``.
+        :param loco_address: Loco of the event.
+        :param value: E.g. the speed or the function number.
+        :param extra: E.g. the state of the function.
+        """
+        self._queue.put(_EVENT.pack(time.monotonic_ns(), event, loco_address, value, extra))
+
+    def close(self) -> None:
+        """
+        Writes the queued events and closes the file.
+        """
+        if self._thread is None:
+            return
+        self.enabled = False
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _write(self, event_file: BinaryIO) -> None:
+        with event_file:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                event_file.write(record)
+
+
+def read_event_log(path: str) -> Iterator[Tuple[int, str, int, int, int]]:
+    """
+    Reads an event log of :class:`~EventLog`.
+
+    :param path: File of the event log.
+    :returns: Iterator over the monotonic timestamp in nanoseconds, the name of
+        the event, the loco address and both values of each event.
+    """
+    with open(path, 'rb') as event_file:
+        if event_file.read(len(EVENT_LOG_MAGIC)) != EVENT_LOG_MAGIC:
+            raise ValueError(f'{path} is not an event log')
+        while True:
+            record = event_file.read(_EVENT.size)
+            if len(record) < _EVENT.size:
+                return
+            timestamp, event, loco_address, value, extra = _EVENT.unpack(record)
+            yield timestamp, EVENT_NAMES.get(event, str(event)), loco_address, value, extra
+
+
+event_log = EventLog()
@@ -0,0 +1,359 @@
+import logging
+import logging.handlers
+import multiprocessing
+import time
+from collections import defaultdict
+from typing import Callable, DefaultDict, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from loco_sound.log_writer import start_log_writer
+from loco_sound.loco import Loco, LocoCollector
+from loco_sound.loco.sound_package import LocoConfig
+from loco_sound.sound.backend import get_audio_backend
+from loco_sound.sound.cache import sound_cache
+from loco_sound.sound.pcm_cache import PcmCache
+from loco_sound.z21 import LocoInfo
+from loco_sound.z21.functions import FunctionState, iter_function_numbers
+
+log = logging.getLogger(__name__)
+
+# fields of a loco within the shared table and the event ring
+_ADDRESS, _DCC_SPEED_STEPS, _DIRECTION, _SPEED, _FUNCTION_MASK, _FUNCTION_COUNT = range(6)
+_LOCO_FIELDS = 6
+
+
+def _to_loco_info(fields: Sequence[int]) -> LocoInfo:
+    return LocoInfo(
+        loco_address=fields[_ADDRESS],
+        dcc_speed_steps=fields[_DCC_SPEED_STEPS],
+        direction=fields[_DIRECTION],
+        speed=fields[_SPEED],
+        function_mask=fields[_FUNCTION_MASK],
+        function_count=fields[_FUNCTION_COUNT],
+    )
+
+
+def _to_fields(loco_info: LocoInfo) -> Tuple[int, ...]:
+    return (
+        loco_info.loco_address,
+        loco_info.dcc_speed_steps,
+        loco_info.direction,
+        loco_info.speed,
+        loco_info.function_mask,
+        loco_info.function_count,
+    )
+
+
+class SharedLocoTable:
+    """
+    Latest state of each loco within shared memory, written by a single process
+    and read by others.
+
+    Plain stores into shared memory are not ordered between processes on CPUs
+    with a weak memory model like the ARM of a Raspberry Pi, so all accesses hold
+    a :func:`multiprocessing.Lock` whose semaphore acts as memory barrier.
+    It is only held while the fields of a slot are copied.
+
+    :param capacity: Maximum number of locos.
+    """
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self._slots = multiprocessing.RawArray('q', capacity * _LOCO_FIELDS)
+        self._used = multiprocessing.RawValue('q', 0)
+        self._lock = multiprocessing.Lock()
+        # only known by the writing process
+        self._slot_of_address: Dict[int, int] = {}
+
+    def write(self, loco_info: LocoInfo) -> bool:
+        """
+        Stores the state of a loco, must only be called by one process.
+
+        :param loco_info: State of the loco.
+        :returns: False if the table is full.
+        """
+        slot = self._slot_of_address.get(loco_info.loco_address)
+        if slot is None:
+            if len(self._slot_of_address) >= self.capacity:
+                log.warning(f'Shared loco table is full, drop loco #{loco_info.loco_address}')
+                return False
+            slot = self._slot_of_address[loco_info.loco_address] = len(self._slot_of_address)
+        offset = slot * _LOCO_FIELDS
+        fields = _to_fields(loco_info)
+        with self._lock:
+            self._slots[offset:offset + _LOCO_FIELDS] = fields
+            if slot == self._used.value:
+                # publish the slot once it is written
+                self._used.value = slot + 1
+        return True
+
+    def read(self, slot: int) -> LocoInfo:
+        """
+        :param slot: Index of the slot, smaller than :func:`~__len__`.
+        :returns: Consistent copy of the state in the slot.
+        """
+        offset = slot * _LOCO_FIELDS
+        with self._lock:
+            fields = self._slots[offset:offset + _LOCO_FIELDS]
+        return _to_loco_info(fields)
+
+    def snapshot(self) -> List[LocoInfo]:
+        """
+        :returns: State of all locos within the table.
+        """
+        with self._lock:
+            fields = self._slots[:self._used.value * _LOCO_FIELDS]
+        return [_to_loco_info(fields[offset:offset + _LOCO_FIELDS]) for offset in range(0, len(fields), _LOCO_FIELDS)]
+
+    def __len__(self):
+        with self._lock:
+            return int(self._used.value)
+
+
+class EventRing:
+    """
+    Single producer, single consumer ring of loco updates within shared memory.
+
+    The producer only moves ``head`` and the consumer only moves ``tail``,
+    both only grow and are mapped to the ring via modulo.
+    If the ring is full the update gets dropped and ``dropped`` increases,
+    the consumer then needs to read the :class:`~SharedLocoTable`.
+
+    Like the :class:`~SharedLocoTable` the ring is guarded by a :func:`multiprocessing.Lock`
+    so the consumer never sees a moved ``head`` before the update itself,
+    the lock is held while an update or all available updates are copied.
+
+    :param capacity: Number of updates the ring can hold.
+    """
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._events = multiprocessing.RawArray('q', capacity * _LOCO_FIELDS)
+        # head, tail and dropped
+        self._counters = multiprocessing.RawArray('q', 3)
+        self._lock = multiprocessing.Lock()
+
+    @property
+    def dropped(self) -> int:
+        """
+        Number of updates which did not fit into the ring.
+        """
+        with self._lock:
+            return int(self._counters[2])
+
+    def push(self, loco_info: LocoInfo) -> bool:
+        """
+        Appends an update, must only be called by the producer.
+
+        :param loco_info: Update of a loco.
+        :returns: False if the ring is full and the update was dropped.
+        """
+        fields = _to_fields(loco_info)
+        counters = self._counters
+        with self._lock:
+            head = counters[0]
+            if head - counters[1] >= self.capacity:
+                counters[2] += 1
+                return False
+            offset = (head % self.capacity) * _LOCO_FIELDS
+            self._events[offset:offset + _LOCO_FIELDS] = fields
+            counters[0] = head + 1
+        return True
+
+    def pop_all(self) -> List[LocoInfo]:
+        """
+        Takes all available updates, must only be called by the consumer.
+
+        :returns: Updates in the order they were pushed.
+        """
+        counters = self._counters
+        events = []
+        with self._lock:
+            tail = counters[1]
+            head = counters[0]
+            while tail < head:
+                offset = (tail % self.capacity) * _LOCO_FIELDS
+                events.append(self._events[offset:offset + _LOCO_FIELDS])
+                tail += 1
+            counters[1] = tail
+        return [_to_loco_info(fields) for fields in events]
+
+
+class SharedStateCollector(LocoCollector):
+    """
+    :class:`~loco_sound.loco.LocoCollector` of the network process when the sounds
+    are played by an :class:`~AudioProcess`.
+
+    Instead of updating locos it writes each update into a :class:`~SharedLocoTable`
+    and an :class:`~EventRing` which are read by the audio process.
+    Callbacks of :func:`~bind_to_functions` are called after the update was
+    handed to the audio process, so a slow callback does not delay a sound.
+    The audio process sleeps until ``wakeup`` is set by :func:`~update_locos`.
+    Duplicates are dropped as usual via :func:`~update_from_message`.
+
+    :param capacity: Maximum number of locos.
+    :param ring_capacity: Number of updates which can wait for the audio process.
+    """
+    def __init__(self, capacity: int = 256, ring_capacity: int = 1024):
+        super().__init__()
+        self.table = SharedLocoTable(capacity)
+        self.ring = EventRing(ring_capacity)
+        self.wakeup = multiprocessing.Event()
+        self._function_masks: Dict[int, int] = {}
+        self._functions_observer: DefaultDict[Tuple[int, int], List[Callable]] = defaultdict(list)
+
+    def bind_to_functions(self, callback: Callable, loco_address: int, function_num: int) -> None:
+        """
+        Calls ``callback(new_value, old_value, all_functions)`` within the network
+        process whenever the function of the loco changes,
+        see :func:`~loco_sound.loco.Loco.bind_to_functions`.
+
+        :param callback: Function which gets called.
+        :param loco_address: Address of the loco.
+        :param function_num: Number of the function.
+        """
+        self._functions_observer[loco_address, function_num].append(callback)
+
+    def update_locos(self, *loco_infos: LocoInfo):
+        """
+        Hands the updates to the audio process and calls the bound callbacks.
+
+        :param loco_infos: Received updates
+        """
+        for loco_info in loco_infos:
+            log.debug('Loco Update: %s', loco_info)
+            self.table.write(loco_info)
+            self.ring.push(loco_info)
+            old_mask = self._function_masks.get(loco_info.loco_address, 0)
+            # functions which are not contained in the update keep their state
+            known_mask = (1 << loco_info.function_count) - 1
+            new_mask = old_mask & ~known_mask | loco_info.function_mask & known_mask
+            self._function_masks[loco_info.loco_address] = new_mask
+            if self._functions_observer:
+                self._notify_observers(loco_info, old_mask, new_mask)
+        if loco_infos:
+            self.wakeup.set()
+
+    def _notify_observers(self, loco_info: LocoInfo, old_mask: int, new_mask: int) -> None:
+        all_functions: Optional[FunctionState] = None
+        for function_num in iter_function_numbers(old_mask ^ new_mask):
+            callbacks = self._functions_observer.get((loco_info.loco_address, function_num))
+            if not callbacks:
+                continue
+            if all_functions is None:
+                all_functions = loco_info.functions
+            new_value = bool(new_mask >> function_num & 1)
+            for callback in callbacks:
+                callback(new_value=new_value, old_value=not new_value, all_functions=all_functions)
+
+    def snapshot(self) -> List[LocoInfo]:
+        """
+        :returns: Latest state of all locos which were handed to the audio process.
+        """
+        return self.table.snapshot()
+
+    def loco_info(self, loco_address: int) -> LocoInfo:
+        """
+        :param loco_address: Address of a loco which was handed to the audio process.
+        :returns: Latest state of the loco.
+        :raises KeyError: If the loco never got an update.
+        """
+        for loco_info in self.table.snapshot():
+            if loco_info.loco_address == loco_address:
+                return loco_info
+        raise KeyError(loco_address)
+
+    def __getitem__(self, item: int) -> Loco:
+        raise TypeError(f'Loco #{item} is played by the audio process, use loco_info() for its state')
+
+
+class AudioProcess(multiprocessing.Process):
+    """
+    Plays the sounds of the locos in a process of its own.
+
+    The process owns the audio backend and a :class:`~loco_sound.loco.LocoCollector`
+    with the configured locos which receives the updates of a
+    :class:`~SharedStateCollector` and runs the scheduled sounds,
+    so network bursts and callbacks of the network process do not share its GIL.
+
+    :param shared_state: Collector of the network process.
+    :param loco_configs: Sound package of each configured loco address.
+    :param mixer_settings: Frequency, size, channels and buffer of the mixer.
+    :param poll_interval: Maximum seconds until new updates are read, by default
+        the process sleeps until it gets woken up by the :class:`~SharedStateCollector`
+        or the next scheduled sound is due.
+    :param log_handlers: Handlers which write the log of the process via a background thread,
+        on platforms which spawn processes they need to be picklable.
+    :param pcm_cache: Directory of a :class:`~loco_sound.sound.pcm_cache.PcmCache` to load the sounds from.
+    """
+    def __init__(
+            self,
+            shared_state: SharedStateCollector,
+            loco_configs: Mapping[int, LocoConfig],
+            mixer_settings: Tuple[int, int, int, int] = (44100, -16, 2, 256),
+            poll_interval: Optional[float] = None,
+            log_handlers: Sequence[logging.Handler] = (),
+            pcm_cache: Optional[str] = None,
+    ):
+        super().__init__(name='loco-sound-audio', daemon=True)
+        self.table = shared_state.table
+        self.ring = shared_state.ring
+        self.wakeup = shared_state.wakeup
+        self.loco_configs = dict(loco_configs)
+        self.mixer_settings = mixer_settings
+        self.poll_interval = poll_interval
+        self.log_handlers = list(log_handlers)
+        self.pcm_cache = pcm_cache
+        self._stop_event = multiprocessing.Event()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        Stops the process and waits until it exited.
+
+        :param timeout: Seconds to wait.
+        """
+        self._stop_event.set()
+        self.wakeup.set()
+        self.join(timeout)
+
+    def run(self) -> None:
+        log_writer = self._start_logging()
+        get_audio_backend().init(*self.mixer_settings)
+        if self.pcm_cache:
+            sound_cache.pcm_cache = PcmCache(self.pcm_cache)
+        loco_collector = LocoCollector(self.loco_configs)
+        log.info(f'Started audio process for {len(self.loco_configs)} locos')
+        try:
+            self._run(loco_collector)
+        finally:
+            loco_collector.clear()
+            if log_writer is not None:
+                log_writer.stop()
+
+    def _run(self, loco_collector: LocoCollector) -> None:
+        dropped = self.ring.dropped
+        while not self._stop_event.is_set():
+            # an update which is pushed after the clear sets it again
+            self.wakeup.clear()
+            loco_infos = self.ring.pop_all()
+            if self.ring.dropped != dropped:
+                # updates are missing, the table holds the latest state of every loco
+                dropped = self.ring.dropped
+                log.warning(f'Audio process missed {dropped} updates, read shared loco table')
+                loco_infos = self.table.snapshot()
+            if loco_infos:
+                loco_collector.update_locos(*loco_infos)
+            loco_collector.execute_due_functions()
+            timeout = self.poll_interval
+            deadline = loco_collector.next_deadline()
+            if deadline is not None:
+                delay = max(0, deadline - time.monotonic_ns()) / 1e9
+                timeout = delay if timeout is None else min(timeout, delay)
+            if timeout is None or timeout > 0:
+                self.wakeup.wait(timeout)
+
+    def _start_logging(self) -> Optional[logging.handlers.QueueListener]:
+        # the handlers of the parent are written by a thread which does not exist here
+        logger = logging.getLogger('loco_sound')
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        if not self.log_handlers:
+            return None
+        return start_log_writer(logger, *self.log_handlers)
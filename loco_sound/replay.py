@@ -0,0 +1,128 @@
+import logging
+import time
+from typing import Optional
+
+from loco_sound.latency import STAGE_PARSE, latency_tracker
+from loco_sound.log_writer import EVENT_RECEIVE, event_log
+from loco_sound.loco import LocoCollector
+from loco_sound.sound.backend import OfflineBackend
+from loco_sound.z21 import LocoInfo, Message
+from loco_sound.z21.recording import read_recording
+
+log = logging.getLogger(__name__)
+
+
+class Replayer:
+    """
+    Feeds a recording of the z21 traffic, see :class:`~loco_sound.z21.recording.Recorder`,
+    through the same pipeline as :class:`~loco_sound.runtime.Runtime`:
+    :func:`~loco_sound.z21.Message.from_z21_packet`,
+    :func:`~loco_sound.loco.LocoCollector.update_from_message`,
+    :func:`~loco_sound.z21.LocoInfo.from_z21_response` and
+    :func:`~loco_sound.loco.LocoCollector.update_locos`.
+    Latencies are traced from the replay of each datagram if the
+    :class:`~loco_sound.latency.LatencyTracker` is enabled.
+
+    This allows to benchmark and check *loco sound* without a z21 on the network.
+
+    :param loco_collector: Collector which receives the loco updates.
+    :param path: File of the recording.
+    """
+    def __init__(self, loco_collector: LocoCollector, path: str):
+        self.loco_collector = loco_collector
+        self.path = path
+        self.datagrams: int = 0
+        self.loco_infos: int = 0
+
+    def replay(self, realtime: bool = True) -> int:
+        """
+        Replays the recording.
+
+        :param realtime: Keeps the time between the datagrams and executes the
+            scheduled functions of the collector in between,
+            otherwise the datagrams are processed as fast as possible and the
+            due functions are only checked after each datagram.
+        :returns: Number of processed :class:`~loco_sound.z21.LocoInfo`.
+        """
+        start = time.monotonic_ns()
+        for timestamp, datagram in read_recording(self.path):
+            if realtime:
+                self._wait_until(start + timestamp)
+            self.process_datagram(datagram)
+            self.loco_collector.execute_due_functions()
+        log.info(f'Replayed {self.datagrams} datagrams with {self.loco_infos} loco infos of {self.path}')
+        return self.loco_infos
+
+    def render(self, backend: OfflineBackend, tail: int = 2_000_000_000) -> int:
+        """
+        Replays the recording on the virtual clock of an initialized ``backend``
+        as fast as possible. The scheduler of the collector uses the clock of the
+        backend, so each sound starts at the same frame as it would in realtime.
+
+        :param backend: Backend which renders the sounds.
+        :param tail: Nanoseconds which are rendered after the last datagram.
+        :returns: Number of processed :class:`~loco_sound.z21.LocoInfo`.
+        """
+        self.loco_collector.scheduler.clock = backend.now
+        for timestamp, datagram in read_recording(self.path):
+            self._render_until(backend, timestamp)
+            self.process_datagram(datagram)
+            self.loco_collector.execute_due_functions()
+        self._render_until(backend, backend.now() + tail)
+        log.info(f'Rendered {self.datagrams} datagrams with {self.loco_infos} loco infos of {self.path}')
+        return self.loco_infos
+
+    def process_datagram(self, datagram: bytes) -> None:
+        """
+        Passes all loco infos of a datagram to the collector.
+
+        :param datagram: Raw UDP payload received from the z21.
+        """
+        self.datagrams += 1
+        track_latency = latency_tracker.enabled
+        if track_latency:
+            received = time.monotonic_ns()
+            latency_tracker.begin(received)
+        if event_log.enabled:
+            event_log.record(EVENT_RECEIVE, value=len(datagram))
+        try:
+            messages = list(Message.from_z21_packet(datagram))
+        except AssertionError:
+            log.warning(f'Skip invalid z21 message {datagram!r}')
+            latency_tracker.end()
+            return
+        if track_latency:
+            latency_tracker.mark(STAGE_PARSE)
+        for message in messages:
+            if LocoInfo.is_loco_info(message):
+                self.loco_infos += 1
+                if track_latency:
+                    latency_tracker.begin(received)
+                self.loco_collector.update_from_message(message)
+        latency_tracker.end()
+
+    def _render_until(self, backend: OfflineBackend, deadline: int) -> None:
+        """
+        Renders until ``deadline`` and executes the functions which become due meanwhile.
+        """
+        while True:
+            next_deadline = self.loco_collector.next_deadline()
+            if next_deadline is None or next_deadline > deadline:
+                break
+            backend.advance_to(next_deadline)
+            self.loco_collector.execute_due_functions()
+        backend.advance_to(deadline)
+
+    def _wait_until(self, deadline: int) -> None:
+        """
+        Sleeps until ``deadline`` and executes the functions which become due meanwhile.
+        """
+        while True:
+            now = time.monotonic_ns()
+            if now >= deadline:
+                return
+            next_deadline: Optional[int] = self.loco_collector.next_deadline()
+            wake_up = deadline if next_deadline is None else min(deadline, next_deadline)
+            if wake_up > now:
+                time.sleep((wake_up - now) / 1e9)
+            self.loco_collector.execute_due_functions()
@@ -0,0 +1,279 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from loco_sound.latency import latency_tracker
+from loco_sound.loco import LocoCollector
+from loco_sound.loco.snapshot import read_snapshot, write_snapshot
+from loco_sound.z21 import AsyncClient, LocoInfo, Message
+from loco_sound.z21.recording import Recorder
+from loco_sound.z21.station_mux import StationMux
+
+log = logging.getLogger(__name__)
+
+
+class Runtime:
+    """
+    Event driven main loop of *loco sound* on top of :mod:`asyncio`.
+
+    Received UDP packets are passed to the :class:`~loco_sound.loco.LocoCollector`
+    as soon as they arrive and the scheduled function calls of the locos
+    are executed by a single timer via :func:`asyncio.AbstractEventLoop.call_at`
+    which gets re-armed to the next due function, a function which is scheduled
+    before the timer, e.g. by a restored loco, re-arms it at once.
+    The welcome message which keeps us registered on the z21 is sent by a
+    periodic task, so the process sleeps if nothing happens on the layout.
+
+    Further z21 command stations can be added via :func:`~add_station`,
+    all stations share one socket, see :class:`~loco_sound.z21.station_mux.StationMux`.
+
+    With a ``snapshot`` the state of the locos of all stations is saved periodically.
+    On start the saved state is restored and the current state of these locos is
+    requested from the z21 at once, see :func:`~loco_sound.z21.Client.poll_locos`,
+    so the sounds are back before the locos are reported again.
+
+    :param loco_collector: Collector which receives the loco updates of the z21.
+    :param host: Hostname of the z21 in your network.
+    :param port: Port number of the z21
+    :param welcome_interval: Seconds between two welcome messages to the z21.
+    :param local_port: Port we listen on, defaults to ``port``.
+    :param recorder: Writes every datagram received from the z21 into a recording,
+        datagrams of stations of :func:`~add_station` are not recorded.
+    :param latency_dump: Enables the :class:`~loco_sound.latency.LatencyTracker` and writes
+        its percentiles every ``latency_dump_interval`` seconds to this file.
+    :param latency_dump_interval: Seconds between two dumps of the latencies.
+    :param packets_per_second: Maximum of queued packets per second to each z21,
+        see :class:`~loco_sound.z21.outbound.OutboundQueue`.
+    :param snapshot: File of the snapshot of the state of the locos, see :mod:`loco_sound.loco.snapshot`.
+    :param snapshot_interval: Seconds between two snapshots.
+    """
+    def __init__(
+            self,
+            loco_collector: LocoCollector,
+            host: str = '192.168.0.111',
+            port: int = 21105,
+            welcome_interval: float = 30.0,
+            local_port: Optional[int] = None,
+            recorder: Optional[Recorder] = None,
+            latency_dump: Optional[str] = None,
+            latency_dump_interval: float = 10.0,
+            packets_per_second: float = 20.0,
+            snapshot: Optional[str] = None,
+            snapshot_interval: float = 5.0,
+    ):
+        self.loco_collector = loco_collector
+        self.host = host
+        self.port = port
+        self.welcome_interval = welcome_interval
+        self.local_port = local_port
+        self.recorder = recorder
+        self.latency_dump = latency_dump
+        self.latency_dump_interval = latency_dump_interval
+        self.packets_per_second = packets_per_second
+        self.snapshot = snapshot
+        self.snapshot_interval = snapshot_interval
+        # host, port and collector of each station
+        self.stations: Dict[str, Tuple[str, int, LocoCollector]] = {'z21': (host, port, loco_collector)}
+        self.mux: Optional[StationMux] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_deadline: Optional[int] = None
+        self._dispatching = False
+        self._stopped: Optional[asyncio.Future] = None
+
+    def add_station(self, name: str, loco_collector: LocoCollector, host: str, port: int = 21105) -> None:
+        """
+        Adds a further z21 command station before :func:`~run` is called.
+        Each station has its own collector, so the same loco address on
+        different stations belongs to different locos.
+
+        :param name: Name of the station.
+        :param loco_collector: Collector which receives the loco updates of the station.
+        :param host: Hostname of the z21 of the station.
+        :param port: Port number of the z21 of the station.
+        """
+        if name in self.stations:
+            raise ValueError(f'Station {name} already exists')
+        self.stations[name] = (host, port, loco_collector)
+
+    async def run(self) -> None:
+        """
+        Connects to the z21 and processes its messages until :func:`~stop` is called.
+        """
+        self._loop = asyncio.get_event_loop()
+        self._stopped = self._loop.create_future()
+        for _, _, loco_collector in self.stations.values():
+            loco_collector.scheduler.on_earlier_deadline = self._on_earlier_deadline
+        restored = self._restore_snapshot()
+        self._arm_timer()
+        clients = {
+            name: AsyncClient(
+                on_message=functools.partial(self.on_message, loco_collector=loco_collector),
+                host=host,
+                port=port,
+                recorder=self.recorder if loco_collector is self.loco_collector else None,
+                packets_per_second=self.packets_per_second,
+            )
+            for name, (host, port, loco_collector) in self.stations.items()
+        }
+        self.mux = await StationMux.connect(
+            clients,
+            local_port=self.port if self.local_port is None else self.local_port,
+        )
+        for name, client in clients.items():
+            client.send_welcome()
+            client.subscribe_to_all_locos()
+            if restored.get(name):
+                # the restored state may be outdated
+                client.poll_locos(restored[name])
+        tasks = [self._loop.create_task(self._keep_alive())]
+        if self.snapshot is not None:
+            tasks.append(self._loop.create_task(self._save_snapshots(self.snapshot)))
+        if self.latency_dump is not None:
+            latency_tracker.enabled = True
+            tasks.append(self._loop.create_task(self._dump_latencies(self.latency_dump)))
+        try:
+            await self._stopped
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for _, _, loco_collector in self.stations.values():
+                loco_collector.scheduler.on_earlier_deadline = None
+            self._cancel_timer()
+            if self.latency_dump is not None:
+                latency_tracker.dump(self.latency_dump)
+            if self.snapshot is not None:
+                self._write_snapshot(self.snapshot)
+
+    def stop(self) -> None:
+        """
+        Lets :func:`~run` return.
+        """
+        if self._stopped is not None and not self._stopped.done():
+            self._stopped.set_result(None)
+
+    def close(self) -> None:
+        """
+        Logs off from the z21.
+        """
+        self._cancel_timer()
+        if self.mux is not None:
+            self.mux.close()
+            self.mux = None
+        for name, (_, _, loco_collector) in self.stations.items():
+            metrics = loco_collector.dedup_metrics()
+            log.info(
+                f'Dropped {metrics["duplicate"]} of {metrics["duplicate"] + metrics["new"]} '
+                f'loco infos of {name} as duplicate'
+            )
+
+    def on_message(self, message: Message, loco_collector: Optional[LocoCollector] = None) -> None:
+        """
+        Passes a received :class:`~loco_sound.z21.Message` to the collector of its station,
+        see :func:`~loco_sound.loco.LocoCollector.update_from_message`.
+
+        :param message: Message received from the z21.
+        :param loco_collector: Collector of the station, defaults to ``loco_collector`` of the runtime.
+        """
+        if not LocoInfo.is_loco_info(message):
+            log.debug('Ignore non loco info message %s', message)
+            return
+        # the timer is armed once after all due functions were executed
+        self._dispatching = True
+        try:
+            (loco_collector or self.loco_collector).update_from_message(message)
+        finally:
+            self._dispatching = False
+        # sounds of the scheduler are not caused by this message
+        latency_tracker.end()
+        self._execute_due_functions()
+
+    def _execute_due_functions(self) -> None:
+        self._timer = None
+        self._timer_deadline = None
+        self._dispatching = True
+        try:
+            for _, _, loco_collector in self.stations.values():
+                loco_collector.execute_due_functions()
+        finally:
+            self._dispatching = False
+        self._arm_timer()
+
+    def _on_earlier_deadline(self, deadline: int) -> None:
+        if self._dispatching or self._loop is None:
+            return
+        if self._timer_deadline is None or deadline < self._timer_deadline:
+            self._arm_timer()
+
+    def _arm_timer(self) -> None:
+        """
+        Schedules the timer to the next due function of all collectors.
+        """
+        self._cancel_timer()
+        deadlines = [
+            deadline for deadline in (
+                loco_collector.next_deadline() for _, _, loco_collector in self.stations.values()
+            ) if deadline is not None
+        ]
+        if not deadlines or self._loop is None:
+            return
+        deadline = min(deadlines)
+        delay = max(0, deadline - time.monotonic_ns()) / 1e9
+        self._timer_deadline = deadline
+        self._timer = self._loop.call_at(self._loop.time() + delay, self._execute_due_functions)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_deadline = None
+
+    def _restore_snapshot(self) -> Dict[str, List[int]]:
+        """
+        Restores the state of the locos of each station from the snapshot.
+
+        :returns: Addresses of the restored locos by the name of their station.
+        """
+        if self.snapshot is None or not os.path.exists(self.snapshot):
+            return {}
+        try:
+            saved, stations = read_snapshot(self.snapshot)
+        except ValueError as e:
+            log.warning(f'Ignore snapshot: {e}')
+            return {}
+        log.info(f'Restore snapshot {self.snapshot} of {time.time() - saved:.0f} seconds ago')
+        restored = {}
+        for name, loco_infos in stations.items():
+            if name not in self.stations:
+                log.warning(f'Ignore snapshot of unknown station {name}')
+                continue
+            self.stations[name][2].restore(loco_infos)
+            restored[name] = [loco_info.loco_address for loco_info in loco_infos]
+        return restored
+
+    def _write_snapshot(self, path: str) -> None:
+        write_snapshot(path, {
+            name: loco_collector.snapshot()
+            for name, (_, _, loco_collector) in self.stations.items()
+        })
+
+    async def _save_snapshots(self, path: str) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            self._write_snapshot(path)
+
+    async def _dump_latencies(self, path: str) -> None:
+        while True:
+            await asyncio.sleep(self.latency_dump_interval)
+            latency_tracker.dump(path)
+
+    async def _keep_alive(self) -> None:
+        while True:
+            await asyncio.sleep(self.welcome_interval)
+            if self.mux is not None:
+                for client in self.mux.clients.values():
+                    client.send_welcome()
@@ -0,0 +1,251 @@
+import logging
+from typing import TYPE_CHECKING, Any, List, Optional
+
+import numpy as np
+
+from loco_sound.sound.backend import Channel, Sound, get_audio_backend
+from loco_sound.sound.cache import sound_cache
+from loco_sound.sound.voice import voice_manager
+
+if TYPE_CHECKING:
+    # the loco package imports this module
+    from loco_sound.loco.scheduler import Scheduler, ScheduledCall
+
+log = logging.getLogger(__name__)
+
+
+class AmbientSource:
+    """
+    A looping sound of an :class:`~AmbientMixer`, change its gain via
+    :func:`~AmbientMixer.set_gain`.
+
+    :param samples: Frames of the sound as signed 16 bit integers.
+    :param gain: Current gain, 1.0 plays the sound unchanged.
+    :param owner: Object which added the source, e.g. a :class:`~loco_sound.loco.Loco`.
+    """
+    __slots__ = ('samples', 'gain', 'target_gain', 'gain_step', 'fade_frames', 'position', 'owner', 'removed')
+
+    def __init__(self, samples: np.ndarray, gain: float = 1.0, owner: Any = None):
+        self.samples: np.ndarray = samples
+        self.gain: float = gain
+        self.target_gain: float = gain
+        # change of the gain per frame while fading
+        self.gain_step: float = 0.0
+        self.fade_frames: int = 0
+        self.position: int = 0
+        self.owner: Any = owner
+        # dropped once faded out
+        self.removed: bool = False
+
+    @property
+    def audible(self) -> bool:
+        """
+        False if the source is silent and stays silent, so it is skipped while mixing.
+        """
+        return self.gain != 0 or self.target_gain != 0
+
+    def __repr__(self):
+        return f'AmbientSource(of {self.owner}, gain {self.gain:.2f})'
+
+
+class AmbientMixer:
+    """
+    Mixes any number of looping sounds, e.g. the ambient sounds of locos and buildings,
+    into a single stream which is queued block by block to one mixer channel,
+    similar to the :class:`~loco_sound.sound.chuff_renderer.ChuffRenderer`.
+
+    Each block is mixed via :mod:`numpy` with the gain of each source,
+    fades change the gain linear per frame.
+    Silent sources cost nothing and the stream stops while all sources are silent.
+
+    The mixer channel is reserved once the first source gets added.
+
+    :param scheduler: Scheduler which calls us to queue the next block.
+    :param channel: Mixer channel which plays the stream, defaults to a
+        new reserved channel, see :func:`~loco_sound.sound.voice.VoiceManager.reserve_channel`.
+    :param block_frames: Number of frames of each queued block.
+    """
+    def __init__(
+            self,
+            scheduler: 'Scheduler',
+            channel: Optional[Channel] = None,
+            block_frames: int = 2048,
+    ):
+        self.scheduler = scheduler
+        self.channel = channel
+        self.block_frames = block_frames
+        self.frequency: int = 0
+        self.channels: int = 0
+        self._sources: List[AmbientSource] = []
+        self._block: Optional[np.ndarray] = None
+        self._next_pump: Optional['ScheduledCall'] = None
+
+    @property
+    def running(self) -> bool:
+        """
+        True while blocks are mixed and queued.
+        """
+        return self._next_pump is not None
+
+    def _init_stream(self) -> None:
+        if self._block is not None:
+            return
+        self.frequency, sample_format, self.channels = get_audio_backend().require_init()
+        assert sample_format == -16, 'Ambient mixer requires a signed 16 bit mixer'
+        if self.channel is None:
+            self.channel = voice_manager.reserve_channel()
+        self._block = np.zeros((self.block_frames, self.channels), dtype=np.float32)
+
+    def _fade_frames(self, fade: int) -> int:
+        return fade * self.frequency // 1_000_000_000
+
+    def add_source(
+            self,
+            sound: Sound,
+            gain: float = 1.0,
+            fade: int = 0,
+            owner: Any = None,
+    ) -> AmbientSource:
+        """
+        Starts to loop ``sound``.
+
+        :param sound: Sound which should be looped.
+        :param gain: Gain of the source.
+        :param fade: Nanoseconds to fade in from silence.
+        :param owner: Object which adds the source, see :func:`~remove_sources`.
+        :returns: The source.
+        """
+        self._init_stream()
+        return self.add_samples(sound_cache.samples(sound), gain, fade, owner)
+
+    def add_samples(
+            self,
+            samples: np.ndarray,
+            gain: float = 1.0,
+            fade: int = 0,
+            owner: Any = None,
+            position: int = 0,
+    ) -> AmbientSource:
+        """
+        Starts to loop already decoded frames, see :func:`~add_source`.
+
+        :param samples: Frames in the format of the mixer as signed 16 bit integers.
+        :param gain: Gain of the source.
+        :param fade: Nanoseconds to fade in from silence.
+        :param owner: Object which adds the source, see :func:`~remove_sources`.
+        :param position: Frame of ``samples`` to start at.
+        :returns: The source.
+        """
+        self._init_stream()
+        source = AmbientSource(samples, gain=0.0 if fade else gain, owner=owner)
+        source.position = position % len(samples)
+        self._sources.append(source)
+        self.set_gain(source, gain, fade)
+        return source
+
+    def set_gain(self, source: AmbientSource, gain: float, fade: int = 0) -> None:
+        """
+        Changes the gain of a source.
+
+        :param source: Source of this mixer.
+        :param gain: New gain.
+        :param fade: Nanoseconds to reach the new gain.
+        """
+        frames = self._fade_frames(fade)
+        source.target_gain = gain
+        if frames > 0:
+            source.fade_frames = frames
+            source.gain_step = (gain - source.gain) / frames
+        else:
+            source.fade_frames = 0
+            source.gain = gain
+        if source.audible and not self.running:
+            self.pump()
+
+    def remove_source(self, source: AmbientSource, fade: int = 0) -> None:
+        """
+        Fades out a source and drops it afterwards.
+
+        :param source: Source of this mixer.
+        :param fade: Nanoseconds to fade out.
+        """
+        source.removed = True
+        self.set_gain(source, 0.0, fade)
+
+    def remove_sources(self, owner: Any) -> None:
+        """
+        Drops all sources of ``owner`` immediately.
+
+        :param owner: Owner of the sources.
+        """
+        self._sources = [source for source in self._sources if source.owner is not owner]
+
+    def render_block(self) -> np.ndarray:
+        """
+        Mixes the next block of all audible sources.
+
+        :returns: Block as signed 16 bit frames.
+        """
+        self._init_stream()
+        block = self._block
+        assert block is not None
+        block[:] = 0
+        block_frames = self.block_frames
+        for source in self._sources:
+            if not source.audible:
+                continue
+            samples = source.samples
+            end = source.position + block_frames
+            if end <= len(samples):
+                frames = samples[source.position:end]
+            else:
+                frames = samples.take(np.arange(source.position, end) % len(samples), axis=0)
+            source.position = end % len(samples)
+            if source.fade_frames:
+                fading = min(source.fade_frames, block_frames)
+                gains = np.full(block_frames, source.target_gain, dtype=np.float32)
+                gains[:fading] = source.gain + source.gain_step * np.arange(1, fading + 1, dtype=np.float32)
+                block += frames * gains[:, np.newaxis]
+                source.fade_frames -= fading
+                source.gain = source.target_gain if not source.fade_frames else float(gains[fading - 1])
+            else:
+                block += frames * np.float32(source.gain)
+        self._sources = [source for source in self._sources if source.audible or not source.removed]
+        rendered: np.ndarray = np.clip(block, -32768, 32767).astype(np.int16)
+        return rendered
+
+    def pump(self) -> None:
+        """
+        Queues the next block if the channel has no queued block and schedules
+        the next check after half a block.
+        Stops if all sources are silent.
+        """
+        self._next_pump = None
+        if not any(source.audible for source in self._sources):
+            return
+        channel = self.channel
+        assert channel is not None
+        if channel.get_queue() is None:
+            sound = get_audio_backend().sound(self.render_block().tobytes())
+            if channel.get_busy():
+                channel.queue(sound)
+            else:
+                channel.play(sound)
+        self._next_pump = self.scheduler.call_later(
+            self.block_frames * 1_000_000_000 // (2 * self.frequency),
+            self.pump,
+        )
+
+    def stop(self) -> None:
+        """
+        Drops all sources and stops the stream immediately.
+        """
+        self._sources.clear()
+        if self._next_pump is not None:
+            self._next_pump.cancel()
+            self._next_pump = None
+        if self.channel is not None:
+            self.channel.stop()
+
+    def __len__(self):
+        return len(self._sources)
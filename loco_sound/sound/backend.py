@@ -0,0 +1,442 @@
+import logging
+import time
+import wave
+from typing import Any, Generic, List, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+import pygame
+
+log = logging.getLogger(__name__)
+
+# frequency, sample format and channels, see :func:`pygame.mixer.get_init`
+MixerFormat = Tuple[int, int, int]
+# raw frames in the format of a backend
+Frames = Union[bytes, memoryview, np.ndarray]
+
+# sound and channel type of a backend
+SoundT = TypeVar('SoundT')
+ChannelT = TypeVar('ChannelT')
+
+
+class PcmSound:
+    """
+    Sound of a :class:`~PcmBackend` with the subset of the interface
+    of :class:`pygame.mixer.Sound` which is used by *loco sound*.
+
+    :param frames: Frames in the format of the backend as signed 16 bit integers.
+    :param frequency: Frequency of the frames.
+    """
+    __slots__ = ('frames', 'frequency', '_volume')
+
+    def __init__(self, frames: np.ndarray, frequency: int):
+        self.frames: np.ndarray = frames
+        self.frequency: int = frequency
+        self._volume: float = 1.0
+
+    def get_raw(self) -> bytes:
+        return self.frames.tobytes()
+
+    def get_length(self) -> float:
+        return len(self.frames) / self.frequency
+
+    def get_volume(self) -> float:
+        return self._volume
+
+    def set_volume(self, value: float) -> None:
+        self._volume = min(max(value, 0.0), 1.0)
+
+
+class PcmChannel:
+    """
+    Channel of a :class:`~PcmBackend` with the subset of the interface
+    of :class:`pygame.mixer.Channel` which is used by *loco sound*.
+
+    :param backend: Backend which mixes the channel.
+    """
+    def __init__(self, backend: 'PcmBackend'):
+        self.backend = backend
+        self._sound: Optional[PcmSound] = None
+        self._queued: Optional[PcmSound] = None
+        self._position: int = 0
+        self._loops: int = 0
+        self._volume: float = 1.0
+
+    def play(self, sound: PcmSound, loops: int = 0) -> None:
+        self.backend.catch_up()
+        self._sound = sound
+        self._queued = None
+        self._position = 0
+        self._loops = loops
+
+    def queue(self, sound: PcmSound) -> None:
+        self.backend.catch_up()
+        if self._sound is None:
+            self.play(sound)
+        else:
+            self._queued = sound
+
+    def stop(self) -> None:
+        self.backend.catch_up()
+        self._sound = None
+        self._queued = None
+
+    def get_busy(self) -> bool:
+        self.backend.catch_up()
+        return self._sound is not None
+
+    def get_sound(self) -> Optional[PcmSound]:
+        self.backend.catch_up()
+        return self._sound
+
+    def get_queue(self) -> Optional[PcmSound]:
+        self.backend.catch_up()
+        return self._queued
+
+    def get_volume(self) -> float:
+        return self._volume
+
+    def set_volume(self, value: float) -> None:
+        self._volume = min(max(value, 0.0), 1.0)
+
+    def render(self, frame_count: int, out: Optional[np.ndarray] = None) -> None:
+        """
+        Moves the channel ``frame_count`` frames ahead.
+
+        :param frame_count: Number of frames.
+        :param out: Float buffer of at least ``frame_count`` frames to which the
+            played frames are added, None only moves ahead.
+        """
+        done = 0
+        while done < frame_count and self._sound is not None:
+            frames = self._sound.frames
+            count = min(frame_count - done, len(frames) - self._position)
+            if out is not None and count > 0:
+                gain = self._volume * self._sound.get_volume()
+                out[done:done + count] += frames[self._position:self._position + count] * np.float32(gain)
+            done += max(count, 0)
+            self._position += max(count, 0)
+            if self._position >= len(frames):
+                self._position = 0
+                if self._loops != 0 and len(frames):
+                    if self._loops > 0:
+                        self._loops -= 1
+                else:
+                    self._sound, self._queued = self._queued, None
+
+
+class AudioBackend(Generic[SoundT, ChannelT]):
+    """
+    Interface to the audio output, the subset of :mod:`pygame.mixer`
+    which is used by *loco sound*, see :func:`~get_audio_backend`.
+
+    Sounds and channels of a backend provide the methods of :class:`pygame.mixer.Sound`
+    and :class:`pygame.mixer.Channel` which are used by the
+    :class:`~loco_sound.sound.voice.VoiceManager` and the stream renderers.
+    Each backend is generic over its own sound and channel type, so a channel
+    only gets sounds of the same backend.
+    """
+    # whether the array of :func:`~samples` is the buffer of the sound itself
+    shares_samples: bool = False
+
+    def init(self, frequency: int = 44100, size: int = -16, channels: int = 2, buffer: int = 256) -> None:
+        """
+        Opens the output, see :func:`pygame.mixer.init`.
+        """
+        raise NotImplementedError
+
+    def get_init(self) -> Optional[MixerFormat]:
+        """
+        :returns: Frequency, sample format and channels or None if :func:`~init` was not called.
+        """
+        raise NotImplementedError
+
+    def require_init(self) -> MixerFormat:
+        """
+        :returns: Frequency, sample format and channels, see :func:`~get_init`.
+        :raises RuntimeError: If :func:`~init` was not called.
+        """
+        mixer_format = self.get_init()
+        if mixer_format is None:
+            raise RuntimeError(f'{type(self).__name__} is not initialized, call init() of the audio backend first')
+        return mixer_format
+
+    def load(self, path: str) -> SoundT:
+        """
+        Decodes a sound file into the format of the backend.
+
+        :param path: Path of the sound file.
+        """
+        raise NotImplementedError
+
+    def sound(self, buffer: Frames) -> SoundT:
+        """
+        :param buffer: Raw frames in the format of the backend, they are copied
+            unless the backend can play an array of signed 16 bit frames as it is.
+        :returns: Sound of the frames.
+        """
+        raise NotImplementedError
+
+    def samples(self, sound: SoundT) -> np.ndarray:
+        """
+        :param sound: Sound of the backend.
+        :returns: Frames of the sound as read only signed 16 bit integers,
+            use :func:`~loco_sound.sound.cache.SoundCache.samples` to share them.
+        """
+        raise NotImplementedError
+
+    def set_num_channels(self, count: int) -> None:
+        """
+        :param count: Number of channels which can be requested via :func:`~channel`.
+        """
+        raise NotImplementedError
+
+    def channel(self, index: int) -> ChannelT:
+        """
+        :param index: Index of the channel, smaller than the number of channels.
+        """
+        raise NotImplementedError
+
+    def now(self) -> int:
+        """
+        :returns: Monotonic timestamp of the output in nanoseconds.
+        """
+        return time.monotonic_ns()
+
+    def close(self) -> None:
+        """
+        Closes the output.
+        """
+
+
+class PygameBackend(AudioBackend[pygame.mixer.Sound, pygame.mixer.Channel]):
+    """
+    Plays the sounds via :mod:`pygame.mixer` on the audio device, the default backend.
+    """
+    def init(self, frequency: int = 44100, size: int = -16, channels: int = 2, buffer: int = 256) -> None:
+        # see https://stackoverflow.com/a/49346100
+        pygame.mixer.pre_init(frequency, size, channels, buffer)
+        pygame.mixer.init()
+
+    def get_init(self) -> Optional[MixerFormat]:
+        return pygame.mixer.get_init()
+
+    def load(self, path: str) -> pygame.mixer.Sound:
+        return pygame.mixer.Sound(path)
+
+    def sound(self, buffer: Frames) -> pygame.mixer.Sound:
+        return pygame.mixer.Sound(buffer=buffer)
+
+    def samples(self, sound: pygame.mixer.Sound) -> np.ndarray:
+        # get_raw returns a copy of the buffer of the sound
+        channels = self.require_init()[2]
+        return np.frombuffer(sound.get_raw(), dtype=np.int16).reshape(-1, channels)
+
+    def set_num_channels(self, count: int) -> None:
+        pygame.mixer.set_num_channels(count)
+
+    def channel(self, index: int) -> pygame.mixer.Channel:
+        return pygame.mixer.Channel(index)
+
+    def close(self) -> None:
+        pygame.mixer.quit()
+
+
+class PcmBackend(AudioBackend[PcmSound, PcmChannel]):
+    """
+    Base of the backends which mix the channels themselves, sound files
+    are decoded via :mod:`wave` so only WAV files are supported.
+    """
+    shares_samples = True
+
+    def __init__(self):
+        self._format: Optional[MixerFormat] = None
+        self._channels: List[PcmChannel] = []
+
+    def init(self, frequency: int = 44100, size: int = -16, channels: int = 2, buffer: int = 256) -> None:
+        if size != -16:
+            raise ValueError(f'{type(self).__name__} only supports signed 16 bit samples')
+        self._format = frequency, size, channels
+
+    def get_init(self) -> Optional[MixerFormat]:
+        return self._format
+
+    def load(self, path: str) -> PcmSound:
+        frequency, _, channels = self.require_init()
+        with wave.open(path, 'rb') as wave_file:
+            file_channels = wave_file.getnchannels()
+            sample_width = wave_file.getsampwidth()
+            file_frequency = wave_file.getframerate()
+            raw = wave_file.readframes(wave_file.getnframes())
+        if sample_width == 1:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8
+        elif sample_width == 2:
+            samples = np.frombuffer(raw, dtype='<i2').astype(np.int16)
+        elif sample_width == 4:
+            samples = (np.frombuffer(raw, dtype='<i4') >> 16).astype(np.int16)
+        else:
+            raise ValueError(f'Unsupported sample width of {sample_width} bytes in {path}')
+        frames = samples.reshape(-1, file_channels)
+        if file_channels != channels:
+            if channels == 1:
+                frames = frames.mean(axis=1, keepdims=True).astype(np.int16)
+            elif file_channels == 1:
+                frames = np.repeat(frames, channels, axis=1)
+            else:
+                frames = frames[:, :channels]
+        if file_frequency != frequency:
+            frames = self._convert_frequency(frames, file_frequency, frequency)
+        return PcmSound(np.ascontiguousarray(frames), frequency)
+
+    @staticmethod
+    def _convert_frequency(frames: np.ndarray, source: int, target: int) -> np.ndarray:
+        count = int(round(len(frames) * target / source))
+        positions = np.arange(count) * (source / target)
+        indices = np.arange(len(frames))
+        converted = np.empty((count, frames.shape[1]), dtype=np.int16)
+        for channel in range(frames.shape[1]):
+            converted[:, channel] = np.interp(positions, indices, frames[:, channel])
+        return converted
+
+    def sound(self, buffer: Frames) -> PcmSound:
+        frequency, _, channels = self.require_init()
+        if isinstance(buffer, np.ndarray) and buffer.dtype == np.int16:
+            # channels only read the frames, e.g. of a memory mapped file
+            return PcmSound(buffer.reshape(-1, channels), frequency)
+        return PcmSound(np.frombuffer(buffer, dtype=np.int16).reshape(-1, channels).copy(), frequency)
+
+    def samples(self, sound: PcmSound) -> np.ndarray:
+        samples: np.ndarray = sound.frames.view()
+        samples.flags.writeable = False
+        return samples
+
+    def set_num_channels(self, count: int) -> None:
+        while len(self._channels) < count:
+            self._channels.append(PcmChannel(self))
+
+    def channel(self, index: int) -> PcmChannel:
+        return self._channels[index]
+
+    def catch_up(self) -> None:
+        """
+        Moves all channels to :func:`~now`, called before a channel gets changed or queried.
+        """
+
+
+class NullBackend(PcmBackend):
+    """
+    Plays nothing but keeps the channels busy as long as their sounds would play,
+    so *loco sound* runs without an audio device, e.g. on a CI server.
+    """
+    def __init__(self):
+        super().__init__()
+        self._frame: int = 0
+        self._start: int = time.monotonic_ns()
+
+    def init(self, frequency: int = 44100, size: int = -16, channels: int = 2, buffer: int = 256) -> None:
+        super().init(frequency, size, channels, buffer)
+        self._frame = 0
+        self._start = time.monotonic_ns()
+
+    def catch_up(self) -> None:
+        if self._format is None:
+            return
+        frame = (time.monotonic_ns() - self._start) * self._format[0] // 1_000_000_000
+        if frame > self._frame:
+            for channel in self._channels:
+                channel.render(frame - self._frame)
+            self._frame = frame
+
+
+class OfflineBackend(PcmBackend):
+    """
+    Mixes all channels into a WAV file on a virtual clock instead of playing them,
+    so a recording can be rendered as fast as the CPU allows and the
+    timing of each sound can be checked sample by sample.
+
+    The clock only moves via :func:`~advance_to`, use :func:`~now` as clock of the
+    :class:`~loco_sound.loco.scheduler.Scheduler`, see :func:`loco_sound.replay.Replayer.render`.
+
+    :param path: WAV file which gets written.
+    :param block_frames: Maximum number of frames which are mixed at once.
+    """
+    def __init__(self, path: str, block_frames: int = 4096):
+        super().__init__()
+        self.path = path
+        self.block_frames = block_frames
+        self._wave_file: Optional[wave.Wave_write] = None
+        self._time: int = 0
+        self._frame: int = 0
+        self.clipped: int = 0
+
+    def init(self, frequency: int = 44100, size: int = -16, channels: int = 2, buffer: int = 256) -> None:
+        super().init(frequency, size, channels, buffer)
+        self._wave_file = wave.open(self.path, 'wb')
+        self._wave_file.setnchannels(channels)
+        self._wave_file.setsampwidth(2)
+        self._wave_file.setframerate(frequency)
+        self._time = 0
+        self._frame = 0
+        log.info(f'Render sounds to {self.path}')
+
+    @property
+    def frame(self) -> int:
+        """
+        Number of frames which were rendered.
+        """
+        return self._frame
+
+    def now(self) -> int:
+        return self._time
+
+    def advance_to(self, timestamp: int) -> None:
+        """
+        Renders all channels up to ``timestamp`` of the virtual clock.
+
+        :param timestamp: Timestamp in nanoseconds.
+        """
+        frequency, _, channels = self.require_init()
+        assert self._wave_file is not None
+        if timestamp <= self._time:
+            return
+        target_frame = timestamp * frequency // 1_000_000_000
+        while self._frame < target_frame:
+            frame_count = min(self.block_frames, target_frame - self._frame)
+            block = np.zeros((frame_count, channels), dtype=np.float32)
+            for channel in self._channels:
+                channel.render(frame_count, block)
+            self.clipped += int(np.count_nonzero((block > 32767) | (block < -32768)))
+            self._wave_file.writeframes(np.clip(block, -32768, 32767).astype('<i2').tobytes())
+            self._frame += frame_count
+        self._time = timestamp
+
+    def close(self) -> None:
+        if self._wave_file is not None:
+            self._wave_file.close()
+            self._wave_file = None
+            log.info(f'Rendered {self._frame} frames to {self.path}')
+
+
+# sound and channel of the backend of :func:`~get_audio_backend`, which is only
+# chosen at runtime, callers only hand them from the backend to its channels
+Sound = Any
+Channel = Any
+
+_audio_backend: AudioBackend[Any, Any] = PygameBackend()
+
+
+def get_audio_backend() -> AudioBackend[Any, Any]:
+    """
+    :returns: Backend which plays all sounds, :class:`~PygameBackend` by default.
+    """
+    return _audio_backend
+
+
+def set_audio_backend(backend: AudioBackend[Any, Any]) -> None:
+    """
+    Replaces the backend which plays all sounds, needs to be called before
+    any sound gets loaded.
+
+    :param backend: The new backend.
+    """
+    global _audio_backend
+    _audio_backend = backend
@@ -0,0 +1,171 @@
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from loco_sound.sound.backend import Sound, get_audio_backend
+from loco_sound.sound.pcm_cache import PcmCache
+
+log = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, Tuple[int, int, int]]
+
+
+class CachedSound:
+    """
+    Entry of a :class:`~SoundCache`.
+
+    :param sound: The decoded sound.
+    :param size: Size of the decoded sample buffer in bytes.
+    """
+    __slots__ = ('sound', 'size', 'ref_count', 'samples')
+
+    def __init__(self, sound: Sound, size: int):
+        self.sound: Sound = sound
+        self.size: int = size
+        self.ref_count: int = 0
+        self.samples: Optional[np.ndarray] = None
+
+
+class SoundCache:
+    """
+    Process wide cache of decoded sounds so locos which use the same
+    sound package share one decoded buffer.
+
+    Sounds are keyed by their path and the format of the mixer because
+    the audio backend decodes a file into the format it was initialized with.
+    Every :func:`~acquire` needs to be paired with a :func:`~release`.
+    Sounds which are not referenced any more stay in the cache until
+    the decoded buffers exceed ``max_bytes``, then the least recently
+    used ones are dropped.
+
+    If ``pcm_cache`` is set, sounds are loaded from this
+    :class:`~loco_sound.sound.pcm_cache.PcmCache` instead of decoding the files.
+
+    Renderers which mix the frames themselves get them via :func:`~samples`,
+    so each cached sound is converted into an array once and all locos share it.
+
+    .. note::
+
+        The sound objects are shared, so :func:`pygame.mixer.Sound.stop` and
+        :func:`pygame.mixer.Sound.set_volume` affect all locos which use
+        the sound. Use the :class:`~loco_sound.sound.voice.Voice` returned by
+        :func:`~loco_sound.sound.voice.VoiceManager.play` to control a single playback.
+
+    :param max_bytes: Budget of the decoded buffers in bytes.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self._max_bytes: int = max_bytes
+        self._entries: 'OrderedDict[CacheKey, CachedSound]' = OrderedDict()
+        # entry of each cached sound object
+        self._entry_of_sound: Dict[int, CachedSound] = {}
+        self.size: int = 0
+        self.pcm_cache: Optional[PcmCache] = None
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        self._max_bytes = value
+        self._evict()
+
+    @staticmethod
+    def _key(path: str) -> CacheKey:
+        return os.path.abspath(path), get_audio_backend().require_init()
+
+    def acquire(self, path: str) -> Sound:
+        """
+        Returns the decoded sound of ``path`` and decodes it only if
+        it is not already cached.
+
+        :param path: Path to the sound file.
+        """
+        key = self._key(path)
+        entry = self._entries.get(key)
+        if entry is None:
+            if self.pcm_cache is not None:
+                sound = self.pcm_cache.load(path)
+            else:
+                log.debug(f'Decode sound {path}')
+                sound = get_audio_backend().load(path)
+            entry = CachedSound(sound, self._sound_size(sound))
+            self._entries[key] = entry
+            self._entry_of_sound[id(sound)] = entry
+            self.size += entry.size
+        else:
+            self._entries.move_to_end(key)
+        entry.ref_count += 1
+        self._evict()
+        return entry.sound
+
+    def release(self, path: str) -> None:
+        """
+        Drops a reference of ``path`` which was acquired via :func:`~acquire`.
+
+        :param path: Path to the sound file.
+        """
+        entry = self._entries.get(self._key(path))
+        if entry is None or entry.ref_count <= 0:
+            log.warning(f'Release of not acquired sound {path}')
+            return
+        entry.ref_count -= 1
+        self._evict()
+
+    def samples(self, sound: Sound) -> np.ndarray:
+        """
+        Returns the frames of a sound of :func:`~acquire` as read only signed
+        16 bit integers, they are converted on the first call and shared afterwards.
+
+        :param sound: Sound which was returned by :func:`~acquire`.
+        """
+        backend = get_audio_backend()
+        entry = self._entry_of_sound.get(id(sound))
+        if entry is None or entry.sound is not sound:
+            log.debug(f'Convert not cached sound {sound} into samples')
+            return backend.samples(sound)
+        if entry.samples is None:
+            entry.samples = backend.samples(sound)
+            if not backend.shares_samples:
+                entry.size += entry.samples.nbytes
+                self.size += entry.samples.nbytes
+        return entry.samples
+
+    def clear(self) -> None:
+        """
+        Drops all sounds which are not referenced.
+        """
+        for key, entry in list(self._entries.items()):
+            if entry.ref_count == 0:
+                self._drop(key)
+
+    def _evict(self) -> None:
+        if self.size <= self._max_bytes:
+            return
+        for key, entry in list(self._entries.items()):
+            if self.size <= self._max_bytes:
+                return
+            if entry.ref_count == 0:
+                self._drop(key)
+        if self.size > self._max_bytes:
+            log.warning(f'Referenced sounds ({self.size} bytes) exceed sound cache budget of {self._max_bytes} bytes')
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        del self._entry_of_sound[id(entry.sound)]
+        self.size -= entry.size
+        log.debug(f'Drop sound {key[0]} from cache')
+
+    @staticmethod
+    def _sound_size(sound: Sound) -> int:
+        frequency, sample_format, channels = get_audio_backend().require_init()
+        return int(round(sound.get_length() * frequency)) * channels * (abs(sample_format) // 8)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+sound_cache = SoundCache()
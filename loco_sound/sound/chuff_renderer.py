@@ -0,0 +1,161 @@
+import itertools
+import logging
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+from loco_sound.sound.backend import Channel, Sound, get_audio_backend
+from loco_sound.sound.cache import sound_cache
+from loco_sound.sound.voice import voice_manager
+
+if TYPE_CHECKING:
+    # the loco package imports this module
+    from loco_sound.loco.scheduler import Scheduler, ScheduledCall
+
+log = logging.getLogger(__name__)
+
+
+class ChuffRenderer:
+    """
+    Renders the steam chuffs of a loco into a continuous PCM stream
+    which is queued block by block to a dedicated mixer channel.
+
+    The onset of each chuff is placed at an exact sample offset of
+    the stream, so the timing of the chuffs does not depend on how
+    punctual the :class:`~loco_sound.loco.scheduler.Scheduler` calls us -
+    it only needs to queue the next block before the current one ends.
+
+    :param chuff_sounds: Sounds which are cycled for each chuff.
+    :param scheduler: Scheduler which calls us to queue the next block.
+    :param channel: Mixer channel which plays the stream, defaults to a
+        new reserved channel, see :func:`~loco_sound.sound.voice.VoiceManager.reserve_channel`.
+    :param block_frames: Number of frames of each queued block.
+    """
+    def __init__(
+            self,
+            chuff_sounds: List[Sound],
+            scheduler: 'Scheduler',
+            channel: Optional[Channel] = None,
+            block_frames: int = 1024,
+    ):
+        self.frequency, sample_format, self.channels = get_audio_backend().require_init()
+        assert sample_format == -16, 'Chuff stream requires a signed 16 bit mixer'
+        self.scheduler = scheduler
+        # a reserved channel is released by :func:`~close`
+        self._reserved_channel = channel is None
+        self.channel = channel if channel is not None else voice_manager.reserve_channel()
+        self.block_frames = block_frames
+        self._chuffs = [sound_cache.samples(sound) for sound in chuff_sounds]
+        self._chuff_iterator = itertools.cycle(self._chuffs)
+        longest_chuff = max(len(chuff) for chuff in self._chuffs)
+        # a chuff which starts in the last frame of a block must fit into the ring
+        ring_blocks = -(-(block_frames + longest_chuff) // block_frames)
+        self._ring = np.zeros((ring_blocks * block_frames, self.channels), dtype=np.int32)
+        # stream frame of the next block which gets rendered
+        self._position: int = 0
+        # stream frame until the ring contains sound
+        self._sound_until: int = 0
+        self._interval: Optional[int] = None
+        self._last_onset: Optional[int] = None
+        self._next_onset: Optional[int] = None
+        self._next_pump: Optional['ScheduledCall'] = None
+
+    @property
+    def running(self) -> bool:
+        """
+        True while blocks are rendered and queued.
+        """
+        return self._next_pump is not None
+
+    def set_interval(self, interval: Optional[int]) -> None:
+        """
+        Sets the time between two chuffs.
+        The first chuff after a start is placed at the beginning of the
+        next block, afterwards we move from the old to the new interval
+        by placing the next chuff in the middle of both.
+
+        :param interval: Time between two chuffs in nanoseconds,
+            None stops placing chuffs.
+        """
+        if interval is None:
+            self._interval = None
+            self._next_onset = None
+            return
+        frames = max(1, interval * self.frequency // 1_000_000_000)
+        if self._interval is None or self._last_onset is None:
+            self._next_onset = self._position
+        else:
+            self._next_onset = max(self._position, self._last_onset + (self._interval + frames) // 2)
+        self._interval = frames
+        if not self.running:
+            self.pump()
+
+    def render_block(self) -> np.ndarray:
+        """
+        Mixes all chuffs which start within the next block into the ring
+        and returns the block.
+
+        :returns: Block as signed 16 bit frames.
+        """
+        start = self._position
+        end = start + self.block_frames
+        while self._next_onset is not None and self._interval is not None and self._next_onset < end:
+            self._mix(next(self._chuff_iterator), self._next_onset)
+            self._last_onset = self._next_onset
+            self._next_onset += self._interval
+        offset = start % len(self._ring)
+        block = self._ring[offset:offset + self.block_frames]
+        rendered = np.clip(block, -32768, 32767).astype(np.int16)
+        block[:] = 0
+        self._position = end
+        return rendered
+
+    def pump(self) -> None:
+        """
+        Queues the next block if the channel has no queued block and schedules
+        the next check after half a block.
+        Stops if no chuffs are placed and the ring is played.
+        """
+        self._next_pump = None
+        if self._interval is None and self._position >= self._sound_until:
+            return
+        if self.channel.get_queue() is None:
+            sound = get_audio_backend().sound(self.render_block().tobytes())
+            if self.channel.get_busy():
+                self.channel.queue(sound)
+            else:
+                self.channel.play(sound)
+        self._next_pump = self.scheduler.call_later(
+            self.block_frames * 1_000_000_000 // (2 * self.frequency),
+            self.pump,
+        )
+
+    def stop(self) -> None:
+        """
+        Stops the stream immediately.
+        """
+        self.set_interval(None)
+        if self._next_pump is not None:
+            self._next_pump.cancel()
+            self._next_pump = None
+        self.channel.stop()
+        self._ring[:] = 0
+        self._sound_until = self._position
+
+    def close(self) -> None:
+        """
+        Stops the stream and releases the channel if it was reserved by the renderer,
+        the renderer can not be used afterwards.
+        """
+        self.stop()
+        if self._reserved_channel:
+            voice_manager.release_channel(self.channel)
+            self._reserved_channel = False
+
+    def _mix(self, chuff: np.ndarray, onset: int) -> None:
+        ring_frames = len(self._ring)
+        offset = onset % ring_frames
+        first = min(len(chuff), ring_frames - offset)
+        self._ring[offset:offset + first] += chuff[:first]
+        self._ring[:len(chuff) - first] += chuff[first:]
+        self._sound_until = max(self._sound_until, onset + len(chuff))
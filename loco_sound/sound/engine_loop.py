@@ -0,0 +1,176 @@
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from loco_sound.sound.ambient_mixer import AmbientMixer, AmbientSource
+from loco_sound.sound.backend import Sound, get_audio_backend
+from loco_sound.sound.cache import sound_cache
+
+log = logging.getLogger(__name__)
+
+VariantKey = Tuple[str, Tuple[int, int, int], Tuple[float, ...]]
+
+
+def resample(samples: np.ndarray, pitch: float) -> np.ndarray:
+    """
+    Changes the pitch of a loop by linear interpolation,
+    a pitch of 2.0 plays it an octave higher in half the time.
+
+    :param samples: Frames of the loop as signed 16 bit integers.
+    :param pitch: Factor of the pitch.
+    :returns: Resampled frames which still loop seamless.
+    """
+    frames = max(1, int(round(len(samples) / pitch)))
+    positions = np.arange(frames) * (len(samples) / frames)
+    # the first frame follows the last one, so interpolating at the end wraps around
+    looped = np.concatenate((samples, samples[:1])).astype(np.float32)
+    indices = np.arange(len(looped))
+    resampled = np.empty((frames, samples.shape[1]), dtype=np.int16)
+    for channel in range(samples.shape[1]):
+        resampled[:, channel] = np.interp(positions, indices, looped[:, channel])
+    return resampled
+
+
+class CachedVariants:
+    """
+    Entry of a :class:`~PitchVariantCache`.
+
+    :param variants: Resampled loop of each pitch.
+    """
+    __slots__ = ('variants', 'ref_count')
+
+    def __init__(self, variants: List[np.ndarray]):
+        self.variants: List[np.ndarray] = variants
+        self.ref_count: int = 0
+
+
+class PitchVariantCache:
+    """
+    Process wide cache of the pitch variants of engine loops, so each
+    variant is resampled once and shared by all locos with the same loop.
+
+    Like the :class:`~loco_sound.sound.cache.SoundCache` every :func:`~acquire`
+    needs to be paired with a :func:`~release`, variants which are not referenced
+    any more are dropped.
+    """
+    def __init__(self):
+        self._entries: Dict[VariantKey, CachedVariants] = {}
+
+    @staticmethod
+    def _key(path: str, pitches: Sequence[float]) -> VariantKey:
+        return os.path.abspath(path), get_audio_backend().require_init(), tuple(pitches)
+
+    def acquire(self, path: str, sound: Sound, pitches: Sequence[float]) -> List[np.ndarray]:
+        """
+        Returns the loop ``sound`` of ``path`` resampled to each pitch,
+        it is only resampled if the variants are not cached.
+
+        :param path: Path of the sound file.
+        :param sound: Decoded sound of the file.
+        :param pitches: Factor of the pitch of each variant.
+        """
+        key = self._key(path, pitches)
+        entry = self._entries.get(key)
+        if entry is None:
+            log.debug(f'Resample {path} to {len(pitches)} pitches')
+            samples = sound_cache.samples(sound)
+            entry = self._entries[key] = CachedVariants([resample(samples, pitch) for pitch in pitches])
+        entry.ref_count += 1
+        return entry.variants
+
+    def release(self, path: str, pitches: Sequence[float]) -> None:
+        """
+        Drops a reference of variants which were acquired via :func:`~acquire`.
+
+        :param path: Path of the sound file.
+        :param pitches: Factor of the pitch of each variant.
+        """
+        key = self._key(path, pitches)
+        entry = self._entries.get(key)
+        if entry is None:
+            log.warning(f'Release of not acquired pitch variants of {path}')
+            return
+        entry.ref_count -= 1
+        if entry.ref_count <= 0:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+pitch_variants = PitchVariantCache()
+
+
+class EngineLoop:
+    """
+    Engine or traction motor loop of a loco whose pitch and gain follow its speed.
+
+    The speed range is split into one band per pitch variant. Within a band only
+    the gain changes, when the band changes we crossfade to the variant of the new
+    band within the :class:`~loco_sound.sound.ambient_mixer.AmbientMixer`,
+    so nothing gets resampled while driving, see :class:`~PitchVariantCache`.
+
+    :param variants: Loop of each speed band, the slowest first.
+    :param mixer: Mixer which plays the loop.
+    :param min_gain: Gain at the lowest speed.
+    :param max_gain: Gain at the top speed.
+    :param crossfade: Nanoseconds to crossfade between two variants.
+    :param owner: Loco of the loop.
+    """
+    def __init__(
+            self,
+            variants: Sequence[np.ndarray],
+            mixer: AmbientMixer,
+            min_gain: float = 0.5,
+            max_gain: float = 1.0,
+            crossfade: int = 200_000_000,
+            owner: object = None,
+    ):
+        self.variants = variants
+        self.mixer = mixer
+        self.min_gain = min_gain
+        self.max_gain = max_gain
+        self.crossfade = crossfade
+        self.owner = owner
+        self.band: Optional[int] = None
+        self._source: Optional[AmbientSource] = None
+
+    def set_speed(self, relative_speed: float) -> None:
+        """
+        Follows a new speed, a speed of 0 fades the loop out.
+
+        :param relative_speed: Speed relative to the top speed.
+        """
+        if relative_speed <= 0:
+            self.stop()
+            return
+        relative_speed = min(relative_speed, 1.0)
+        band = min(int(relative_speed * len(self.variants)), len(self.variants) - 1)
+        gain = self.min_gain + (self.max_gain - self.min_gain) * relative_speed
+        old_source = self._source
+        if band == self.band and old_source is not None:
+            self.mixer.set_gain(old_source, gain, fade=self.crossfade)
+            return
+        variant = self.variants[band]
+        position = 0
+        if old_source is not None:
+            # continue at the same phase of the loop
+            position = old_source.position * len(variant) // len(old_source.samples)
+            self.mixer.remove_source(old_source, fade=self.crossfade)
+        self._source = self.mixer.add_samples(variant, gain, fade=self.crossfade, owner=self.owner, position=position)
+        self.band = band
+
+    def stop(self) -> None:
+        """
+        Fades the loop out.
+        """
+        if self._source is not None:
+            self.mixer.remove_source(self._source, fade=self.crossfade)
+            self._source = None
+        self.band = None
+
+    @property
+    def running(self) -> bool:
+        return self._source is not None
@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import logging
+import os
+import struct
+from typing import Iterable, Optional
+
+import numpy as np
+
+from loco_sound.sound.backend import NullBackend, Sound, get_audio_backend, set_audio_backend
+
+log = logging.getLogger(__name__)
+
+# first bytes of a cached sound, the last byte is the version of the format
+PCM_CACHE_MAGIC = b'LSPCM\x00\x00\x01'
+
+# format of the mixer (frequency, sample format, channels) and number of frames
+_HEADER = struct.Struct('<8sIhHQ')
+
+
+class PcmCache:
+    """
+    Cache on disk of sounds which are decoded into the format of the mixer,
+    so a sound file only gets decoded and resampled once and not on each start.
+
+    A cached sound is a small header followed by the raw frames.
+    It is keyed by the path, the size and the modification time of the file and by the
+    format of the mixer, a changed file or mixer format leads to a new entry.
+    The frames of a cached sound are memory mapped via :class:`numpy.memmap` to load them,
+    so processes which load the same sound read the same pages of the page cache,
+    an empty, truncated or outdated cached sound is decoded and stored again.
+
+    Use it via ``sound_cache.pcm_cache``, see :class:`~loco_sound.sound.cache.SoundCache`,
+    and precompile the sounds via ``python3 -m loco_sound.sound.pcm_cache``.
+
+    :param directory: Directory of the cached sounds, gets created if it does not exist.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def cache_path(self, path: str) -> str:
+        """
+        :param path: Path of the sound file.
+        :returns: Path of the cached sound of the file for the current mixer format.
+        """
+        stat = os.stat(path)
+        key = f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{get_audio_backend().require_init()}'
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.pcm')
+
+    def load(self, path: str) -> Sound:
+        """
+        Loads the cached sound of ``path``, the sound file is decoded
+        and stored in the cache if it is not cached yet.
+
+        :param path: Path of the sound file.
+        """
+        cache_path = self.cache_path(path)
+        sound = self._load_cached(cache_path)
+        if sound is not None:
+            self.hits += 1
+            return sound
+        self.misses += 1
+        sound = get_audio_backend().load(path)
+        self._store(cache_path, sound)
+        return sound
+
+    def compile(self, path: str) -> bool:
+        """
+        Stores the decoded sound of ``path`` unless it is already cached.
+
+        :param path: Path of the sound file.
+        :returns: False if the sound was already cached.
+        """
+        cache_path = self.cache_path(path)
+        if os.path.exists(cache_path):
+            return False
+        self._store(cache_path, get_audio_backend().load(path))
+        return True
+
+    def _load_cached(self, cache_path: str) -> Optional[Sound]:
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                header = cache_file.read(_HEADER.size)
+                size = os.fstat(cache_file.fileno()).st_size
+        except FileNotFoundError:
+            return None
+        if len(header) < _HEADER.size:
+            log.warning(f'Ignore truncated cached sound {cache_path}')
+            return None
+        magic, frequency, sample_format, channels, frames = _HEADER.unpack(header)
+        if magic != PCM_CACHE_MAGIC or (frequency, sample_format, channels) != get_audio_backend().require_init():
+            log.warning(f'Ignore outdated cached sound {cache_path}')
+            return None
+        if size != _HEADER.size + frames * channels * abs(sample_format) // 8:
+            log.warning(f'Ignore truncated cached sound {cache_path}')
+            return None
+        if not frames:
+            # an empty file region can not be mapped
+            return get_audio_backend().sound(b'')
+        # a replaced cache file gets a new inode, so the mapped frames never change
+        pcm = np.memmap(cache_path, dtype=np.int16, mode='r', offset=_HEADER.size, shape=(frames, channels))
+        # the pygame backend copies the frames, the PCM backends play the mapped frames
+        return get_audio_backend().sound(pcm)
+
+    def _store(self, cache_path: str, sound: Sound) -> None:
+        frequency, sample_format, channels = get_audio_backend().require_init()
+        raw = sound.get_raw()
+        frames = len(raw) // (channels * abs(sample_format) // 8)
+        os.makedirs(self.directory, exist_ok=True)
+        # a reader never sees a partially written file
+        temporary_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as cache_file:
+            cache_file.write(_HEADER.pack(PCM_CACHE_MAGIC, frequency, sample_format, channels, frames))
+            cache_file.write(raw)
+        os.replace(temporary_path, cache_path)
+        log.debug(f'Cached decoded sound {cache_path}')
+
+    def compile_all(self, paths: Iterable[str]) -> int:
+        """
+        Stores the decoded sounds of all ``paths``, directories are searched for ``.wav`` files.
+
+        :param paths: Sound files and directories.
+        :returns: Number of sounds which were not cached yet.
+        """
+        compiled = 0
+        for path in paths:
+            if os.path.isdir(path):
+                compiled += self.compile_all(
+                    os.path.join(path, name) for name in sorted(os.listdir(path)) if name.lower().endswith('.wav')
+                )
+            elif self.compile(path):
+                log.info(f'Compiled {path}')
+                compiled += 1
+        return compiled
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Decodes sound packages into the cache of start.py --pcm-cache.')
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='sound file or directory of sound files')
+    parser.add_argument('--cache', default='.pcm_cache', metavar='DIR', help='directory of the cache')
+    parser.add_argument('--frequency', type=int, default=44100, help='frequency of the mixer')
+    parser.add_argument('--channels', type=int, default=2, help='channels of the mixer')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    # the sounds are only decoded, so no audio device is needed
+    set_audio_backend(NullBackend())
+    get_audio_backend().init(args.frequency, -16, args.channels)
+    compiled = PcmCache(args.cache).compile_all(args.paths)
+    log.info(f'Compiled {compiled} sounds into {args.cache}')
@@ -0,0 +1,226 @@
+import itertools
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from loco_sound.sound.backend import Channel, Sound, get_audio_backend
+
+log = logging.getLogger(__name__)
+
+# a voice may only be stolen by a voice of higher priority
+PRIORITY_AMBIENT = 0
+PRIORITY_CHUFF = 1
+PRIORITY_HORN = 2
+
+
+class Voice:
+    """
+    A sound which is played by a :class:`~VoiceManager` on one of its channels.
+
+    :param manager: Manager which plays the voice.
+    :param channel_index: Index of the channel within the pool of the manager.
+    :param sound: Sound which is played.
+    :param owner: Object which requested the voice, e.g. a :class:`~loco_sound.loco.Loco`.
+    :param priority: Priority of the voice, see ``PRIORITY_*``.
+    :param loops: Number of repeats, -1 loops forever.
+    :param sequence: Counter which tells which voice is older.
+    """
+    __slots__ = ('manager', 'channel_index', 'sound', 'owner', 'priority', 'loops', 'sequence')
+
+    def __init__(
+            self,
+            manager: 'VoiceManager',
+            channel_index: int,
+            sound: Sound,
+            owner: Any,
+            priority: int,
+            loops: int,
+            sequence: int,
+    ):
+        self.manager: 'VoiceManager' = manager
+        self.channel_index: int = channel_index
+        self.sound: Sound = sound
+        self.owner: Any = owner
+        self.priority: int = priority
+        self.loops: int = loops
+        self.sequence: int = sequence
+
+    @property
+    def active(self) -> bool:
+        """
+        True if the voice is still playing and was not stolen.
+        """
+        return self.manager._is_active(self)
+
+    def stop(self) -> None:
+        """
+        Stops the voice if it is still playing.
+        """
+        if self.active:
+            self.manager._channels[self.channel_index].stop()
+
+    def __repr__(self):
+        return f'Voice({self.sound} of {self.owner} on channel {self.channel_index}, priority {self.priority})'
+
+
+class VoiceManager:
+    """
+    Plays sounds on a fixed pool of :class:`pygame.mixer.Channel` so running out of
+    channels degrades predictable.
+
+    If all channels are busy the oldest voice with the lowest priority below the
+    requested priority gets stolen.
+    One shot sounds may also steal one shot sounds of the same priority.
+    Each owner may only play ``max_voices_per_owner`` voices at once, further
+    voices replace the oldest voice of the owner with a lower or the same priority.
+    If no voice can be stolen the sound is dropped.
+
+    Channels which are not part of the pool can be requested via :func:`~reserve_channel`
+    and are handed out again after :func:`~release_channel`.
+    All sounds need to be played via the manager because :func:`pygame.mixer.Sound.play`
+    would also pick channels of the pool.
+
+    :param num_channels: Size of the pool, changes take effect before the first sound is played.
+    :param max_voices_per_owner: Maximum of voices which an owner can play at the same time.
+    """
+    def __init__(self, num_channels: int = 16, max_voices_per_owner: int = 4):
+        self.num_channels: int = num_channels
+        self.max_voices_per_owner: int = max_voices_per_owner
+        self._channels: List[Channel] = []
+        self._voices: List[Optional[Voice]] = []
+        self._reserved_channels: List[Channel] = []
+        self._released_channels: List[Channel] = []
+        self._sequence = itertools.count()
+        self.played: int = 0
+        self.dropped: int = 0
+        self.stolen: int = 0
+
+    def _init_channels(self) -> None:
+        if self._channels:
+            return
+        backend = get_audio_backend()
+        backend.set_num_channels(self.num_channels + len(self._reserved_channels))
+        self._channels = [backend.channel(i) for i in range(self.num_channels)]
+        self._voices = [None] * self.num_channels
+        log.info(f'Initiated {self.num_channels} mixer channels')
+
+    def reserve_channel(self) -> Channel:
+        """
+        Adds a channel which is not part of the pool, e.g. for streaming.
+        A channel of :func:`~release_channel` is reused before a new one gets added.
+        """
+        self._init_channels()
+        if self._released_channels:
+            channel = self._released_channels.pop()
+            channel.set_volume(1.0)
+            return channel
+        channel_id = self.num_channels + len(self._reserved_channels)
+        backend = get_audio_backend()
+        backend.set_num_channels(channel_id + 1)
+        channel = backend.channel(channel_id)
+        self._reserved_channels.append(channel)
+        return channel
+
+    def release_channel(self, channel: Channel) -> None:
+        """
+        Stops a channel of :func:`~reserve_channel` and returns it,
+        so the number of mixer channels does not grow while locos come and go.
+
+        :param channel: Reserved channel which is not used any more.
+        """
+        if channel not in self._reserved_channels or channel in self._released_channels:
+            log.warning(f'Release of not reserved channel {channel}')
+            return
+        channel.stop()
+        self._released_channels.append(channel)
+
+    def play(
+            self,
+            sound: Sound,
+            owner: Any = None,
+            priority: int = PRIORITY_CHUFF,
+            loops: int = 0,
+    ) -> Optional[Voice]:
+        """
+        Plays ``sound`` on a free or stolen channel of the pool.
+
+        :param sound: Sound which should be played.
+        :param owner: Object which requests the voice, used for ``max_voices_per_owner``.
+        :param priority: Priority of the voice, see ``PRIORITY_*``.
+        :param loops: Number of repeats, -1 loops forever.
+        :returns: The voice or None if the sound was dropped.
+        """
+        self._init_channels()
+        channel_index = self._find_channel(owner, priority, loops)
+        if channel_index is None:
+            self.dropped += 1
+            log.debug('Drop %s of %s with priority %d - no free channel', sound, owner, priority)
+            return None
+        voice = Voice(self, channel_index, sound, owner, priority, loops, next(self._sequence))
+        channel = self._channels[channel_index]
+        channel.set_volume(1.0)
+        channel.play(sound, loops=loops)
+        self._voices[channel_index] = voice
+        self.played += 1
+        return voice
+
+    def _find_channel(self, owner: Any, priority: int, loops: int) -> Optional[int]:
+        active_voices = [voice for voice in self._voices if voice is not None and self._is_active(voice)]
+
+        if owner is not None:
+            owner_voices = [voice for voice in active_voices if voice.owner is owner]
+            if len(owner_voices) >= self.max_voices_per_owner:
+                return self._steal([voice for voice in owner_voices if voice.priority <= priority])
+
+        for channel_index, voice in enumerate(self._voices):
+            if voice is None or not self._is_active(voice):
+                return channel_index
+
+        return self._steal([
+            voice for voice in active_voices
+            if voice.priority < priority or (voice.priority == priority and voice.loops == 0 and loops == 0)
+        ])
+
+    def _steal(self, candidates: List[Voice]) -> Optional[int]:
+        if not candidates:
+            return None
+        victim = min(candidates, key=lambda voice: (voice.priority, voice.sequence))
+        log.debug('Steal %s', victim)
+        self._channels[victim.channel_index].stop()
+        self._voices[victim.channel_index] = None
+        self.stolen += 1
+        return victim.channel_index
+
+    def _is_active(self, voice: Voice) -> bool:
+        return self._voices[voice.channel_index] is voice and self._channels[voice.channel_index].get_busy()
+
+    def stop_all(self, owner: Any) -> None:
+        """
+        Stops all voices of ``owner``.
+
+        :param owner: Owner which requested the voices.
+        """
+        for voice in self._voices:
+            if voice is not None and voice.owner is owner:
+                voice.stop()
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        :returns: Number of active voices (in total and per priority),
+            played, dropped and stolen voices.
+        """
+        active_voices = [voice for voice in self._voices if voice is not None and self._is_active(voice)]
+        priorities = Counter(voice.priority for voice in active_voices)
+        return {
+            'channels': self.num_channels,
+            'active': len(active_voices),
+            'active_ambient': priorities[PRIORITY_AMBIENT],
+            'active_chuff': priorities[PRIORITY_CHUFF],
+            'active_horn': priorities[PRIORITY_HORN],
+            'played': self.played,
+            'dropped': self.dropped,
+            'stolen': self.stolen,
+        }
+
+
+voice_manager = VoiceManager()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+import wave
+from unittest import mock
+
+import numpy as np
+import pygame
+
+from loco_sound.loco import LocoCollector
+from loco_sound.sound.backend import OfflineBackend
+from loco_sound.sound.cache import sound_cache
+from loco_sound.sound.voice import voice_manager
+from loco_sound.tests.backend_helpers import use_audio_backend
+from loco_sound.tests.sound_files import write_sound_files
+
+
+class AmbientMixerTests(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 256)
+        self.addCleanup(pygame.mixer.quit)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_sound_files(directory.name)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        self.loco_collector = LocoCollector()
+        self.addCleanup(self.loco_collector.ambient_mixer.stop)
+        self.addCleanup(self.loco_collector.clear)
+
+    def test_loops_of_all_locos_share_one_channel(self):
+        mixer = self.loco_collector.ambient_mixer
+        first = self.loco_collector[3]
+        second = self.loco_collector[4]
+        first.ambient_fade = second.ambient_fade = 0
+        with mock.patch.object(voice_manager, 'reserve_channel', wraps=voice_manager.reserve_channel) as reserve:
+            first.update_function_mask(1 << 9, 32)
+            second.update_function_mask(1 << 6, 32)
+        reserve.assert_called_once_with()
+        self.assertEqual(2, len(mixer))
+        self.assertEqual({}, first._loop_voices)
+        self.assertEqual({}, second._loop_voices)
+        self.assertTrue(mixer.running)
+
+        idle = first._ambient_sources[9]
+        train = second._ambient_sources[6]
+        mixer.set_gain(idle, 0.5)
+        mixer.set_gain(train, 0.25)
+        # each source continues where its previous block ended
+        expected = (
+            idle.samples[idle.position:idle.position + mixer.block_frames] * np.float32(0.5)
+            + train.samples[train.position:train.position + mixer.block_frames] * np.float32(0.25)
+        ).astype(np.int16)
+        np.testing.assert_array_equal(expected, mixer.render_block())
+
+    def test_samples_are_shared_between_locos(self):
+        first = self.loco_collector[3]
+        second = self.loco_collector[4]
+        self.assertIs(first.f_sounds[9], second.f_sounds[9])
+        samples = sound_cache.samples(first.f_sounds[9])
+        self.assertIs(samples, sound_cache.samples(second.f_sounds[9]))
+        self.assertFalse(samples.flags.writeable)
+
+    def test_stopped_loop_fades_out(self):
+        mixer = self.loco_collector.ambient_mixer
+        loco = self.loco_collector[3]
+        loco.ambient_fade = 0
+        loco.update_function_mask(1 << 9, 32)
+        loco.ambient_fade = mixer.block_frames * 1_000_000_000 // mixer.frequency
+        loco.update_function_mask(0, 32)
+        self.assertEqual(1, len(mixer))
+        mixer.render_block()
+        self.assertEqual(0, len(mixer))
+
+
+class OfflineAmbientMixerTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_sound_files(directory.name)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        self.path = os.path.join(directory.name, 'rendered.wav')
+        self.backend = OfflineBackend(self.path, block_frames=256)
+        self.voice_manager = use_audio_backend(self, self.backend)
+        self.loco_collector = LocoCollector()
+        self.loco_collector.scheduler.clock = self.backend.now
+        self.addCleanup(self.loco_collector.ambient_mixer.stop)
+        self.addCleanup(self.loco_collector.clear)
+
+    def render_until(self, timestamp: int):
+        for step in range(self.backend.now(), timestamp, 1_000_000):
+            self.backend.advance_to(step + 1_000_000)
+            self.loco_collector.execute_due_functions()
+
+    def test_loops_of_two_locos_are_mixed_with_their_gain(self):
+        mixer = self.loco_collector.ambient_mixer
+        first = self.loco_collector[3]
+        second = self.loco_collector[4]
+        first.ambient_fade = second.ambient_fade = 0
+        first.update_function_mask(1 << 9, 32)
+        second.update_function_mask(1 << 6, 32)
+        idle = first._ambient_sources[9]
+        train = second._ambient_sources[6]
+        # the first block was queued once the first loop started
+        mixer.set_gain(idle, 0.5)
+        mixer.set_gain(train, 0.25)
+        block_frames = mixer.block_frames
+        block_time = block_frames * 1_000_000_000 // mixer.frequency
+        self.render_until(2 * block_time)
+        self.backend.close()
+
+        # all loops share one reserved channel, the voices are not used
+        self.assertEqual(0, self.voice_manager.played)
+        self.assertEqual(self.voice_manager.num_channels + 1, len(self.backend._channels))
+        with wave.open(self.path, 'rb') as wave_file:
+            rendered = np.frombuffer(wave_file.readframes(wave_file.getnframes()), dtype='<i2').reshape(-1, 2)
+        np.testing.assert_array_equal(idle.samples[:block_frames], rendered[:block_frames])
+        # the train loop joined with the second block
+        expected = (
+            idle.samples[block_frames:2 * block_frames] * np.float32(0.5)
+            + train.samples[:block_frames] * np.float32(0.25)
+        ).astype(np.int16)
+        np.testing.assert_array_equal(expected, rendered[block_frames:2 * block_frames])
+
+
+if __name__ == '__main__':
+    unittest.main()
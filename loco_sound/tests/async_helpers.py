@@ -0,0 +1,33 @@
+import asyncio
+import socket
+from typing import Callable, List
+
+
+def free_udp_ports(count: int) -> List[int]:
+    """
+    :param count: Number of ports.
+    :returns: Local UDP ports which were free a moment ago.
+    """
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(count)]
+    try:
+        for udp_socket in sockets:
+            udp_socket.bind(('127.0.0.1', 0))
+        return [udp_socket.getsockname()[1] for udp_socket in sockets]
+    finally:
+        for udp_socket in sockets:
+            udp_socket.close()
+
+
+async def wait_until(condition: Callable[[], object], timeout: float = 2.0) -> None:
+    """
+    Polls ``condition`` while the event loop keeps running.
+
+    :param condition: Callable which returns a truthy value once we are done.
+    :param timeout: Seconds until an :class:`AssertionError` is raised.
+    """
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise AssertionError('Condition was not met in time')
+        await asyncio.sleep(0.01)
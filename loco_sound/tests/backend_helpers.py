@@ -0,0 +1,36 @@
+import unittest
+from unittest import mock
+
+from loco_sound.sound.backend import AudioBackend, get_audio_backend, set_audio_backend
+from loco_sound.sound.cache import sound_cache
+from loco_sound.sound.voice import VoiceManager
+
+# modules which play their sounds via the global voice manager
+VOICE_MANAGER_USERS = (
+    'loco_sound.loco.loco',
+    'loco_sound.sound.ambient_mixer',
+    'loco_sound.sound.chuff_renderer',
+)
+
+
+def use_audio_backend(test_case: unittest.TestCase, backend: AudioBackend) -> VoiceManager:
+    """
+    Plays all sounds of a test via an initialized ``backend`` and a new voice manager,
+    because the global voice manager keeps the channels of the backend which played first.
+    Everything is restored by the cleanups of ``test_case``.
+
+    :param test_case: The running test.
+    :param backend: Backend which was not initialized yet.
+    :returns: Voice manager which plays the sounds.
+    """
+    test_case.addCleanup(set_audio_backend, get_audio_backend())
+    test_case.addCleanup(sound_cache.clear)
+    set_audio_backend(backend)
+    backend.init(44100, -16, 2, 256)
+    test_case.addCleanup(backend.close)
+    voice_manager = VoiceManager()
+    for module in VOICE_MANAGER_USERS:
+        patcher = mock.patch(f'{module}.voice_manager', voice_manager)
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+    return voice_manager
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+import pygame
+
+from loco_sound.sound.cache import SoundCache
+from loco_sound.tests.sound_files import write_sound_files
+
+SOUND_FILES = ('a.wav', 'b.wav', 'c.wav')
+
+
+class SoundCacheTests(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 256)
+        self.addCleanup(pygame.mixer.quit)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_sound_files(directory.name, SOUND_FILES)
+        self.a, self.b, self.c = (os.path.join(directory.name, name) for name in SOUND_FILES)
+        self.sound_cache = SoundCache()
+
+    def test_sound_is_decoded_once(self):
+        sound = self.sound_cache.acquire(self.a)
+        self.assertIs(sound, self.sound_cache.acquire(self.a))
+        self.assertEqual(1, len(self.sound_cache))
+        # 0.1 seconds of 16 bit stereo
+        self.assertEqual(4410 * 4, self.sound_cache.size)
+
+    def test_referenced_sounds_are_not_dropped(self):
+        self.sound_cache.acquire(self.a)
+        self.sound_cache.acquire(self.a)
+        self.sound_cache.release(self.a)
+        self.sound_cache.clear()
+        self.assertEqual(1, len(self.sound_cache))
+        self.sound_cache.release(self.a)
+        self.sound_cache.clear()
+        self.assertEqual(0, len(self.sound_cache))
+        self.assertEqual(0, self.sound_cache.size)
+
+    def test_least_recently_used_sound_is_dropped(self):
+        self.sound_cache.max_bytes = 2 * 4410 * 4
+        sound_a, sound_b = (self.sound_cache.acquire(path) for path in (self.a, self.b))
+        self.sound_cache.release(self.b)
+        self.sound_cache.release(self.a)
+        # a hit makes b the least recently used sound
+        self.sound_cache.acquire(self.a)
+        self.sound_cache.release(self.a)
+        self.sound_cache.acquire(self.c)
+        self.assertEqual(2, len(self.sound_cache))
+        self.assertIs(sound_a, self.sound_cache.acquire(self.a))
+        self.sound_cache.release(self.a)
+        self.assertIsNot(sound_b, self.sound_cache.acquire(self.b))
+
+    def test_budget_does_not_drop_referenced_sounds(self):
+        self.sound_cache.max_bytes = 4410 * 4
+        self.sound_cache.acquire(self.a)
+        with self.assertLogs('loco_sound.sound.cache', 'WARNING'):
+            self.sound_cache.acquire(self.b)
+        self.assertEqual(2, len(self.sound_cache))
+
+    def test_release_of_not_acquired_sound(self):
+        with self.assertLogs('loco_sound.sound.cache', 'WARNING'):
+            self.sound_cache.release(self.a)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from loco_sound.loco import LocoCollector
+from loco_sound.z21 import LocoInfo, Message
+
+
+def loco_info_message(loco_address: int, speed: int) -> Message:
+    loco_info = LocoInfo(loco_address, dcc_speed_steps=126, direction=1, speed=speed)
+    return next(Message.from_z21_packet(loco_info.to_message().data))
+
+
+class DuplicateLocoInfoTests(unittest.TestCase):
+    def setUp(self):
+        self.loco_collector = LocoCollector()
+
+    def test_identical_message_is_dropped(self):
+        self.assertTrue(self.loco_collector.update_from_message(loco_info_message(3, 10)))
+        self.assertFalse(self.loco_collector.update_from_message(loco_info_message(3, 10)))
+        self.assertEqual(
+            {'new': 1, 'duplicate': 1, 'hit_rate': 0.5},
+            self.loco_collector.dedup_metrics(),
+        )
+
+    def test_changed_message_passes(self):
+        self.assertTrue(self.loco_collector.update_from_message(loco_info_message(3, 10)))
+        self.assertTrue(self.loco_collector.update_from_message(loco_info_message(3, 11)))
+        self.assertTrue(self.loco_collector.update_from_message(loco_info_message(3, 10)))
+
+    def test_messages_of_other_locos_pass(self):
+        self.assertTrue(self.loco_collector.update_from_message(loco_info_message(3, 10)))
+        self.assertTrue(self.loco_collector.update_from_message(loco_info_message(4, 10)))
+        self.assertTrue(self.loco_collector.update_from_message(loco_info_message(300, 10)))
+        self.assertFalse(self.loco_collector.update_from_message(loco_info_message(300, 10)))
+
+    def test_forgotten_message_passes(self):
+        self.loco_collector.update_from_message(loco_info_message(3, 10))
+        self.loco_collector.update_from_message(loco_info_message(300, 10))
+        self.loco_collector.forget_loco_info(3)
+        self.assertTrue(self.loco_collector.update_from_message(loco_info_message(3, 10)))
+        self.assertFalse(self.loco_collector.update_from_message(loco_info_message(300, 10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+import pygame
+
+from loco_sound.config import Config
+from loco_sound.loco import LocoCollector
+from loco_sound.loco.steam_loco import SteamLoco
+from loco_sound.sound.cache import sound_cache
+from loco_sound.tests.sound_files import write_sound_files
+from loco_sound.z21 import LocoInfo
+
+CONFIG = """
+z21:
+  host: 10.0.0.5
+  port: 21106
+locos:
+  3:
+    name: BR 01
+    sound_package: steam
+    sound_package_config:
+      - wheel_radius: 1000
+      - max_speed: 130
+  5:
+"""
+
+
+class ConfigTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, 'config.yaml')
+
+    def write_config(self, content: str) -> Config:
+        with open(self.path, 'w') as config_file:
+            config_file.write(content)
+        return Config.from_file(self.path)
+
+    def test_from_file(self):
+        config = self.write_config(CONFIG)
+        self.assertEqual(('10.0.0.5', 21106), (config.z21_host, config.z21_port))
+        self.assertEqual([3, 5], sorted(config.locos))
+        self.assertEqual('BR 01', config.locos[3].name)
+        self.assertEqual({'wheel_radius': 1000, 'max_speed': 130}, config.locos[3].sound_package_config)
+        # steam is the default sound package
+        self.assertEqual('steam', config.locos[5].sound_package)
+        self.assertEqual({}, config.locos[5].sound_package_config)
+
+    def test_empty_file(self):
+        config = self.write_config('')
+        self.assertEqual({}, config.locos)
+        self.assertEqual(21105, config.z21_port)
+
+    def test_unknown_sound_package(self):
+        with self.assertRaises(ValueError):
+            self.write_config('locos:\n  3:\n    sound_package: tram\n')
+
+    def test_locos_are_created_on_their_first_update(self):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 256)
+        self.addCleanup(pygame.mixer.quit)
+        write_sound_files(self.directory)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory)
+        sound_cache.clear()
+        self.addCleanup(sound_cache.clear)
+
+        loco_collector = LocoCollector(self.write_config(CONFIG).locos)
+        self.assertEqual(0, len(sound_cache))
+        # locos which are not configured are ignored
+        loco_collector.update_locos(LocoInfo(loco_address=4, dcc_speed_steps=126, direction=1, speed=0))
+        self.assertEqual(0, len(sound_cache))
+        loco_collector.update_locos(LocoInfo(loco_address=3, dcc_speed_steps=126, direction=1, speed=0))
+        self.assertGreater(len(sound_cache), 0)
+        loco = loco_collector[3]
+        self.addCleanup(loco_collector.remove_locos, 3)
+        self.assertIsInstance(loco, SteamLoco)
+        self.assertIs(loco_collector.scheduler, loco.scheduler)
+
+
+if __name__ == '__main__':
+    unittest.main()
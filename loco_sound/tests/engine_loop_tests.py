@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pygame
+
+from loco_sound.loco import LocoCollector
+from loco_sound.loco.diesel_loco import DieselLoco
+from loco_sound.sound.engine_loop import pitch_variants, resample
+from loco_sound.tests.sound_files import LOCO_SOUND_FILES, write_sound_files
+
+
+class ResampleTests(unittest.TestCase):
+    def test_pitch_changes_the_length(self):
+        samples = np.arange(200, dtype=np.int16).reshape(-1, 2)
+        self.assertEqual((50, 2), resample(samples, 2.0).shape)
+        self.assertEqual((200, 2), resample(samples, 0.5).shape)
+        np.testing.assert_array_equal(samples, resample(samples, 1.0))
+
+
+class EngineLoopTests(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 256)
+        self.addCleanup(pygame.mixer.quit)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_sound_files(directory.name, LOCO_SOUND_FILES + (DieselLoco.engine_sound,))
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        self.loco_collector = LocoCollector()
+        self.addCleanup(self.loco_collector.ambient_mixer.stop)
+
+    def add_diesel(self, loco_number: int) -> DieselLoco:
+        loco = DieselLoco(loco_number)
+        self.loco_collector.add_locos(loco)
+        self.addCleanup(self.loco_collector.remove_locos, loco_number)
+        return loco
+
+    def test_variants_are_resampled_once(self):
+        first = self.add_diesel(3)
+        second = self.add_diesel(4)
+        self.assertIs(first._engine_variants, second._engine_variants)
+        self.assertEqual(1, len(pitch_variants))
+        self.assertEqual(DieselLoco.pitch_bands, len(first._engine_variants))
+        lengths = [len(variant) for variant in first._engine_variants]
+        # higher pitches are shorter
+        self.assertEqual(sorted(lengths, reverse=True), lengths)
+
+        self.loco_collector.remove_locos(3)
+        self.assertEqual(1, len(pitch_variants))
+        self.loco_collector.remove_locos(4)
+        self.assertEqual(0, len(pitch_variants))
+
+    def test_variant_follows_the_speed(self):
+        loco = self.add_diesel(3)
+        loco.speed = 1
+        engine_loop = loco._engine_loop
+        self.assertEqual(0, engine_loop.band)
+        self.assertIs(loco._engine_variants[0], engine_loop._source.samples)
+
+        # a faster speed within the band only changes the gain
+        source = engine_loop._source
+        loco.speed = 10
+        self.assertIs(source, engine_loop._source)
+
+        loco.speed = 126
+        self.assertEqual(DieselLoco.pitch_bands - 1, engine_loop.band)
+        self.assertIs(loco._engine_variants[-1], engine_loop._source.samples)
+        # the previous variant fades out
+        self.assertTrue(source.removed)
+
+        loco.speed = 0
+        self.assertFalse(engine_loop.running)
+
+
+if __name__ == '__main__':
+    unittest.main()
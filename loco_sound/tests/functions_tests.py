@@ -0,0 +1,61 @@
+import unittest
+
+from loco_sound.z21 import LocoInfo
+from loco_sound.z21.functions import FUNCTION_COUNT, FunctionState, decode_function_mask, iter_function_numbers
+
+
+def db_data(*function_bytes: int) -> bytes:
+    # address, speed steps and speed in front of the function bytes
+    return bytes([0x00, 0x03, 0x04, 0x85, *function_bytes])
+
+
+class DecodeFunctionMaskTests(unittest.TestCase):
+    def test_db4_holds_f0_to_f4(self):
+        self.assertEqual((0b00001, 5), decode_function_mask(db_data(0b10000)))
+        self.assertEqual((0b11110, 5), decode_function_mask(db_data(0b01111)))
+
+    def test_further_bytes_hold_f5_to_f31(self):
+        mask, count = decode_function_mask(db_data(0, 0b1, 0b1, 0b1, 0b100))
+        self.assertEqual([5, 13, 21, 31], list(iter_function_numbers(mask)))
+        self.assertEqual(FUNCTION_COUNT, count)
+
+    def test_count_of_a_message_without_db8(self):
+        self.assertEqual((1 << 28, 29), decode_function_mask(db_data(0, 0, 0, 0b10000000)))
+
+    def test_trailing_bytes_are_no_functions(self):
+        mask, count = decode_function_mask(db_data(0x1f, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff))
+        self.assertEqual((1 << FUNCTION_COUNT) - 1, mask)
+        self.assertEqual(FUNCTION_COUNT, count)
+
+    def test_message_without_function_bytes(self):
+        self.assertEqual((0, 0), decode_function_mask(db_data()))
+
+
+class FunctionStateTests(unittest.TestCase):
+    def test_from_dict(self):
+        functions = FunctionState.from_dict({0: True, 3: False, 7: True})
+        self.assertEqual(0b10000001, functions.mask)
+        self.assertEqual(8, len(functions))
+        self.assertTrue(functions[7])
+        self.assertFalse(functions[3])
+        self.assertEqual([0, 7], functions.active())
+
+    def test_unknown_function_is_not_selected(self):
+        functions = FunctionState(0b11111, 5)
+        self.assertFalse(functions[5])
+        self.assertFalse(functions[-1])
+        self.assertNotIn(5, functions)
+        self.assertIn(4, functions)
+
+
+class LocoInfoFunctionsTests(unittest.TestCase):
+    def test_functions_dict_is_converted(self):
+        with self.assertWarns(DeprecationWarning):
+            loco_info = LocoInfo(3, 126, 1, 0, functions={0: True, 3: False, 7: True})
+        self.assertEqual(0b10000001, loco_info.function_mask)
+        self.assertEqual(8, loco_info.function_count)
+        self.assertEqual({0: True, 3: False, 7: True}, {n: loco_info.functions[n] for n in (0, 3, 7)})
+
+
+if __name__ == '__main__':
+    unittest.main()
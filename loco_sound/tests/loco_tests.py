@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from typing import List, Tuple
+
+import pygame
+
+from loco_sound.loco import Loco
+from loco_sound.tests.sound_files import write_sound_files
+
+
+class RecordingLoco(Loco):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls: List[Tuple[int, bool]] = []
+
+    def change_f_7(self, new_value: bool, *args, **kwargs):
+        self.calls.append((7, new_value))
+
+    def change_f_31(self, new_value: bool, *args, **kwargs):
+        self.calls.append((31, new_value))
+
+
+class SubRecordingLoco(RecordingLoco):
+    def change_f_7(self, new_value: bool, *args, **kwargs):
+        self.calls.append((-7, new_value))
+
+
+class FunctionHandlerTests(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 256)
+        self.addCleanup(pygame.mixer.quit)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_sound_files(directory.name)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+
+    def create_loco(self, loco_class):
+        loco = loco_class(3)
+        self.addCleanup(loco.unload_sounds)
+        return loco
+
+    def test_each_class_has_its_own_table(self):
+        self.assertIs(Loco.change_f_7, Loco._function_handlers[7])
+        self.assertIs(RecordingLoco.change_f_7, RecordingLoco._function_handlers[7])
+        self.assertIs(SubRecordingLoco.change_f_7, SubRecordingLoco._function_handlers[7])
+        self.assertIsNone(Loco._function_handlers[31])
+        self.assertIs(RecordingLoco.change_f_31, SubRecordingLoco._function_handlers[31])
+
+    def test_changed_functions_are_dispatched_to_the_subclass(self):
+        loco = self.create_loco(RecordingLoco)
+        loco.update_function_mask(1 << 7 | 1 << 31, 32)
+        loco.update_function_mask(1 << 31, 32)
+        self.assertEqual([(7, True), (31, True), (7, False)], loco.calls)
+
+    def test_override_of_a_subclass_is_used(self):
+        loco = self.create_loco(SubRecordingLoco)
+        loco.update_function_mask(1 << 7, 8)
+        self.assertEqual([(-7, True)], loco.calls)
+
+    def test_unchanged_functions_are_not_dispatched(self):
+        loco = self.create_loco(RecordingLoco)
+        loco.update_function_mask(1 << 7 | 1 << 31, 32)
+        loco.update_function_mask(1 << 7 | 1 << 31, 32)
+        # F31 is not part of the update so it keeps its state
+        loco.update_function_mask(1 << 7, 8)
+        self.assertEqual([(7, True), (31, True)], loco.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
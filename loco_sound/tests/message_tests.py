@@ -0,0 +1,35 @@
+import unittest
+
+from loco_sound.z21 import LocoInfo, Message
+
+# LAN_X_LOCO_INFO of loco 3 at speed step 4 with F0 selected
+LOCO_INFO = bytes([0x0e, 0x00, 0x40, 0x00, 0xef, 0x00, 0x03, 0x04, 0x85, 0x10, 0x01, 0x00, 0x00, 0x7b])
+# reply of LAN_GET_SERIAL_NUMBER
+SERIAL_NUMBER = bytes([0x08, 0x00, 0x10, 0x00, 0x34, 0x12, 0x00, 0x00])
+
+
+class FromZ21PacketTests(unittest.TestCase):
+    def test_single_dataset(self):
+        messages = list(Message.from_z21_packet(LOCO_INFO))
+        self.assertEqual(1, len(messages))
+        self.assertEqual(LOCO_INFO, messages[0].data)
+        self.assertTrue(LocoInfo.is_loco_info(messages[0]))
+
+    def test_stacked_datasets(self):
+        messages = list(Message.from_z21_packet(SERIAL_NUMBER + LOCO_INFO + SERIAL_NUMBER))
+        self.assertEqual([b'\x10\x00', b'\x40\x00', b'\x10\x00'], [bytes(message.header) for message in messages])
+        self.assertEqual(3, LocoInfo.from_z21_response(messages[1]).loco_address)
+
+    def test_invalid_length_stops_splitting(self):
+        broken = bytes([0xff, 0x00]) + LOCO_INFO[2:]
+        with self.assertLogs('loco_sound.z21.message', 'WARNING'):
+            messages = list(Message.from_z21_packet(SERIAL_NUMBER + broken))
+        self.assertEqual([b'\x10\x00'], [bytes(message.header) for message in messages])
+
+    def test_trailing_bytes_are_ignored(self):
+        messages = list(Message.from_z21_packet(LOCO_INFO + LOCO_INFO + b'\x01'))
+        self.assertEqual([LOCO_INFO, LOCO_INFO], [message.data for message in messages])
+
+
+if __name__ == '__main__':
+    unittest.main()
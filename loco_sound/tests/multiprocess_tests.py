@@ -0,0 +1,91 @@
+import multiprocessing
+import unittest
+from typing import List
+
+from loco_sound.multiprocess import EventRing, SharedLocoTable, SharedStateCollector
+from loco_sound.z21 import LocoInfo
+
+
+def loco_info(loco_address: int, speed: int, function_mask: int = 0) -> LocoInfo:
+    return LocoInfo(
+        loco_address=loco_address,
+        dcc_speed_steps=126,
+        direction=1,
+        speed=speed,
+        function_mask=function_mask,
+        function_count=32,
+    )
+
+
+def write_speeds(table: SharedLocoTable, ring: EventRing, speeds: List[int]):
+    for speed in speeds:
+        table.write(loco_info(3, speed))
+        ring.push(loco_info(3, speed))
+
+
+class SharedLocoTableTests(unittest.TestCase):
+    def test_latest_state_of_each_loco(self):
+        table = SharedLocoTable(capacity=2)
+        self.assertTrue(table.write(loco_info(3, 10)))
+        self.assertTrue(table.write(loco_info(4, 20, function_mask=0b101)))
+        self.assertTrue(table.write(loco_info(3, 11)))
+        self.assertEqual(2, len(table))
+        self.assertEqual(
+            [(3, 11, 0), (4, 20, 0b101)],
+            [(info.loco_address, info.speed, info.function_mask) for info in table.snapshot()],
+        )
+
+    def test_full_table_drops_new_locos(self):
+        table = SharedLocoTable(capacity=1)
+        table.write(loco_info(3, 10))
+        with self.assertLogs('loco_sound.multiprocess', 'WARNING'):
+            self.assertFalse(table.write(loco_info(4, 20)))
+        self.assertTrue(table.write(loco_info(3, 12)))
+        self.assertEqual(12, table.read(0).speed)
+
+
+class EventRingTests(unittest.TestCase):
+    def test_updates_in_their_order(self):
+        ring = EventRing(capacity=4)
+        for speed in range(3):
+            ring.push(loco_info(3, speed))
+        self.assertEqual([0, 1, 2], [info.speed for info in ring.pop_all()])
+        self.assertEqual([], ring.pop_all())
+
+    def test_full_ring_drops_updates(self):
+        ring = EventRing(capacity=2)
+        self.assertEqual([True, True, False], [ring.push(loco_info(3, speed)) for speed in range(3)])
+        self.assertEqual(1, ring.dropped)
+        self.assertEqual([0, 1], [info.speed for info in ring.pop_all()])
+        # space is available again after the consumer read the ring
+        self.assertTrue(ring.push(loco_info(3, 3)))
+
+    def test_written_by_another_process(self):
+        table = SharedLocoTable()
+        ring = EventRing()
+        process = multiprocessing.Process(target=write_speeds, args=(table, ring, [10, 20, 30]))
+        process.start()
+        process.join(10)
+        self.assertEqual(0, process.exitcode)
+        self.assertEqual([10, 20, 30], [info.speed for info in ring.pop_all()])
+        self.assertEqual(30, table.read(0).speed)
+
+
+class SharedStateCollectorTests(unittest.TestCase):
+    def test_callbacks_of_changed_functions(self):
+        collector = SharedStateCollector()
+        calls = []
+        collector.bind_to_functions(lambda new_value, **kwargs: calls.append(new_value), 3, 2)
+        collector.update_locos(loco_info(3, 0, function_mask=0b100))
+        collector.update_locos(loco_info(3, 0, function_mask=0b101))
+        collector.update_locos(loco_info(3, 0))
+        self.assertEqual([True, False], calls)
+        self.assertTrue(collector.wakeup.is_set())
+        self.assertEqual(3, len(collector.ring.pop_all()))
+        self.assertEqual(0, collector.loco_info(3).function_mask)
+        with self.assertRaises(KeyError):
+            collector.loco_info(4)
+
+
+if __name__ == '__main__':
+    unittest.main()
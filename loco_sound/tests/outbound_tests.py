@@ -0,0 +1,74 @@
+import time
+import unittest
+from typing import List
+
+from loco_sound.z21 import OutboundQueue
+
+
+class OutboundQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.packets: List[bytes] = []
+        self.queue = OutboundQueue(self.packets.append, packets_per_second=10.0, burst=2, max_packet_size=8)
+        self.now = time.monotonic_ns()
+
+    def test_messages_share_a_packet(self):
+        self.queue.put(b'abc')
+        self.queue.put(b'def')
+        self.assertEqual(1, self.queue.flush(self.now))
+        self.assertEqual([b'abcdef'], self.packets)
+        self.assertEqual(0, len(self.queue))
+
+    def test_packets_are_limited_in_size(self):
+        for message in (b'abc', b'def', b'ghi'):
+            self.queue.put(message)
+        self.assertEqual(2, self.queue.flush(self.now))
+        self.assertEqual([b'abcdef', b'ghi'], self.packets)
+
+    def test_packets_are_limited_in_datasets(self):
+        queue = OutboundQueue(self.packets.append, max_datasets=2)
+        for message in (b'a', b'b', b'c'):
+            queue.put(message)
+        self.assertEqual(2, queue.flush(self.now))
+        self.assertEqual([b'ab', b'c'], self.packets)
+
+    def test_message_which_does_not_fit_into_a_packet(self):
+        with self.assertRaises(ValueError):
+            self.queue.put(b'123456789')
+
+    def test_key_supersedes_waiting_message(self):
+        self.assertTrue(self.queue.put(b'a1', key='a'))
+        self.assertTrue(self.queue.put(b'b1', key='b'))
+        self.assertFalse(self.queue.put(b'a2', key='a'))
+        self.queue.flush(self.now)
+        self.assertEqual([b'a2b1'], self.packets)
+        self.assertEqual({'pending': 0, 'queued': 3, 'superseded': 1, 'packets': 1}, self.queue.metrics())
+
+    def test_identical_messages_supersede_each_other(self):
+        self.queue.put(b'abc')
+        self.assertFalse(self.queue.put(b'abc'))
+        self.queue.flush(self.now)
+        self.assertEqual([b'abc'], self.packets)
+
+    def test_rate_limit(self):
+        for message in (b'aaaaa', b'bbbbb', b'ccccc', b'ddddd'):
+            self.queue.put(message)
+        # the burst allows two packets at once
+        self.assertEqual(2, self.queue.flush(self.now))
+        self.assertEqual(0, self.queue.flush(self.now))
+        next_flush = self.queue.next_flush(self.now)
+        self.assertEqual(self.now + 100_000_000, next_flush)
+        self.assertEqual(1, self.queue.flush(next_flush))
+        self.assertEqual(1, self.queue.flush(next_flush + 100_000_000))
+        self.assertEqual([b'aaaaa', b'bbbbb', b'ccccc', b'ddddd'], self.packets)
+        self.assertIsNone(self.queue.next_flush(next_flush + 100_000_000))
+
+    def test_tokens_refill_up_to_the_burst(self):
+        self.queue.put(b'aaaaa')
+        self.queue.flush(self.now)
+        for message in (b'bbbbb', b'ccccc', b'ddddd'):
+            self.queue.put(message)
+        self.assertEqual(2, self.queue.flush(self.now + 10_000_000_000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pygame
+
+from loco_sound.sound.backend import NullBackend, PcmSound
+from loco_sound.sound.cache import SoundCache
+from loco_sound.sound.pcm_cache import PcmCache
+from loco_sound.tests.backend_helpers import use_audio_backend
+from loco_sound.tests.sound_files import write_sound_files
+
+
+class PcmCacheTests(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 256)
+        self.addCleanup(pygame.mixer.quit)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        write_sound_files(self.directory, ('horn.wav', 'idle.wav'))
+        self.path = os.path.join(self.directory, 'horn.wav')
+        self.pcm_cache = PcmCache(os.path.join(self.directory, 'cache'))
+
+    def test_miss_stores_the_decoded_sound(self):
+        sound = self.pcm_cache.load(self.path)
+        self.assertEqual((0, 1), (self.pcm_cache.hits, self.pcm_cache.misses))
+        self.assertTrue(os.path.exists(self.pcm_cache.cache_path(self.path)))
+        self.assertEqual(pygame.mixer.Sound(self.path).get_raw(), sound.get_raw())
+
+    def test_hit_loads_the_cached_frames(self):
+        decoded = self.pcm_cache.load(self.path).get_raw()
+        cached = self.pcm_cache.load(self.path)
+        self.assertEqual((1, 1), (self.pcm_cache.hits, self.pcm_cache.misses))
+        self.assertEqual(decoded, cached.get_raw())
+
+    def test_changed_sound_file_is_decoded_again(self):
+        self.pcm_cache.load(self.path)
+        old_cache_path = self.pcm_cache.cache_path(self.path)
+        write_sound_files(self.directory, ('horn.wav',), seconds=0.2)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertNotEqual(old_cache_path, self.pcm_cache.cache_path(self.path))
+        sound = self.pcm_cache.load(self.path)
+        self.assertEqual((0, 2), (self.pcm_cache.hits, self.pcm_cache.misses))
+        self.assertAlmostEqual(0.2, sound.get_length(), places=3)
+
+    def test_invalid_cached_sound_is_decoded_again(self):
+        decoded = self.pcm_cache.load(self.path).get_raw()
+        cache_path = self.pcm_cache.cache_path(self.path)
+        with open(cache_path, 'rb') as cache_file:
+            cached = cache_file.read()
+        for content in (b'', cached[:10], cached[:-2], b'LSPCM\x00\x00\x00' + cached[8:]):
+            with self.subTest(size=len(content)):
+                with open(cache_path, 'wb') as cache_file:
+                    cache_file.write(content)
+                with self.assertLogs('loco_sound.sound.pcm_cache', 'WARNING'):
+                    sound = self.pcm_cache.load(self.path)
+                self.assertEqual(decoded, sound.get_raw())
+                # the decoded sound replaced the invalid one
+                with open(cache_path, 'rb') as cache_file:
+                    self.assertEqual(cached, cache_file.read())
+        self.assertEqual(0, self.pcm_cache.hits)
+
+    def test_compile_all(self):
+        self.assertEqual(2, self.pcm_cache.compile_all([self.directory]))
+        self.assertEqual(0, self.pcm_cache.compile_all([self.directory, self.path]))
+        self.pcm_cache.load(self.path)
+        self.assertEqual((1, 0), (self.pcm_cache.hits, self.pcm_cache.misses))
+
+    def test_sound_cache_loads_via_pcm_cache(self):
+        sound_cache = SoundCache()
+        sound_cache.pcm_cache = self.pcm_cache
+        sound = sound_cache.acquire(self.path)
+        self.assertIs(sound, sound_cache.acquire(self.path))
+        self.assertEqual((0, 1), (self.pcm_cache.hits, self.pcm_cache.misses))
+
+
+class PcmBackendCacheTests(unittest.TestCase):
+    def setUp(self):
+        use_audio_backend(self, NullBackend())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_sound_files(directory.name, ('horn.wav',))
+        self.path = os.path.join(directory.name, 'horn.wav')
+        self.pcm_cache = PcmCache(os.path.join(directory.name, 'cache'))
+
+    def test_hit_maps_the_cached_frames(self):
+        decoded = self.pcm_cache.load(self.path)
+        cached = self.pcm_cache.load(self.path)
+        self.assertEqual((1, 1), (self.pcm_cache.hits, self.pcm_cache.misses))
+        self.assertIsInstance(cached, PcmSound)
+        # the frames are read from the file on demand instead of being copied
+        self.assertIsInstance(cached.frames, np.memmap)
+        self.assertFalse(cached.frames.flags.writeable)
+        np.testing.assert_array_equal(decoded.frames, cached.frames)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import List
+
+from loco_sound.loco import LocoCollector
+from loco_sound.replay import Replayer
+from loco_sound.tests.async_helpers import free_udp_ports, wait_until
+from loco_sound.z21 import AsyncClient, LocoInfo, Message
+from loco_sound.z21.fake_z21 import FakeZ21
+from loco_sound.z21.recording import Recorder, read_recording
+
+
+def loco_info_datagram(loco_address: int, speed: int) -> bytes:
+    loco_info = LocoInfo(loco_address=loco_address, dcc_speed_steps=126, direction=1, speed=speed)
+    return bytes(loco_info.to_message().data)
+
+
+class RecordingLocoCollector(LocoCollector):
+    def __init__(self):
+        super().__init__()
+        self.loco_infos: List[LocoInfo] = []
+
+    def update_locos(self, *loco_infos: LocoInfo):
+        self.loco_infos.extend(loco_infos)
+
+
+class RecordingTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'z21.rec')
+
+    def record(self, *records):
+        with Recorder(self.path) as recorder:
+            for timestamp, datagram in records:
+                recorder.record(datagram, recorder._start + timestamp)
+
+    def test_round_trip(self):
+        records = [(0, loco_info_datagram(3, 10)), (5_000_000, b'\x04\x00\x30\x00'), (7_000_000, b'')]
+        self.record(*records)
+        self.assertEqual(records, list(read_recording(self.path)))
+
+    def test_no_recording(self):
+        with open(self.path, 'wb') as recording:
+            recording.write(b'something else')
+        with self.assertRaises(ValueError):
+            list(read_recording(self.path))
+
+    def test_truncated_recording(self):
+        self.record((0, loco_info_datagram(3, 10)), (1, loco_info_datagram(3, 11)))
+        with open(self.path, 'r+b') as recording:
+            recording.truncate(os.path.getsize(self.path) - 1)
+        with self.assertLogs('loco_sound.z21.recording', 'WARNING'):
+            records = list(read_recording(self.path))
+        self.assertEqual([(0, loco_info_datagram(3, 10))], records)
+
+    def test_replay(self):
+        self.record(
+            (0, loco_info_datagram(3, 10)),
+            # two stacked loco infos and an invalid datagram
+            (1_000_000, loco_info_datagram(4, 20) + loco_info_datagram(3, 11)),
+            (2_000_000, b'\x00'),
+        )
+        loco_collector = RecordingLocoCollector()
+        replayer = Replayer(loco_collector, self.path)
+        self.assertEqual(3, replayer.replay(realtime=False))
+        self.assertEqual(3, replayer.datagrams)
+        self.assertEqual(
+            [(3, 10), (4, 20), (3, 11)],
+            [(loco_info.loco_address, loco_info.speed) for loco_info in loco_collector.loco_infos],
+        )
+
+
+class FakeZ21Tests(unittest.TestCase):
+    def test_subscriber_receives_loco_infos(self):
+        asyncio.run(self._subscribe_to_fake_z21())
+
+    async def _subscribe_to_fake_z21(self):
+        z21_port, local_port = free_udp_ports(2)
+        fake_z21 = await FakeZ21.start(port=z21_port, serial_number=0xbeef)
+        messages: List[Message] = []
+        client = await AsyncClient.connect(messages.append, host='127.0.0.1', port=z21_port, local_port=local_port)
+        try:
+            client.send_welcome()
+            client.subscribe_to_all_locos()
+            await wait_until(lambda: fake_z21.subscribers)
+            # the reply of the welcome carries the serial number
+            await wait_until(lambda: messages)
+            self.assertEqual(b'\xef\xbe\x00\x00', bytes(messages[0].data[4:8]))
+
+            fake_z21.send_loco_info(LocoInfo(loco_address=3, dcc_speed_steps=126, direction=1, speed=40))
+            await wait_until(lambda: any(LocoInfo.is_loco_info(message) for message in messages))
+            loco_info = LocoInfo.from_z21_response(messages[-1])
+            self.assertEqual((3, 40), (loco_info.loco_address, loco_info.speed))
+
+            client.close()
+            await wait_until(lambda: not fake_z21.subscribers)
+        finally:
+            client.close()
+            fake_z21.close()
+
+    def test_recording_is_sent_to_subscribers(self):
+        asyncio.run(self._play_recording())
+
+    async def _play_recording(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'z21.rec')
+        with Recorder(path) as recorder:
+            for speed in (10, 20, 30):
+                recorder.record(loco_info_datagram(3, speed))
+
+        z21_port, local_port = free_udp_ports(2)
+        fake_z21 = await FakeZ21.start(port=z21_port)
+        speeds: List[int] = []
+        client = await AsyncClient.connect(
+            lambda message: speeds.append(LocoInfo.from_z21_response(message).speed),
+            host='127.0.0.1',
+            port=z21_port,
+            local_port=local_port,
+        )
+        try:
+            client.subscribe_to_all_locos()
+            await wait_until(lambda: fake_z21.subscribers)
+            self.assertEqual(3, await fake_z21.play_recording(path, realtime=False))
+            await wait_until(lambda: len(speeds) == 3)
+            self.assertEqual([10, 20, 30], speeds)
+        finally:
+            client.close()
+            fake_z21.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
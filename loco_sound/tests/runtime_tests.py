@@ -0,0 +1,70 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from loco_sound.loco import Loco, LocoCollector
+from loco_sound.runtime import Runtime
+from loco_sound.sound.backend import NullBackend
+from loco_sound.tests.async_helpers import free_udp_ports, wait_until
+from loco_sound.tests.backend_helpers import use_audio_backend
+from loco_sound.tests.sound_files import write_sound_files
+from loco_sound.z21 import FakeZ21, LocoInfo
+
+
+class RuntimeTests(unittest.TestCase):
+    """
+    Runs the whole stack from the socket to the voices against a :class:`~loco_sound.z21.FakeZ21`
+    with the :class:`~loco_sound.sound.backend.NullBackend`.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_sound_files(directory.name)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        self.voice_manager = use_audio_backend(self, NullBackend())
+
+    def test_loco_info_of_fake_z21_reaches_the_loco(self):
+        asyncio.run(self._run_against_fake_z21())
+
+    async def _run_against_fake_z21(self):
+        z21_port, local_port = free_udp_ports(2)
+        fake_z21 = await FakeZ21.start(port=z21_port)
+        loco_collector = LocoCollector()
+        loco_collector.add_locos(Loco(3))
+        self.addCleanup(loco_collector.clear)
+        runtime = Runtime(loco_collector, host='127.0.0.1', port=z21_port, local_port=local_port)
+        run = asyncio.ensure_future(runtime.run())
+        try:
+            await wait_until(lambda: fake_z21.subscribers)
+            fake_z21.send_loco_info(LocoInfo(
+                loco_address=3,
+                dcc_speed_steps=126,
+                direction=1,
+                speed=40,
+                function_mask=1 << 7,
+                function_count=29,
+            ))
+            await wait_until(lambda: loco_collector[3].speed == 40)
+            self.assertEqual(1, loco_collector[3].direction)
+            self.assertTrue(loco_collector[3].functions[7])
+            # the horn of F7 plays on the null backend
+            voices = [voice for voice in self.voice_manager._voices if voice is not None and voice.active]
+            self.assertIn(loco_collector[3].f_sounds[7], [voice.sound for voice in voices])
+            # the same state again is dropped as duplicate
+            fake_z21.send_loco_info(loco_collector.loco_info(3))
+            await wait_until(lambda: loco_collector.dedup_metrics()['duplicate'] == 1)
+        finally:
+            runtime.stop()
+            await run
+            runtime.close()
+        try:
+            # the runtime logs off
+            await wait_until(lambda: not fake_z21.subscribers)
+        finally:
+            fake_z21.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from typing import List
+
+from loco_sound.loco.scheduler import Scheduler
+
+
+class SchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.calls: List[str] = []
+
+    def call(self, name: str):
+        return lambda: self.calls.append(name)
+
+    def test_calls_run_in_order_of_their_deadline(self):
+        self.scheduler.call_at(300, self.call('c'))
+        self.scheduler.call_at(100, self.call('a'))
+        self.scheduler.call_at(200, self.call('b'))
+        self.assertEqual(100, self.scheduler.peek())
+        self.assertEqual(3, self.scheduler.run_due(300))
+        self.assertEqual(['a', 'b', 'c'], self.calls)
+        self.assertIsNone(self.scheduler.peek())
+
+    def test_calls_with_the_same_deadline_keep_their_order(self):
+        for name in 'abc':
+            self.scheduler.call_at(100, self.call(name))
+        self.scheduler.run_due(100)
+        self.assertEqual(['a', 'b', 'c'], self.calls)
+
+    def test_only_due_calls_run(self):
+        self.scheduler.call_at(100, self.call('a'))
+        self.scheduler.call_at(200, self.call('b'))
+        self.assertEqual(1, self.scheduler.run_due(150))
+        self.assertEqual(['a'], self.calls)
+        self.assertEqual(200, self.scheduler.peek())
+        self.assertEqual(1, len(self.scheduler))
+
+    def test_calls_scheduled_by_a_call_run_if_they_are_due(self):
+        self.scheduler.call_at(100, lambda: self.scheduler.call_at(120, self.call('due')))
+        self.scheduler.call_at(100, lambda: self.scheduler.call_at(300, self.call('later')))
+        self.assertEqual(3, self.scheduler.run_due(200))
+        self.assertEqual(['due'], self.calls)
+        self.assertEqual(300, self.scheduler.peek())
+
+    def test_cancelled_call_does_not_run(self):
+        cancelled = self.scheduler.call_at(100, self.call('a'))
+        self.scheduler.call_at(200, self.call('b'))
+        cancelled.cancel()
+        self.assertEqual(1, len(self.scheduler))
+        self.assertEqual(200, self.scheduler.peek())
+        self.assertEqual(1, self.scheduler.run_due(200))
+        self.assertEqual(['b'], self.calls)
+
+    def test_earlier_deadline_is_reported(self):
+        deadlines: List[int] = []
+        self.scheduler.on_earlier_deadline = deadlines.append
+        self.scheduler.call_at(200, self.call('a'))
+        self.scheduler.call_at(300, self.call('b'))
+        self.scheduler.call_at(100, self.call('c'))
+        # a call after the first deadline does not need an earlier wake up
+        self.assertEqual([200, 100], deadlines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+import unittest
+
+from loco_sound.loco.snapshot import SNAPSHOT_MAGIC, read_snapshot, write_snapshot
+from loco_sound.z21 import LocoInfo
+
+
+def loco_info_fields(loco_info: LocoInfo):
+    return (
+        loco_info.loco_address,
+        loco_info.dcc_speed_steps,
+        loco_info.direction,
+        loco_info.speed,
+        loco_info.function_mask,
+        loco_info.function_count,
+    )
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'locos.snap')
+
+    def test_round_trip(self):
+        stations = {
+            'z21': [
+                LocoInfo(loco_address=3, dcc_speed_steps=126, direction=1, speed=40, function_mask=0b10001,
+                         function_count=29),
+                LocoInfo(loco_address=9999, dcc_speed_steps=28, direction=0, speed=0, function_mask=1 << 31,
+                         function_count=32),
+            ],
+            'yard': [],
+        }
+        before = time.time()
+        write_snapshot(self.path, stations)
+        saved, restored = read_snapshot(self.path)
+        self.assertGreaterEqual(saved, before)
+        self.assertEqual(['z21', 'yard'], list(restored))
+        self.assertEqual(
+            [loco_info_fields(loco_info) for loco_info in stations['z21']],
+            [loco_info_fields(loco_info) for loco_info in restored['z21']],
+        )
+        self.assertEqual([], restored['yard'])
+        self.assertEqual(['locos.snap'], os.listdir(os.path.dirname(self.path)))
+
+    def test_no_snapshot(self):
+        with open(self.path, 'wb') as snapshot_file:
+            snapshot_file.write(b'something else')
+        with self.assertRaises(ValueError):
+            read_snapshot(self.path)
+
+    def test_truncated_snapshot(self):
+        write_snapshot(self.path, {'z21': [LocoInfo(loco_address=3, dcc_speed_steps=126, direction=1, speed=0)]})
+        with open(self.path, 'rb') as snapshot_file:
+            data = snapshot_file.read()
+        for length in (len(SNAPSHOT_MAGIC) + 1, len(data) - 1):
+            with open(self.path, 'wb') as snapshot_file:
+                snapshot_file.write(data[:length])
+            with self.assertRaises(ValueError):
+                read_snapshot(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import wave
+
+import numpy as np
+
+# sound files which are loaded by each loco
+LOCO_SOUND_FILES = ('horn.wav', 'idle.wav', 'train.wav', 'cyl_1_n.wav', 'cyl_2.wav', 'brakes.wav', 'steam.wav')
+
+
+def write_sound_files(directory: str, names=LOCO_SOUND_FILES, frequency: int = 44100, seconds: float = 0.1) -> None:
+    """
+    Writes a short stereo tone for each sound file so locos can be created
+    without the sounds of a real loco.
+
+    :param directory: Directory of the sound files.
+    :param names: Names of the sound files.
+    :param frequency: Frequency of the files.
+    :param seconds: Length of each tone.
+    """
+    frames = np.arange(int(frequency * seconds))
+    for index, name in enumerate(names):
+        tone = (np.sin(2 * np.pi * (220 + 110 * index) * frames / frequency) * 8000).astype('<i2')
+        with wave.open(os.path.join(directory, name), 'wb') as wave_file:
+            wave_file.setnchannels(2)
+            wave_file.setsampwidth(2)
+            wave_file.setframerate(frequency)
+            wave_file.writeframes(np.repeat(tone, 2).tobytes())
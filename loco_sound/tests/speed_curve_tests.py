@@ -0,0 +1,40 @@
+import math
+import unittest
+
+from loco_sound.loco.speed_curve import SpeedCurve
+
+
+class SpeedCurveTests(unittest.TestCase):
+    def test_standing_loco_has_no_interval(self):
+        speed_curve = SpeedCurve()
+        self.assertIsNone(speed_curve.interval(0))
+        self.assertIsNone(speed_curve.interval(-1))
+
+    def test_measured_curve(self):
+        speed_curve = SpeedCurve()
+        self.assertEqual(int(4.6 * 1e9), speed_curve.interval(1))
+        self.assertEqual(int(4.6 * 126 ** -0.75 * 1e9), speed_curve.interval(126))
+        # the same relative speed of each speed step mode
+        self.assertEqual(speed_curve.interval(126), speed_curve.interval(28, 28))
+        self.assertEqual(speed_curve.interval(63), speed_curve.interval(7, 14))
+
+    def test_wheel_rotation(self):
+        # a wheel with 1 m circumference at 36 km/h turns 10 times per second
+        speed_curve = SpeedCurve(wheel_radius=1000 / (2 * math.pi), max_speed=36, cylinders=2)
+        self.assertAlmostEqual(25_000_000, speed_curve.interval(126), delta=1)
+        self.assertAlmostEqual(50_000_000, speed_curve.interval(63), delta=1)
+
+    def test_lookup_is_clamped(self):
+        speed_curve = SpeedCurve()
+        self.assertEqual(speed_curve.interval(28, 28), speed_curve.interval(200, 28))
+        # unknown speed step modes use 126 steps
+        self.assertEqual(speed_curve.interval(40), speed_curve.interval(40, 128))
+
+    def test_from_config(self):
+        speed_curve = SpeedCurve.from_config({'wheel_radius': 800, 'max_speed': 100, 'cylinders': 3})
+        self.assertEqual((800, 100, 3), (speed_curve.wheel_radius, speed_curve.max_speed, speed_curve.cylinders))
+        self.assertEqual(2, SpeedCurve.from_config(None).cylinders)
+
+
+if __name__ == '__main__':
+    unittest.main()
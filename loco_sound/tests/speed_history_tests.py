@@ -0,0 +1,113 @@
+import math
+import os
+import tempfile
+import unittest
+from typing import List
+
+import pygame
+
+from loco_sound.loco import Loco
+from loco_sound.loco.speed_history import SpeedHistory
+from loco_sound.tests.sound_files import write_sound_files
+
+SECOND = 1_000_000_000
+
+
+class SpeedHistoryTests(unittest.TestCase):
+    def test_first_sample_sets_the_velocity(self):
+        speed_history = SpeedHistory()
+        speed_history.append(63, 126, timestamp=SECOND)
+        self.assertEqual(0.5, speed_history.velocity)
+        self.assertEqual(0.0, speed_history.acceleration)
+        self.assertEqual(0.5, speed_history.speed)
+
+    def test_exponential_moving_average(self):
+        speed_history = SpeedHistory(time_constant=0.5)
+        speed_history.append(0, 126, timestamp=0)
+        speed_history.append(126, 126, timestamp=SECOND // 2)
+        weight = 1 - math.exp(-1)
+        self.assertAlmostEqual(weight, speed_history.velocity)
+        # from 0 to top speed within half a second
+        self.assertAlmostEqual(weight * 2.0, speed_history.acceleration)
+        speed_history.append(126, 126, timestamp=SECOND)
+        self.assertAlmostEqual(weight + weight * (1 - weight), speed_history.velocity)
+        self.assertAlmostEqual(weight * 2.0 * (1 - weight), speed_history.acceleration)
+
+    def test_speed_step_modes_are_relative(self):
+        speed_history = SpeedHistory()
+        speed_history.append(14, 28, timestamp=0)
+        self.assertEqual(0.5, speed_history.speed)
+        speed_history.append(5, 0, timestamp=1)
+        self.assertEqual(0.0, speed_history.speed)
+
+    def test_ring_keeps_the_last_samples(self):
+        speed_history = SpeedHistory(capacity=3)
+        for speed in range(5):
+            speed_history.append(speed, 126, timestamp=speed * SECOND)
+        self.assertEqual(3, len(speed_history))
+        self.assertEqual([2 * SECOND, 3 * SECOND, 4 * SECOND], [timestamp for timestamp, _ in speed_history.samples()])
+
+
+class TriggerLoco(Loco):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.played: List[pygame.mixer.Sound] = []
+        self.slips = 0
+
+    def _play(self, sound, priority, loops=0):
+        self.played.append(sound)
+        return None
+
+    def wheel_slip_started(self):
+        self.slips += 1
+
+    def change_speed(self, speed: int, timestamp: int):
+        self._speed = speed
+        self.speed_history.append(speed, 126, timestamp)
+        self._check_speed_triggers()
+
+
+class SpeedTriggerTests(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 256)
+        self.addCleanup(pygame.mixer.quit)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_sound_files(directory.name)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+
+    def create_loco(self, **sound_package_config) -> TriggerLoco:
+        loco = TriggerLoco(3, sound_package_config=sound_package_config)
+        self.addCleanup(loco.unload_sounds)
+        return loco
+
+    def brake(self, loco: TriggerLoco):
+        loco.change_speed(100, 0)
+        # a slow deceleration stays below the threshold
+        loco.change_speed(95, SECOND)
+        self.assertEqual([], loco.played)
+        loco.change_speed(40, SECOND + SECOND // 10)
+        loco.change_speed(20, SECOND + SECOND // 5)
+
+    def test_brake_sound_is_opt_in(self):
+        loco = self.create_loco()
+        self.brake(loco)
+        self.assertEqual([], loco.played)
+
+    def test_hard_braking_plays_the_brake_sound_once(self):
+        loco = self.create_loco(brake_sound=True)
+        self.brake(loco)
+        self.assertEqual([loco.break_sound], loco.played)
+
+    def test_wheel_slip_while_starting(self):
+        loco = self.create_loco()
+        loco.change_speed(0, 0)
+        loco.change_speed(60, SECOND // 10)
+        loco.change_speed(90, SECOND // 5)
+        self.assertEqual(1, loco.slips)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+from typing import Dict, List
+
+from loco_sound.tests.async_helpers import free_udp_ports, wait_until
+from loco_sound.z21 import AsyncClient, FakeZ21, LocoInfo, Message, StationMux
+
+
+class StationMuxTests(unittest.TestCase):
+    def test_datagrams_are_routed_to_the_client_of_their_station(self):
+        asyncio.run(self._route_two_stations())
+
+    async def _route_two_stations(self):
+        main_port, yard_port, local_port = free_udp_ports(3)
+        main = await FakeZ21.start(port=main_port)
+        yard = await FakeZ21.start(port=yard_port)
+        received: Dict[str, List[int]] = {'main': [], 'yard': []}
+
+        def on_message_of(name: str):
+            def on_message(message: Message):
+                if LocoInfo.is_loco_info(message):
+                    received[name].append(LocoInfo.from_z21_response(message).loco_address)
+            return on_message
+
+        mux = await StationMux.connect(
+            {
+                'main': AsyncClient(on_message_of('main'), host='127.0.0.1', port=main_port),
+                'yard': AsyncClient(on_message_of('yard'), host='localhost', port=yard_port),
+            },
+            local_port=local_port,
+        )
+        try:
+            for client in mux.clients.values():
+                client.subscribe_to_all_locos()
+            await wait_until(lambda: main.subscribers and yard.subscribers)
+            # the same address on both stations
+            main.send_loco_info(LocoInfo(loco_address=3, dcc_speed_steps=126, direction=1, speed=10))
+            yard.send_loco_info(
+                LocoInfo(loco_address=3, dcc_speed_steps=126, direction=1, speed=20),
+                LocoInfo(loco_address=4, dcc_speed_steps=126, direction=1, speed=30),
+            )
+            await wait_until(lambda: len(received['main']) == 1 and len(received['yard']) == 2)
+            self.assertEqual({'main': [3], 'yard': [3, 4]}, received)
+
+            with self.assertLogs('loco_sound.z21.station_mux', 'WARNING'):
+                mux.datagram_received(b'\x04\x00\x10\x00', ('127.0.0.1', local_port))
+        finally:
+            mux.close()
+            main.close()
+            yard.close()
+
+    def test_stations_need_their_own_z21(self):
+        async def connect():
+            client = AsyncClient(lambda message: None, host='127.0.0.1', port=port)
+            other = AsyncClient(lambda message: None, host='localhost', port=port)
+            await StationMux.connect({'main': client, 'yard': other}, local_port=local_port)
+
+        port, local_port = free_udp_ports(2)
+        with self.assertRaises(ValueError):
+            asyncio.run(connect())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import unittest
+
+import pygame
+
+from loco_sound.sound.voice import PRIORITY_AMBIENT, PRIORITY_CHUFF, PRIORITY_HORN, VoiceManager
+
+
+class VoiceManagerTests(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 256)
+        self.addCleanup(pygame.mixer.quit)
+        # one second of silence keeps the channels busy during the test
+        self.sound = pygame.mixer.Sound(buffer=bytes(44100 * 4))
+        self.voice_manager = VoiceManager(num_channels=2)
+
+    def test_higher_priority_steals_the_lowest_priority(self):
+        ambient = self.voice_manager.play(self.sound, 'a', PRIORITY_AMBIENT, loops=-1)
+        chuff = self.voice_manager.play(self.sound, 'b', PRIORITY_CHUFF)
+        horn = self.voice_manager.play(self.sound, 'c', PRIORITY_HORN)
+        self.assertIsNotNone(horn)
+        self.assertFalse(ambient.active)
+        self.assertTrue(chuff.active)
+        self.assertEqual(ambient.channel_index, horn.channel_index)
+        self.assertEqual(1, self.voice_manager.stolen)
+
+    def test_sound_without_a_victim_is_dropped(self):
+        self.voice_manager.play(self.sound, 'a', PRIORITY_CHUFF, loops=-1)
+        self.voice_manager.play(self.sound, 'b', PRIORITY_HORN)
+        self.assertIsNone(self.voice_manager.play(self.sound, 'c', PRIORITY_AMBIENT))
+        self.assertIsNone(self.voice_manager.play(self.sound, 'c', PRIORITY_CHUFF, loops=-1))
+        self.assertEqual(2, self.voice_manager.dropped)
+        self.assertEqual(2, self.voice_manager.metrics()['active'])
+
+    def test_owner_replaces_its_oldest_voice(self):
+        self.voice_manager.max_voices_per_owner = 1
+        first = self.voice_manager.play(self.sound, 'a', PRIORITY_CHUFF)
+        second = self.voice_manager.play(self.sound, 'a', PRIORITY_CHUFF)
+        self.assertFalse(first.active)
+        self.assertTrue(second.active)
+        self.assertEqual(1, self.voice_manager.metrics()['active'])
+
+    def test_released_channel_is_reserved_again(self):
+        channel = self.voice_manager.reserve_channel()
+        num_channels = pygame.mixer.get_num_channels()
+        self.voice_manager.release_channel(channel)
+        self.assertIs(channel, self.voice_manager.reserve_channel())
+        self.assertEqual(num_channels, pygame.mixer.get_num_channels())
+        self.assertIsNot(channel, self.voice_manager.reserve_channel())
+        self.assertEqual(num_channels + 1, pygame.mixer.get_num_channels())
+
+    def test_release_of_not_reserved_channel(self):
+        channel = self.voice_manager.reserve_channel()
+        self.voice_manager.release_channel(channel)
+        with self.assertLogs('loco_sound.sound.voice', 'WARNING'):
+            self.voice_manager.release_channel(channel)
+        with self.assertLogs('loco_sound.sound.voice', 'WARNING'):
+            self.voice_manager.release_channel(pygame.mixer.Channel(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
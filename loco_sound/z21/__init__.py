@@ -1,9 +1,22 @@
 from .message import Message
 from .client import Client
+from .async_client import AsyncClient
+from .functions import FunctionState
 from .loco_info import LocoInfo
+from .recording import Recorder, read_recording
+from .fake_z21 import FakeZ21
+from .station_mux import StationMux
+from .outbound import OutboundQueue
 
 __all__ = (
     'Message',
     'Client',
-    'LocoInfo'
+    'AsyncClient',
+    'FunctionState',
+    'LocoInfo',
+    'Recorder',
+    'read_recording',
+    'FakeZ21',
+    'StationMux',
+    'OutboundQueue',
 )
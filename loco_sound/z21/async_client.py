@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional, Tuple
+
+from loco_sound.latency import STAGE_PARSE, latency_tracker
+from loco_sound.log_writer import EVENT_RECEIVE, event_log
+from loco_sound.z21.client import BaseClient
+from loco_sound.z21.message import Message
+from loco_sound.z21.recording import Recorder
+
+log = logging.getLogger(__name__)
+
+
+class AsyncClient(BaseClient, asyncio.DatagramProtocol):
+    """
+    :mod:`asyncio` counterpart of :class:`~loco_sound.z21.Client`.
+    Instead of polling the socket via :func:`~loco_sound.z21.Client.listen`
+    the event loop wakes us up as soon as a datagram arrives and we pass the
+    parsed :class:`~Message` to ``on_message``.
+
+    Use :func:`~connect` to create a client which is bound to an event loop.
+
+    :param on_message: Callback which gets called with every received :class:`~Message`.
+    :param host: Hostname of the z21 in your network.
+    :param port: Port number of the z21
+    :param recorder: Writes every received datagram into a recording.
+    :param packets_per_second: Maximum of queued packets per second,
+        queued messages are sent by the event loop.
+    """
+    def __init__(
+            self,
+            on_message: Callable[[Message], None],
+            host: str = '192.168.0.111',
+            port: int = 21105,
+            recorder: Optional[Recorder] = None,
+            packets_per_second: float = 20.0,
+    ):
+        super().__init__(host=host, port=port, packets_per_second=packets_per_second)
+        self.on_message = on_message
+        self.recorder = recorder
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._flush_handle: Optional[asyncio.Handle] = None
+
+    @classmethod
+    async def connect(
+            cls,
+            on_message: Callable[[Message], None],
+            host: str = '192.168.0.111',
+            port: int = 21105,
+            local_port: Optional[int] = None,
+            recorder: Optional[Recorder] = None,
+            packets_per_second: float = 20.0,
+    ) -> 'AsyncClient':
+        """
+        Binds a new client to the running event loop.
+
+        :param on_message: Callback which gets called with every received :class:`~Message`.
+        :param host: Hostname of the z21 in your network.
+        :param port: Port number of the z21
+        :param local_port: Port we listen on, defaults to ``port``.
+        :param recorder: Writes every received datagram into a recording.
+        :param packets_per_second: Maximum of queued packets per second.
+        """
+        client = cls(
+            on_message=on_message,
+            host=host,
+            port=port,
+            recorder=recorder,
+            packets_per_second=packets_per_second,
+        )
+        loop = asyncio.get_event_loop()
+        await loop.create_datagram_endpoint(
+            lambda: client,
+            local_addr=('0.0.0.0', port if local_port is None else local_port),
+        )
+        log.info(f'Initiated async z21 client to {host}:{port}')
+        return client
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+        if self.outbound:
+            self._outbound_changed()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def _outbound_changed(self) -> None:
+        # messages which are queued within the same callback share a packet
+        if self._flush_handle is None and self.transport is not None:
+            self._flush_handle = asyncio.get_event_loop().call_soon(self._flush_when_allowed)
+
+    def _flush_when_allowed(self) -> None:
+        self._flush_handle = None
+        if self.transport is None:
+            return
+        self.flush_outbound()
+        now = time.monotonic_ns()
+        next_flush = self.outbound.next_flush(now)
+        if next_flush is not None:
+            self._flush_handle = asyncio.get_event_loop().call_later(
+                (next_flush - now) / 1e9,
+                self._flush_when_allowed,
+            )
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        track_latency = latency_tracker.enabled
+        if track_latency:
+            received = time.monotonic_ns()
+            latency_tracker.begin(received)
+        if self.recorder is not None:
+            self.recorder.record(data)
+        if event_log.enabled:
+            event_log.record(EVENT_RECEIVE, value=len(data))
+        try:
+            messages = list(Message.from_z21_packet(data))
+        except AssertionError:
+            log.warning(f'Received invalid z21 message from {addr}: {data!r}')
+            latency_tracker.end()
+            return
+        if track_latency:
+            latency_tracker.mark(STAGE_PARSE)
+        for message in messages:
+            log.debug('Received %s', message)
+            if track_latency:
+                # each message of the packet is traced from the receive of the packet
+                latency_tracker.begin(received)
+            self.on_message(message)
+        latency_tracker.end()
+
+    def error_received(self, exc: Exception) -> None:
+        log.warning(f'Error on z21 connection: {exc}')
+
+    def send_frame(self, frame: bytes) -> None:
+        """
+        Sends raw bytes of one or more messages to the connected z21.
+
+        :param frame: Bytes which you want to send.
+        """
+        if self.transport is None:
+            log.warning(f'Can not send {frame!r} - z21 client is not connected')
+            return
+        self.transport.sendto(
+            frame,
+            (self.host, self.port),
+        )
+
+    def close(self) -> None:
+        """
+        Logs off from the z21 and closes the socket.
+        """
+        if self.transport is not None:
+            self.log_off()
+            self.transport.close()
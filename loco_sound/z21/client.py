@@ -1,74 +1,99 @@
 import logging
 import socket
-from typing import Optional
+from collections import deque
+from typing import Deque, Hashable, Iterable, List, Optional
 
 from loco_sound.z21.message import Message
+from loco_sound.z21.outbound import OutboundQueue
+from loco_sound.z21.recording import Recorder
 
 log = logging.getLogger(__name__)
 
+# largest possible UDP payload so a packet never gets truncated
+RECEIVE_BUFFER_SIZE = 65535
 
-class Client:
+# constant messages are only built once
+LOG_OFF_FRAME = Message(
+    header=bytearray([0x30, 0x00])
+).data
+WELCOME_FRAME = Message(
+    header=bytearray([0x10, 0x01])
+).data
+SUBSCRIBE_TO_ALL_LOCOS_FRAME = Message(
+    header=bytearray([0x50, 0x00]),
+    x_header=0x00,
+    db_data=bytearray([0x01, 0x00, 0x01])
+).data
+
+
+class BaseClient:
     """
-    Handles the communication to the Z21 in both ways via
-    :func:`~send_message` and :func:`~listen`.
+    Builds the messages we send to the Z21.
+    The transport is left to the subclasses which need to implement
+    :func:`~send_frame`, see :class:`~Client` and
+    :class:`~loco_sound.z21.AsyncClient`.
+
+    Requests which may be sent in large numbers, like :func:`~request_loco_info`,
+    are queued in an :class:`~loco_sound.z21.outbound.OutboundQueue` which packs
+    them into few packets and limits the packets per second.
 
     :param host: Hostname of the z21 in your network.
     :param port: Port number of the z21
+    :param packets_per_second: Maximum of queued packets per second.
     """
-    def __init__(self, host: str = '192.168.0.111', port: int = 21105):
-        self.socket = socket.socket(
-            socket.AF_INET,  # ipv4
-            socket.SOCK_DGRAM,  # UDP
-        )
+    def __init__(self, host: str = '192.168.0.111', port: int = 21105, packets_per_second: float = 20.0):
         self.host = host
         self.port = port
-        self.socket.bind(('', self.port))  # @todo why '' ?
-        self.socket.setblocking(False)
-        log.info(f'Initiated z21 client to {self.host}:{self.port}')
+        self.outbound = OutboundQueue(self.send_frame, packets_per_second=packets_per_second)
 
-    def __del__(self):
+    def send_frame(self, frame: bytes) -> None:
         """
-        Logs off z21 from client - because we are nice.
+        Sends raw bytes of one or more messages to the connected z21.
+
+        :param frame: Bytes which you want to send.
         """
-        log.info('Log off Z21')
-        self.send_message(Message(
-            header=bytearray([0x30, 0x00])
-        ))
+        raise NotImplementedError
 
-    def listen(self) -> Optional[Message]:
+    def send_message(self, message: Message) -> None:
         """
-        Collects UDP messages which were send to us.
+        Sends a :class:`~Message` to the connected z21.
 
-        .. todo::
+        :param message: Message which you want to send.
+        """
+        log.debug('Send to z21: %s', message)
+        self.send_frame(message.data)
 
-            Maybe marry this properly into the main loop by providing
-            callback
+    def queue_message(self, message: Message, key: Optional[Hashable] = None) -> None:
+        """
+        Queues a :class:`~Message` which gets sent together with other queued messages,
+        see :class:`~loco_sound.z21.outbound.OutboundQueue`.
 
-        :returns: If a message is available we will return this as a parsed
-            :class:`~Message`.
-            If no message is available we will return None.
+        :param message: Message which you want to send.
+        :param key: A waiting message with the same key gets superseded, defaults to the message data.
         """
-        # @todo make this generator or async?
-        try:
-            data, addr = self.socket.recvfrom(1024)  # buffer 1024 bytes
-        except socket.error:
-            return None
-        else:
-            message = Message.from_z21_message(bytearray(data))
-            log.debug(f'Received {message}')
-            return message
+        log.debug('Queue for z21: %s', message)
+        self.outbound.put(message.data, key)
+        self._outbound_changed()
 
-    def send_message(self, message: Message) -> None:
+    def flush_outbound(self) -> int:
         """
-        Sends a :class:`~Message` to the connected z21.
+        Sends the queued messages as far as the rate limit allows.
 
-        :param message: Message which you want to send.
+        :returns: Number of sent packets.
+        """
+        return self.outbound.flush()
+
+    def _outbound_changed(self) -> None:
+        """
+        Called when a message was queued, subclasses make sure :func:`~flush_outbound` gets called.
         """
-        log.debug(f'Send to z21: {message}')
-        self.socket.sendto(
-            message.data,
-            (self.host, self.port),
-        )
+
+    def log_off(self) -> None:
+        """
+        Logs off z21 from client - because we are nice.
+        """
+        log.info('Log off Z21')
+        self.send_frame(LOG_OFF_FRAME)
 
     def send_welcome(self) -> None:
         """
@@ -80,11 +105,7 @@ class Client:
         as a client.
         """
         log.debug(f'Send z21 welcome message to {self.host}')
-        self.send_message(
-            Message(
-                header=bytearray([0x10, 0x01])
-            )
-        )
+        self.send_frame(WELCOME_FRAME)
 
     def subscribe_to_all_locos(self) -> None:
         """
@@ -92,13 +113,7 @@ class Client:
         You need to collect the messages from z21 via :func:`~listen`.
         """
         log.info(f'Subscribe to all locos')
-        self.send_message(
-            Message(
-                header=bytearray([0x50, 0x00]),
-                x_header=0x00,
-                db_data=bytearray([0x01, 0x00, 0x01])
-            )
-        )
+        self.send_frame(SUBSCRIBE_TO_ALL_LOCOS_FRAME)
 
     def subscribe_to_loco(self, loco) -> None:
         """
@@ -107,22 +122,129 @@ class Client:
 
         .. warning::
 
-            Using this is not recommended because we will receive stacked
-            messages  which are not yet supported.
-            This also this limits our application to 15 locos.
+            Using this is not recommended because this limits our
+            application to 15 locos.
             Use :func:`~subscribe_to_all_locos` instead.
 
         :param loco: Loco on which you want to receive changes from.
         """
         log.info(f'Subscribe to {loco}')
-        self.send_message(
+        self.request_loco_info(loco.loco_number)
+
+    def request_loco_info(self, loco_address: int) -> None:
+        """
+        Queues a ``LAN_X_GET_LOCO_INFO`` so the z21 answers with the
+        :class:`~loco_sound.z21.LocoInfo` of the loco, this also subscribes
+        to the changes of the loco.
+        A request of the same loco which still waits gets superseded.
+
+        :param loco_address: Address of the loco.
+        """
+        self.queue_message(
             Message(
                 header=bytearray([0x40, 0x00]),
                 x_header=0xe3,
                 db_data=bytearray([
                     0xf0,
-                    (loco.loco_number >> 8),  # adr msb
-                    (loco.loco_number & 0b11111111),  # adr lsb
+                    # addresses from 128 on are marked by the two upper bits
+                    (loco_address >> 8) | (0xc0 if loco_address >= 128 else 0),  # adr msb
+                    (loco_address & 0b11111111),  # adr lsb
                 ])
-            )
+            ),
+            key=('loco_info', loco_address),
+        )
+
+    def poll_locos(self, loco_addresses: Iterable[int]) -> None:
+        """
+        Requests the :class:`~loco_sound.z21.LocoInfo` of many locos,
+        see :func:`~request_loco_info`.
+
+        :param loco_addresses: Addresses of the locos.
+        """
+        for loco_address in loco_addresses:
+            self.request_loco_info(loco_address)
+
+
+class Client(BaseClient):
+    """
+    Handles the communication to the Z21 in both ways via
+    :func:`~send_message` and :func:`~listen`.
+
+    :param host: Hostname of the z21 in your network.
+    :param port: Port number of the z21
+    :param local_port: Port we listen on, defaults to ``port``.
+    :param recorder: Writes every received datagram into a recording.
+    :param packets_per_second: Maximum of queued packets per second,
+        queued messages are sent by :func:`~receive_messages`.
+    """
+    def __init__(
+            self,
+            host: str = '192.168.0.111',
+            port: int = 21105,
+            local_port: Optional[int] = None,
+            recorder: Optional[Recorder] = None,
+            packets_per_second: float = 20.0,
+    ):
+        super().__init__(host=host, port=port, packets_per_second=packets_per_second)
+        self.recorder = recorder
+        self.socket = socket.socket(
+            socket.AF_INET,  # ipv4
+            socket.SOCK_DGRAM,  # UDP
+        )
+        self.socket.bind(('', self.port if local_port is None else local_port))  # @todo why '' ?
+        self.socket.setblocking(False)
+        self._pending_messages: Deque[Message] = deque()
+        log.info(f'Initiated z21 client to {self.host}:{self.port}')
+
+    def __del__(self):
+        """
+        Logs off z21 from client - because we are nice.
+        """
+        self.log_off()
+
+    def receive_messages(self) -> List[Message]:
+        """
+        Collects all UDP packets which were send to us since the last call
+        and splits them into their messages, see :func:`~Message.from_z21_packet`.
+        Queued messages are sent as far as the rate limit allows.
+
+        :returns: Parsed messages in the order they were received.
+            The list is empty if no message is available.
+        """
+        if self.outbound:
+            self.flush_outbound()
+        messages: List[Message] = []
+        while True:
+            try:
+                data, addr = self.socket.recvfrom(RECEIVE_BUFFER_SIZE)
+            except socket.error:
+                return messages
+            if self.recorder is not None:
+                self.recorder.record(data)
+            for message in Message.from_z21_packet(data):
+                log.debug('Received %s', message)
+                messages.append(message)
+
+    def listen(self) -> Optional[Message]:
+        """
+        Returns the next message which was send to us.
+        Prefer :func:`~receive_messages` which returns all available messages at once.
+
+        :returns: If a message is available we will return this as a parsed
+            :class:`~Message`.
+            If no message is available we will return None.
+        """
+        if not self._pending_messages:
+            self._pending_messages.extend(self.receive_messages())
+        return self._pending_messages.popleft() if self._pending_messages else None
+
+    def send_frame(self, frame: bytes) -> None:
+        """
+        Sends raw bytes of one or more messages to the connected z21.
+
+        :param frame: Bytes which you want to send.
+        """
+        self.socket.sendto(
+            frame,
+            (self.host, self.port),
         )
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import struct
+from typing import Optional, Set, Tuple
+
+from loco_sound.z21.loco_info import LocoInfo
+from loco_sound.z21.message import (
+    Message, LAN_GET_SERIAL_NUMBER, LAN_LOGOFF, LAN_SET_BROADCASTFLAGS,
+)
+from loco_sound.z21.recording import read_recording
+
+log = logging.getLogger(__name__)
+
+Address = Tuple[str, int]
+
+# length, header and the serial number as 32 bit integer
+_SERIAL_NUMBER_REPLY = struct.Struct('<HHI')
+
+
+class FakeZ21(asyncio.DatagramProtocol):
+    """
+    Local UDP stand-in for a z21 so the whole stack can run without a
+    physical z21, e.g. against ``Runtime(..., host='127.0.0.1', local_port=21106)``.
+
+    It answers the welcome message (``LAN_GET_SERIAL_NUMBER``) with
+    ``serial_number``, remembers the clients which subscribe via
+    ``LAN_SET_BROADCASTFLAGS`` until they log off and sends them the loco
+    updates of :func:`~send_loco_info` or of a recording, see :func:`~play_recording`.
+
+    Use :func:`~start` to bind a fake z21 to the running event loop.
+
+    :param serial_number: Serial number which is reported to the clients.
+    """
+    def __init__(self, serial_number: int = 0x1234):
+        self.serial_number = serial_number
+        self.subscribers: Set[Address] = set()
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.received: int = 0
+
+    @classmethod
+    async def start(cls, host: str = '127.0.0.1', port: int = 21105, **kwargs) -> 'FakeZ21':
+        """
+        Binds a new fake z21 to the running event loop.
+
+        :param host: Address we listen on.
+        :param port: Port we listen on.
+        """
+        fake_z21 = cls(**kwargs)
+        loop = asyncio.get_event_loop()
+        await loop.create_datagram_endpoint(
+            lambda: fake_z21,
+            local_addr=(host, port),
+        )
+        log.info(f'Started fake z21 on {host}:{port}')
+        return fake_z21
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+
+    def datagram_received(self, data: bytes, addr: Address) -> None:
+        try:
+            messages = list(Message.from_z21_packet(data))
+        except AssertionError:
+            log.warning(f'Fake z21 received invalid message from {addr}: {data!r}')
+            return
+        for message in messages:
+            self.received += 1
+            # the welcome of the clients sends the header 0x10 0x01
+            if message.header_id & 0xff == LAN_GET_SERIAL_NUMBER:
+                self._send(_SERIAL_NUMBER_REPLY.pack(8, LAN_GET_SERIAL_NUMBER, self.serial_number), addr)
+            elif message.header_id == LAN_SET_BROADCASTFLAGS:
+                log.debug(f'Fake z21 subscribed {addr}')
+                self.subscribers.add(addr)
+            elif message.header_id == LAN_LOGOFF:
+                log.debug(f'Fake z21 logged off {addr}')
+                self.subscribers.discard(addr)
+            else:
+                log.debug(f'Fake z21 ignores {message}')
+
+    def _send(self, data: bytes, addr: Address) -> None:
+        if self.transport is not None:
+            self.transport.sendto(data, addr)
+
+    def broadcast(self, data: bytes) -> None:
+        """
+        Sends raw bytes to all subscribed clients.
+
+        :param data: One or more messages.
+        """
+        for addr in self.subscribers:
+            self._send(data, addr)
+
+    def send_loco_info(self, *loco_infos: LocoInfo) -> None:
+        """
+        Sends the ``LAN_X_LOCO_INFO`` of each loco to all subscribed clients.
+
+        :param loco_infos: Updates which should be sent.
+        """
+        for loco_info in loco_infos:
+            self.broadcast(loco_info.to_message().data)
+
+    async def play_recording(self, path: str, realtime: bool = True) -> int:
+        """
+        Sends the datagrams of a recording to all subscribed clients,
+        see :class:`~loco_sound.z21.recording.Recorder`.
+
+        :param path: File of the recording.
+        :param realtime: Keeps the time between the datagrams,
+            otherwise they are sent as fast as possible.
+        :returns: Number of sent datagrams.
+        """
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        sent = 0
+        for timestamp, datagram in read_recording(path):
+            if realtime:
+                delay = start + timestamp / 1e9 - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self.broadcast(datagram)
+            sent += 1
+        return sent
+
+    def close(self) -> None:
+        """
+        Closes the socket.
+        """
+        if self.transport is not None:
+            self.transport.close()
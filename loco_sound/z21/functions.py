@@ -0,0 +1,112 @@
+from typing import Iterator, List, Mapping, Tuple
+
+from loco_sound.z21.message import Buffer
+
+# F0 to F28 of DCC plus F29 to F31 which the z21 also reports
+FUNCTION_COUNT = 32
+FUNCTION_MASK = (1 << FUNCTION_COUNT) - 1
+
+# DB4 of LAN_X_LOCO_INFO holds ``0 0 0 F0 F4 F3 F2 F1``
+# which we map to bit 0 (F0) to bit 4 (F4) of the function mask
+DB4_TO_MASK: Tuple[int, ...] = tuple(
+    ((db4 >> 4) & 0b1) | ((db4 & 0b1111) << 1)
+    for db4 in range(256)
+)
+
+# positions of the set bits of a byte
+SET_BITS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(bit for bit in range(8) if byte & (1 << bit))
+    for byte in range(256)
+)
+
+
+def decode_function_mask(db_data: Buffer) -> Tuple[int, int]:
+    """
+    Decodes the function bytes of ``LAN_X_LOCO_INFO`` into a bitmask
+    where bit ``n`` stores the state of function ``n``.
+
+    :param db_data: db_data of the :class:`~loco_sound.z21.Message`.
+    :returns: Function mask and the number of functions which are
+        contained in the message, both limited to :data:`~FUNCTION_COUNT`.
+    """
+    if len(db_data) < 5:
+        return 0, 0
+    # further bytes of newer firmwares are no functions
+    function_bytes = db_data[5:9]
+    mask = (DB4_TO_MASK[db_data[4]] | int.from_bytes(function_bytes, 'little') << 5) & FUNCTION_MASK
+    return mask, min(5 + 8 * len(function_bytes), FUNCTION_COUNT)
+
+
+def iter_function_numbers(mask: int) -> Iterator[int]:
+    """
+    Iterates over the numbers of the functions which are set in ``mask``.
+    XOR two masks to get the changed functions.
+
+    :param mask: Function mask, see :func:`~decode_function_mask`.
+    """
+    offset = 0
+    while mask:
+        for bit in SET_BITS[mask & 0xff]:
+            yield offset + bit
+        mask >>= 8
+        offset += 8
+
+
+class FunctionState(Mapping[int, bool]):
+    """
+    Read only dict like view on a function mask so the state of
+    function ``n`` can still be accessed via ``functions[n]``,
+    functions which are not known are not selected.
+
+    :param mask: Function mask, see :func:`~decode_function_mask`.
+    :param count: Number of functions which are known.
+    """
+    __slots__ = ('mask', 'count')
+
+    def __init__(self, mask: int, count: int):
+        self.mask: int = mask
+        self.count: int = count
+
+    @classmethod
+    def from_dict(cls, functions: Mapping[int, bool]) -> 'FunctionState':
+        """
+        Converts a dict of function number to state into a :class:`~FunctionState`.
+
+        :param functions: State of the functions.
+        """
+        if isinstance(functions, FunctionState):
+            return functions
+        mask = 0
+        for function_num, value in functions.items():
+            if value:
+                mask |= 1 << function_num
+        return cls(mask, max(functions.keys(), default=-1) + 1)
+
+    def active(self) -> List[int]:
+        """
+        :returns: Sorted numbers of the functions which are turned on.
+        """
+        return list(iter_function_numbers(self.mask))
+
+    def __getitem__(self, function_num: int) -> bool:
+        # unknown functions are not selected, like the former defaultdict(bool)
+        if not 0 <= function_num < self.count:
+            return False
+        return bool(self.mask >> function_num & 1)
+
+    def __contains__(self, function_num: object) -> bool:
+        return isinstance(function_num, int) and 0 <= function_num < self.count
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.count))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __eq__(self, other):
+        if isinstance(other, FunctionState):
+            return self.mask == other.mask and self.count == other.count
+        return super().__eq__(other)
+
+    def __repr__(self):
+        return f'FunctionState(active={self.active()})'
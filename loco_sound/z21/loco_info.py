@@ -1,7 +1,9 @@
-from typing import Dict
 import logging
+import warnings
+from typing import Mapping, Optional
 
-from loco_sound.z21.message import Message
+from loco_sound.z21.functions import FunctionState, decode_function_mask
+from loco_sound.z21.message import Message, LAN_X, LAN_X_LOCO_INFO
 
 log = logging.getLogger(__name__)
 
@@ -17,22 +19,52 @@ class LocoInfo:
         0 for backwards, 1 for forwards.
     :param speed: speed step which was send - will be absolute so please
         compare with ``dcc_speed_steps`` for relative speed.
-    :param functions: Stores a dict of which informations are selected and which
-        are currently not selected.
+    :param function_mask: Bitmask of the functions, bit ``n`` is set
+        if function ``n`` is selected.
+    :param function_count: Number of functions which were send.
+    :param functions: Deprecated dict of the selected functions, which is
+        converted into ``function_mask`` and ``function_count``.
     """
+    __slots__ = ('loco_address', 'dcc_speed_steps', 'direction', 'speed', 'function_mask', 'function_count')
+
     def __init__(
             self,
             loco_address: int,
             dcc_speed_steps: int,
             direction: int,
             speed: int,
-            functions: Dict[int, bool],
+            function_mask: int = 0,
+            function_count: int = 0,
+            functions: Optional[Mapping[int, bool]] = None,
     ):
+        if functions is not None:
+            warnings.warn('LocoInfo(functions=...) is deprecated, use function_mask', DeprecationWarning, stacklevel=2)
+            function_state = FunctionState.from_dict(functions)
+            function_mask, function_count = function_state.mask, function_state.count
         self.loco_address: int = loco_address
         self.dcc_speed_steps: int = dcc_speed_steps
         self.direction: int = direction  # 1 = forward
         self.speed: int = speed
-        self.functions: Dict[int, bool] = functions
+        self.function_mask: int = function_mask
+        self.function_count: int = function_count
+
+    @property
+    def functions(self) -> FunctionState:
+        """
+        Dict like view of which functions are selected and which
+        are currently not selected.
+        """
+        return FunctionState(self.function_mask, self.function_count)
+
+    @staticmethod
+    def is_loco_info(message: Message) -> bool:
+        """
+        Checks if a :class:`loco_sound.z21.Message` is a ``LAN_X_LOCO_INFO``
+        message which can be serialized via :func:`~from_z21_response`.
+
+        :param message: Received message.
+        """
+        return message.header_id == LAN_X and message.x_header == LAN_X_LOCO_INFO
 
     @classmethod
     def from_z21_response(cls, message: Message):
@@ -41,15 +73,13 @@ class LocoInfo:
 
         :param message: Message which you want to serialize.
         """
-        try:
-            assert message.header == bytearray([0x40, 0x00])
-            assert message.x_header == 0xef
-        except AssertionError:
+        if not cls.is_loco_info(message):
             # @todo gets called when stop is hit
             raise AssertionError(f'Invalid z21 message for loco info: {message}')
 
-        dcc_data = message.db_data[2] & 0b00000111
-        speed_data = message.db_data[3] & 0b01111111
+        db_data = message.db_data
+        dcc_data = db_data[2] & 0b00000111
+        speed_data = db_data[3] & 0b01111111
 
         speed = 0
         if dcc_data == 1:
@@ -63,28 +93,47 @@ class LocoInfo:
             dcc_speed_steps = 126
             speed = max(0, speed_data - 1)
         else:
-            log.critical(f'Unknown DCC Step value: {dcc_data} - byte is {message.db_data[2]}')
+            log.critical(f'Unknown DCC Step value: {dcc_data} - byte is {db_data[2]}')
             dcc_speed_steps = 128
 
-        functions = {}
-        if len(message.db_data) >= 5:
-            # check if bits are set
-            functions[0] = bool(message.db_data[4] & 0b00010000)
-            functions[4] = bool(message.db_data[4] & 0b00001000)
-            functions[3] = bool(message.db_data[4] & 0b00000100)
-            functions[2] = bool(message.db_data[4] & 0b00000010)
-            functions[1] = bool(message.db_data[4] & 0b00000001)
-
-        for db_num, db_bit in enumerate(message.db_data[5:]):
-            for bit_num in range(8):
-                functions[5 + (8 * db_num) + bit_num] = bool(db_bit & (2 ** bit_num))
+        function_mask, function_count = decode_function_mask(db_data)
 
         return cls(
-            loco_address=(message.db_data[0] & 0x3f << 8) + message.db_data[1],
+            loco_address=((db_data[0] & 0x3f) << 8) + db_data[1],
             dcc_speed_steps=dcc_speed_steps,
-            direction=message.db_data[3] >> 7 & 1,
+            direction=db_data[3] >> 7 & 1,
             speed=speed,
-            functions=functions,
+            function_mask=function_mask,
+            function_count=function_count,
+        )
+
+    def to_message(self) -> Message:
+        """
+        Builds the ``LAN_X_LOCO_INFO`` message the z21 would send for this info,
+        e.g. to simulate a z21 via :class:`~loco_sound.z21.fake_z21.FakeZ21`.
+        """
+        if self.dcc_speed_steps == 14:
+            dcc_data = 1
+        elif self.dcc_speed_steps == 28:
+            dcc_data = 2
+        else:
+            dcc_data = 4
+        speed_data = 0
+        if self.speed > 0:
+            speed_data = self.speed // 2 + 1 if self.dcc_speed_steps == 28 else self.speed + 1
+        function_mask = self.function_mask
+        function_bytes = ((function_mask >> 5) & 0xffffffff).to_bytes(4, 'little')
+        return Message(
+            header=bytearray([LAN_X, 0x00]),
+            x_header=LAN_X_LOCO_INFO,
+            db_data=bytearray([
+                (self.loco_address >> 8) & 0x3f | (0xc0 if self.loco_address >= 128 else 0),
+                self.loco_address & 0xff,
+                dcc_data,
+                (self.direction & 1) << 7 | min(speed_data, 0x7f),
+                (function_mask & 0b1) << 4 | (function_mask >> 1) & 0b1111,
+                *function_bytes[:3],
+            ]),
         )
 
     def __str__(self):
@@ -93,5 +142,5 @@ class LocoInfo:
             speed=self.speed,
             steps=self.dcc_speed_steps,
             direction=self.direction,
-            functions=(sorted([k for k, v in self.functions.items() if v])),
+            functions=self.functions.active(),
         )
@@ -1,9 +1,23 @@
 import struct
-from typing import Optional
+from typing import Iterator, Optional, Union
 import logging
 
 log = logging.getLogger(__name__)
 
+Buffer = Union[bytes, bytearray, memoryview]
+
+# header ids (little endian) of the z21 LAN protocol
+LAN_GET_SERIAL_NUMBER = 0x10
+LAN_LOGOFF = 0x30
+LAN_X = 0x40
+LAN_SET_BROADCASTFLAGS = 0x50
+
+# x_header of LAN_X messages
+LAN_X_LOCO_INFO = 0xef
+
+_LENGTH_HEADER = struct.Struct('<HH')
+_LENGTH_HEADER_X_HEADER = struct.Struct('<HHB')
+
 
 class Message:
     """
@@ -13,64 +27,126 @@ class Message:
     See `Z21 LAN reference sheet <https://www.z21.eu/media/Kwc_Basic_DownloadTag_Component/root-en-main_47-1652-959-downloadTag-download/default/d559b9cf/1558675126/z21-lan-protokoll-en.pdf>`_
     for more information.
 
+    A message is not meant to be changed after its creation because
+    :attr:`~data` is only built once.
+    Received messages keep a reference to the received packet and
+    only create a :class:`memoryview` slice of it once ``db_data`` is accessed.
+
     :param header: Header
     :param x_header: X_header
     :param db_data: db_data
     :param xor: xor byte
-    :param length: 2 length bytes.
+    :param length: Length of the message in bytes.
     """
+    __slots__ = ('length', '_header', 'header_id', 'x_header', '_db_data', 'xor', '_data')
 
     def __init__(
             self,
-            header: bytearray,
+            header: Buffer,
             x_header: int = None,
-            db_data: bytearray = None,
+            db_data: Buffer = None,
             xor: Optional[int] = None,
-            length: Optional[bytearray] = None
+            length: Optional[int] = None
     ):
-        self.length: bytearray = length
-        self.header: bytearray = header
-        assert len(self.header) == 2
+        self.length: Optional[int] = length
+        self._header: Optional[Buffer] = header
+        assert len(header) == 2
+        self.header_id: int = header[0] | header[1] << 8
         self.x_header: Optional[int] = x_header
-        self.db_data: bytearray = db_data if db_data else bytearray([])
-        if self.db_data and self.x_header is None:
-            print(db_data, x_header)
+        self._db_data: Optional[Buffer] = db_data if db_data else bytearray([])
+        if db_data and self.x_header is None:
             raise AssertionError('Can not set db_data without x_header')
         self.xor: Optional[int] = xor
+        self._data: Optional[Buffer] = None
 
     @classmethod
-    def from_z21_message(cls, message: bytearray):
+    def from_z21_message(cls, message: Buffer) -> 'Message':
         """
         Parses a received Z21 message.
 
         :param message: Raw byte UDP package received from Z21.
         """
-        assert len(message) > 4
-        x_header = None
-        db_data = None
-        xor = None
-        if len(message) >= 5:
-            x_header = message[4]
-            xor = message[-1]
-        if len(message) > 6:
-            # x_header implies xor bit so we have at least 7 bytes now
-            db_data = message[5:-1]
-
-        return cls(
-            length=message[0:2],
-            header=message[2:4],
-            x_header=x_header,
-            db_data=db_data,
-            xor=xor,
-        )
+        message_length = len(message)
+        assert message_length >= 4
+
+        instance = cls.__new__(cls)
+        instance._header = None
+        instance._db_data = None
+        instance._data = message
+        if message_length >= 5:
+            instance.length, instance.header_id, instance.x_header = _LENGTH_HEADER_X_HEADER.unpack_from(message)
+            instance.xor = message[-1]
+        else:
+            instance.length, instance.header_id = _LENGTH_HEADER.unpack_from(message)
+            instance.x_header = None
+            instance.xor = None
+        return instance
+
+    @classmethod
+    def from_z21_packet(cls, packet: Buffer) -> Iterator['Message']:
+        """
+        Splits a received UDP packet into its messages.
+        The Z21 may stack several datasets into one packet, each
+        starting with its own 2 length bytes.
+
+        :param packet: Raw byte UDP package received from Z21.
+        :returns: Iterator over the parsed messages of the packet.
+        """
+        packet_length = len(packet)
+        if packet_length >= 4 and packet[0] | packet[1] << 8 == packet_length:
+            # most packets contain a single dataset
+            yield cls.from_z21_message(packet)
+            return
+        view = memoryview(packet)
+        offset = 0
+        while offset + 4 <= packet_length:
+            length = view[offset] | view[offset + 1] << 8
+            if length < 4 or offset + length > packet_length:
+                log.warning(f'Invalid dataset length {length} at offset {offset} of packet {bytes(packet)!r}')
+                return
+            yield cls.from_z21_message(view[offset:offset + length])
+            offset += length
 
     @property
-    def data(self) -> bytearray:
+    def header(self) -> Buffer:
         """
-        Builds a byte representation of the message which can be send to Z21.
+        The 2 header bytes, see ``header_id`` for the decoded header.
+        """
+        if self._header is None:
+            return self._data[2:4]  # type: ignore
+        return self._header
+
+    @property
+    def db_data(self) -> Buffer:
+        """
+        The data bytes between x_header and xor byte.
+        """
+        db_data = self._db_data
+        if db_data is None:
+            message = self._data
+            if len(message) > 6:  # type: ignore
+                # x_header implies xor bit so we have at least 7 bytes now
+                view = message if isinstance(message, memoryview) else memoryview(message)  # type: ignore
+                db_data = self._db_data = view[5:-1]
+            else:
+                db_data = self._db_data = b''
+        return db_data
+
+    @property
+    def data(self) -> bytes:
+        """
+        Byte representation of the message which can be send to Z21.
+        Received messages return the received bytes.
 
         :return: Message as raw bytes.
         """
+        data = self._data
+        if not isinstance(data, bytes):
+            # built once, received messages copy their slice of the packet once
+            data = self._data = self._build() if data is None else bytes(data)
+        return data
+
+    def _build(self) -> bytes:
         data = bytearray([])
         data.extend([
             *self.header,
@@ -83,7 +159,7 @@ class Message:
             # if  xor is not given we need to calculate it
             data.append(self.xor if self.xor else self._calculate_xor())
         data[0:0] = self._calculate_length(data)
-        return data
+        return bytes(data)
 
     def _calculate_xor(self) -> int:
         """
@@ -106,5 +182,5 @@ class Message:
             header=' '.join('0x{:02x}'.format(x) for x in self.header),
             x_header=hex(self.x_header) if self.x_header is not None else 'not set',
             db_data=' '.join('0x{:02x}'.format(x) for x in self.db_data),
-            raw=' '.join('0x{:02x}'.format(x) for x in bytearray(self.data)),
+            raw=' '.join('0x{:02x}'.format(x) for x in self.data),
         )
@@ -0,0 +1,134 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+log = logging.getLogger(__name__)
+
+# UDP payload which fits into a single ethernet frame
+MAX_PACKET_SIZE = 1472
+# datasets per packet, a full packet of loco info requests would still flood the z21
+MAX_DATASETS = 16
+
+
+class OutboundQueue:
+    """
+    Queue of the messages we send to the z21 which packs as many queued messages
+    as fit into a single UDP packet, the z21 accepts several datasets per packet.
+    Each packet carries at most ``max_datasets`` messages, so the rate limit
+    also bounds the datasets the z21 has to process.
+
+    A message which is queued with the ``key`` of a message that is still waiting
+    supersedes it, e.g. a second request of the same loco info. Without a ``key``
+    only identical messages supersede each other.
+    Packets are limited to ``packets_per_second`` via a token bucket which allows
+    short bursts of ``burst`` packets, so polling a large fleet does not flood the z21.
+
+    :param send_frame: Sends the bytes of one packet.
+    :param packets_per_second: Maximum of packets per second on average.
+    :param burst: Maximum of packets which can be sent at once after a pause.
+    :param max_packet_size: Maximum of bytes per packet.
+    :param max_datasets: Maximum of messages per packet.
+    """
+    def __init__(
+            self,
+            send_frame: Callable[[bytes], None],
+            packets_per_second: float = 20.0,
+            burst: int = 4,
+            max_packet_size: int = MAX_PACKET_SIZE,
+            max_datasets: int = MAX_DATASETS,
+    ):
+        self.send_frame = send_frame
+        self.packets_per_second = packets_per_second
+        self.burst = burst
+        self.max_packet_size = max_packet_size
+        self.max_datasets = max_datasets
+        self._pending: 'OrderedDict[Hashable, bytes]' = OrderedDict()
+        self._tokens: float = float(burst)
+        self._refilled: int = time.monotonic_ns()
+        self.queued: int = 0
+        self.superseded: int = 0
+        self.packets: int = 0
+
+    def put(self, frame: bytes, key: Optional[Hashable] = None) -> bool:
+        """
+        Queues the bytes of a message, call :func:`~flush` to send them.
+
+        :param frame: Bytes of the message.
+        :param key: Identifies which waiting message gets superseded, defaults to ``frame``.
+        :returns: False if a waiting message was superseded.
+        """
+        if len(frame) > self.max_packet_size:
+            raise ValueError(f'Message of {len(frame)} bytes does not fit into a packet')
+        if key is None:
+            key = frame
+        self.queued += 1
+        if key in self._pending:
+            # the message keeps its place in the queue
+            self._pending[key] = frame
+            self.superseded += 1
+            return False
+        self._pending[key] = frame
+        return True
+
+    def _refill(self, now: int) -> None:
+        elapsed = now - self._refilled
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self.packets_per_second / 1e9)
+            self._refilled = now
+
+    def flush(self, now: Optional[int] = None) -> int:
+        """
+        Sends the waiting messages as far as the rate limit allows.
+
+        :param now: Monotonic timestamp in nanoseconds, defaults to :func:`time.monotonic_ns`.
+        :returns: Number of sent packets.
+        """
+        if now is None:
+            now = time.monotonic_ns()
+        self._refill(now)
+        pending = self._pending
+        sent = 0
+        while pending and self._tokens >= 1:
+            packet = bytearray()
+            datasets = 0
+            while pending and datasets < self.max_datasets:
+                key = next(iter(pending))
+                if len(packet) + len(pending[key]) > self.max_packet_size:
+                    break
+                packet += pending.pop(key)
+                datasets += 1
+            self.send_frame(bytes(packet))
+            self._tokens -= 1
+            sent += 1
+        self.packets += sent
+        return sent
+
+    def next_flush(self, now: Optional[int] = None) -> Optional[int]:
+        """
+        :param now: Monotonic timestamp in nanoseconds, defaults to :func:`time.monotonic_ns`.
+        :returns: Monotonic timestamp in nanoseconds when the next packet may be
+            sent or None if no message is waiting.
+        """
+        if not self._pending:
+            return None
+        if now is None:
+            now = time.monotonic_ns()
+        self._refill(now)
+        if self._tokens >= 1:
+            return now
+        return now + int((1 - self._tokens) * 1e9 / self.packets_per_second)
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        :returns: Number of waiting, queued and superseded messages and of sent packets.
+        """
+        return {
+            'pending': len(self._pending),
+            'queued': self.queued,
+            'superseded': self.superseded,
+            'packets': self.packets,
+        }
+
+    def __len__(self):
+        return len(self._pending)
@@ -0,0 +1,91 @@
+import logging
+import struct
+import time
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# first bytes of a recording, the last byte is the version of the format
+RECORDING_MAGIC = b'Z21REC\x00\x01'
+
+# nanoseconds since the start of the recording and length of the datagram
+_RECORD_HEADER = struct.Struct('<QH')
+
+
+class Recorder:
+    """
+    Writes the raw datagrams received from the z21 into a compact binary log
+    which can be played back via :func:`~read_recording`.
+
+    Each datagram is stored as it was received - prefixed by its receive
+    timestamp in nanoseconds since the start of the recording and its length -
+    so a recording also covers packets which can not be parsed.
+
+    Pass a recorder as ``recorder`` to :class:`~loco_sound.z21.Client` or
+    :class:`~loco_sound.z21.AsyncClient`.
+
+    :param path: File which gets created or overwritten.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[BinaryIO] = open(path, 'wb')
+        self._file.write(RECORDING_MAGIC)
+        self._start: int = time.monotonic_ns()
+        self.datagrams: int = 0
+        log.info(f'Record z21 traffic to {path}')
+
+    def record(self, datagram: bytes, timestamp: Optional[int] = None) -> None:
+        """
+        Appends a datagram to the recording.
+
+        :param datagram: Raw UDP payload received from the z21.
+        :param timestamp: Monotonic receive time in nanoseconds, defaults to now.
+        """
+        if self._file is None:
+            return
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        self._file.write(_RECORD_HEADER.pack(max(0, timestamp - self._start), len(datagram)))
+        self._file.write(datagram)
+        self.datagrams += 1
+
+    def close(self) -> None:
+        """
+        Flushes and closes the recording.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            log.info(f'Recorded {self.datagrams} datagrams to {self.path}')
+
+    def __enter__(self) -> 'Recorder':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def read_recording(path: str) -> Iterator[Tuple[int, bytes]]:
+    """
+    Reads a recording of a :class:`~Recorder`.
+
+    :param path: File of the recording.
+    :returns: Iterator over the receive time in nanoseconds since the start
+        of the recording and the raw datagram.
+    """
+    with open(path, 'rb') as recording:
+        if recording.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+            raise ValueError(f'{path} is not a z21 recording')
+        while True:
+            header = recording.read(_RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < _RECORD_HEADER.size:
+                log.warning(f'Recording {path} ends within a record')
+                return
+            timestamp, length = _RECORD_HEADER.unpack(header)
+            datagram = recording.read(length)
+            if len(datagram) < length:
+                log.warning(f'Recording {path} ends within a record')
+                return
+            yield timestamp, datagram
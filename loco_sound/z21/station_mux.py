@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import socket
+from typing import Dict, Mapping, Optional, Tuple
+
+from loco_sound.z21.async_client import AsyncClient
+
+log = logging.getLogger(__name__)
+
+Address = Tuple[str, int]
+
+
+class StationMux(asyncio.DatagramProtocol):
+    """
+    Serves any number of z21 command stations over a single UDP socket
+    of the event loop, so neither a socket nor a thread per station is needed.
+
+    Each station is represented by an :class:`~loco_sound.z21.AsyncClient` which
+    sends via the shared socket, received datagrams are passed to the client
+    whose z21 sent them, so its ``on_message`` knows the station of a message.
+
+    Use :func:`~connect` to bind the stations to the running event loop.
+    """
+    def __init__(self):
+        self.clients: Dict[str, AsyncClient] = {}
+        self._client_of_address: Dict[Address, AsyncClient] = {}
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    @classmethod
+    async def connect(cls, clients: Mapping[str, AsyncClient], local_port: int = 21105) -> 'StationMux':
+        """
+        Binds the clients of all stations to one socket of the running event loop.
+
+        :param clients: Client of each station by the name of the station.
+        :param local_port: Port we listen on.
+        """
+        mux = cls()
+        loop = asyncio.get_event_loop()
+        for name, client in clients.items():
+            # the z21 answers from its ip address, so the hostname gets resolved once
+            address_infos = await loop.getaddrinfo(
+                client.host,
+                client.port,
+                family=socket.AF_INET,
+                type=socket.SOCK_DGRAM,
+            )
+            host, port = address_infos[0][4][:2]
+            address = (str(host), int(port))
+            if address in mux._client_of_address:
+                raise ValueError(f'Station {name} uses the same z21 {address[0]}:{address[1]} as another station')
+            mux.clients[name] = client
+            mux._client_of_address[address] = client
+        await loop.create_datagram_endpoint(
+            lambda: mux,
+            local_addr=('0.0.0.0', local_port),
+        )
+        log.info(f'Initiated z21 stations {", ".join(clients)} on port {local_port}')
+        return mux
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+        for client in self.clients.values():
+            client.connection_made(transport)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        for client in self.clients.values():
+            client.connection_lost(exc)
+
+    def datagram_received(self, data: bytes, addr: Address) -> None:
+        client = self._client_of_address.get(addr[:2])
+        if client is None:
+            log.warning(f'Ignore datagram of unknown z21 {addr}: {data!r}')
+            return
+        client.datagram_received(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        log.warning(f'Error on z21 connection: {exc}')
+
+    def close(self) -> None:
+        """
+        Logs off from all z21 and closes the socket.
+        """
+        if self.transport is None:
+            return
+        for client in self.clients.values():
+            client.log_off()
+        self.transport.close()
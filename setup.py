@@ -19,7 +19,7 @@ setup(
     description=about['__description__'],
     author=about['__author__'],
     url=about['__url__'],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     install_requires=requirements,
     license=about['__license__'],
     tests_require=requirements_dev,
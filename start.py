@@ -1,50 +1,126 @@
+import argparse
+import asyncio
 import logging
-import time
-from datetime import datetime, timedelta
+import os
+import signal
 
-import pygame
-
-from loco_sound.loco import LocoCollector, Loco
-from loco_sound.z21 import Client, LocoInfo
+from loco_sound.config import Config
+from loco_sound.log_writer import event_log, start_log_writer
+from loco_sound.loco import LocoCollector
+from loco_sound.multiprocess import AudioProcess, SharedStateCollector
+from loco_sound.replay import Replayer
+from loco_sound.runtime import Runtime
+from loco_sound.sound.backend import NullBackend, OfflineBackend, get_audio_backend, set_audio_backend
+from loco_sound.sound.cache import sound_cache
+from loco_sound.sound.pcm_cache import PcmCache
+from loco_sound.z21.recording import Recorder
 
 log = logging.getLogger('loco_sound')
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-log.setLevel(logging.DEBUG)
 ch = logging.StreamHandler()
 ch.setLevel(logging.DEBUG)
 ch.setFormatter(formatter)
-log.addHandler(ch)
 
 if __name__ == '__main__':
-    # see https://stackoverflow.com/a/49346100
-    pygame.mixer.pre_init(44100, -16, 2, 256)
-    pygame.mixer.init()
-
-    client = Client()
-    client.send_welcome()
-    client.subscribe_to_all_locos()
-
-    loco_collector = LocoCollector()
-    loco_collector.add_locos(
-        Loco(232),
-        Loco(2),
-    )
+    parser = argparse.ArgumentParser(description='Plays loco sounds for the locos of a z21.')
+    parser.add_argument('--record', metavar='PATH', help='records the traffic of the z21 to PATH')
+    parser.add_argument('--replay', metavar='PATH', help='replays a recording instead of connecting to the z21')
+    parser.add_argument('--fast', action='store_true', help='replays as fast as possible')
+    parser.add_argument('--latency', metavar='PATH', help='writes percentiles of the latency of each stage to PATH')
+    parser.add_argument('--events', metavar='PATH', help='writes a binary log of the loco events to PATH')
+    parser.add_argument('--log-level', default='DEBUG', help='level of the terminal log, e.g. INFO')
+    parser.add_argument('--multiprocess', action='store_true', help='plays the sounds in a process of its own')
+    parser.add_argument('--pcm-cache', metavar='DIR', help='keeps the decoded sounds in DIR to load them faster')
+    parser.add_argument('--audio', choices=('pygame', 'null'), default='pygame', help='null plays no sound')
+    parser.add_argument('--snapshot', metavar='PATH', help='saves the state of the locos to PATH and restores it')
+    parser.add_argument('--render', metavar='PATH', help='renders the sounds of --replay as fast as possible to PATH')
+    args = parser.parse_args()
+    if args.render and (not args.replay or args.multiprocess):
+        parser.error('--render requires --replay and does not support --multiprocess')
 
-    welcome_time = datetime.now()
-    try:
-        while True:
-            message = client.listen()
-            if message:
-                loco_info = LocoInfo.from_z21_response(message)
-                loco_collector.update_locos(loco_info)
+    log.setLevel(args.log_level.upper())
 
-            loco_collector.execute_due_functions()
+    # the terminal is written by a background thread so it never delays a sound
+    log_writer = start_log_writer(log, ch)
+    if args.events:
+        event_log.open(args.events)
 
-            if datetime.now() - welcome_time > timedelta(seconds=30):
-                client.send_welcome()
-                welcome_time = datetime.now()
+    if args.render:
+        set_audio_backend(OfflineBackend(args.render))
+    elif args.audio == 'null':
+        set_audio_backend(NullBackend())
 
-            time.sleep(0.001)
+    if os.path.exists('config.yaml'):
+        config = Config.from_file('config.yaml')
+    else:
+        log.warning(f'No config.yaml in {os.getcwd()}, see the configuration of the docs')
+        config = Config()
+    if not config.locos and not any(station.locos for station in config.stations.values()):
+        log.warning('No locos are configured, so no sounds will be played')
+    audio_process = None
+    loco_collector: LocoCollector
+    if args.multiprocess:
+        shared_state = SharedStateCollector()
+        loco_collector = shared_state
+        audio_process = AudioProcess(shared_state, config.locos, log_handlers=[ch], pcm_cache=args.pcm_cache)
+        audio_process.start()
+    else:
+        get_audio_backend().init(44100, -16, 2, 256)
+        if args.pcm_cache:
+            sound_cache.pcm_cache = PcmCache(args.pcm_cache)
+        loco_collector = LocoCollector(config.locos)
 
+    if args.replay:
+        replayer = Replayer(loco_collector, args.replay)
+        backend = get_audio_backend()
+        if isinstance(backend, OfflineBackend):
+            replayer.render(backend)
+            backend.close()
+        else:
+            replayer.replay(realtime=not args.fast)
+        if audio_process is not None:
+            audio_process.stop()
+        event_log.close()
+        log_writer.stop()
+        raise SystemExit()
+
+    recorder = Recorder(args.record) if args.record else None
+    runtime = Runtime(
+        loco_collector,
+        host=config.z21_host,
+        port=config.z21_port,
+        recorder=recorder,
+        latency_dump=args.latency,
+        packets_per_second=config.z21_packets_per_second,
+        snapshot=args.snapshot,
+    )
+    for station in config.stations.values():
+        if args.multiprocess:
+            log.warning(f'Ignore station {station.name}, --multiprocess only supports a single z21')
+            continue
+        runtime.add_station(station.name, LocoCollector(station.locos), host=station.host, port=station.port)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            # lets the runtime save its state before we exit
+            loop.add_signal_handler(signal_number, runtime.stop)
+        except NotImplementedError:
+            # not available on Windows, Ctrl-C raises a KeyboardInterrupt there
+            pass
+    try:
+        loop.run_until_complete(runtime.run())
     except KeyboardInterrupt:
+        pass
+    finally:
         log.info('Starting shutdown')
+        runtime.close()
+        # let the transports finish closing
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        if recorder is not None:
+            recorder.close()
+        if audio_process is not None:
+            audio_process.stop()
+        event_log.close()
+        log_writer.stop()